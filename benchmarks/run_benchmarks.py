@@ -0,0 +1,263 @@
+#!/usr/bin/env python
+"""
+Headless benchmarks for the input-to-render pipeline.
+
+Every trace creates a `CommandLineInterface` that renders to a pseudo
+terminal with a fixed size, and replays a keystroke trace. Each keystroke
+goes through the `InputStream`, the key bindings and a full render, like it
+would in the event loop. For every trace, the latency percentiles per
+keystroke and the number of characters written to the terminal are
+reported.
+
+Usage::
+
+    python benchmarks/run_benchmarks.py                    # Compare with baselines.
+    python benchmarks/run_benchmarks.py --update-baselines # Store new baselines.
+    python benchmarks/run_benchmarks.py typing paste       # Only these traces.
+
+The run fails when the 90th percentile latency of a trace is more than
+`--tolerance` times its baseline. Baselines depend on the machine, so they are
+not part of the repository: the first run of a trace on a machine stores its
+results as the baseline in `benchmarks/baselines.json`.
+"""
+from __future__ import unicode_literals, print_function
+
+import argparse
+import array
+import fcntl
+import json
+import os
+import pty
+import sys
+import termios
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from prompt_toolkit import CommandLineInterface
+from prompt_toolkit.buffer import Buffer
+from prompt_toolkit.completion import Completer, Completion
+from prompt_toolkit.document import Document
+from prompt_toolkit.history import History
+from prompt_toolkit.key_binding.manager import KeyBindingManager
+from prompt_toolkit.layout import Layout
+from prompt_toolkit.layout.menus import CompletionsMenu
+from prompt_toolkit.layout.prompt import DefaultPrompt
+from prompt_toolkit.terminal.vt100_input import InputStream
+
+BASELINES_FILENAME = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baselines.json')
+
+#: Size of the pseudo terminal.
+ROWS = 40
+COLUMNS = 120
+
+_timer = getattr(time, 'perf_counter', time.time)
+
+
+class _Terminal(object):
+    """
+    Pseudo terminal with a fixed size. Everything that's written to it is
+    read and thrown away by a background thread.
+    """
+    def __init__(self, rows=ROWS, columns=COLUMNS):
+        self.master, self.slave = pty.openpty()
+
+        fcntl.ioctl(self.slave, termios.TIOCSWINSZ, array.array(str('h'), [rows, columns, 0, 0]))
+        self.stdout = os.fdopen(os.dup(self.slave), 'w')
+
+        t = threading.Thread(target=self._drain)
+        t.daemon = True
+        t.start()
+
+    def _drain(self):
+        while True:
+            try:
+                os.read(self.master, 64 * 1024)
+            except OSError:
+                return
+
+    def close(self):
+        self.stdout.close()
+        os.close(self.slave)
+        os.close(self.master)
+
+
+class _ManyCompletions(Completer):
+    """
+    Completer that returns many completions for every word.
+    """
+    words = ['%s_%i' % (w, i) for w in ('alpha', 'beta', 'gamma', 'delta') for i in range(500)]
+
+    def get_completions(self, document, complete_event):
+        word = document.get_word_before_cursor()
+        for w in self.words:
+            if w.startswith(word):
+                yield Completion(w, -len(word))
+
+
+def _python_source(lines):
+    return '\n'.join('    value_%i = compute(value_%i, "text %i")  # comment' % (i, i - 1, i)
+                     for i in range(lines))
+
+
+def _create_cli(terminal, vi_mode=False, buffer=None, with_menu=False):
+    manager = KeyBindingManager(enable_vi_mode=vi_mode)
+
+    return CommandLineInterface(
+        stdout=terminal.stdout,
+        buffer=buffer,
+        layout=Layout(before_input=DefaultPrompt(),
+                      menus=[CompletionsMenu()] if with_menu else []),
+        key_bindings_registry=manager.registry,
+        create_async_autocompleters=False)
+
+
+def trace_typing(terminal):
+    cli = _create_cli(terminal)
+    keys = list('def function(argument, other_argument=None): return argument * 2 ' * 8)
+    return cli, keys, None
+
+
+def trace_paste(terminal):
+    cli = _create_cli(terminal, buffer=Buffer(is_multiline=lambda document: True))
+
+    # Several pastes, so that the percentiles mean something.
+    keys = [_python_source(5) + '\n' for _ in range(10)]
+    return cli, keys, None
+
+
+def trace_vi_motions(terminal):
+    buffer = Buffer(is_multiline=lambda document: True)
+    cli = _create_cli(terminal, vi_mode=True, buffer=buffer)
+
+    keys = ['\x1b'] + ['j'] * 100 + ['w'] * 100 + ['k'] * 50 + ['b'] * 50 + ['G', 'g', 'g']
+    return cli, keys, Document(_python_source(500), 0)
+
+
+def trace_completion(terminal):
+    cli = _create_cli(terminal, buffer=Buffer(completer=_ManyCompletions()), with_menu=True)
+    keys = ['a', 'l', '\t'] + ['\t'] * 100 + [' ', 'g', '\t'] + ['\t'] * 100
+    return cli, keys, None
+
+
+def trace_history_search(terminal):
+    history = History()
+    for i in range(20000):
+        history.append('command_%i --option=%i %s' % (i, i * 7, 'argument ' * (i % 5)))
+
+    cli = _create_cli(terminal, buffer=Buffer(history=history))
+    keys = ['\x12'] + list('command_1') + ['\x12'] * 50 + list('99')
+    return cli, keys, None
+
+
+TRACES = {
+    'typing': trace_typing,
+    'paste': trace_paste,
+    'vi_motions': trace_vi_motions,
+    'completion': trace_completion,
+    'history_search': trace_history_search,
+}
+
+
+def _percentile(sorted_values, p):
+    index = min(len(sorted_values) - 1, int(round(p / 100.0 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def run_trace(name):
+    """
+    Replay the trace and return a dictionary with the results.
+    """
+    terminal = _Terminal()
+
+    try:
+        cli, keys, initial_document = TRACES[name](terminal)
+
+        written = [0]
+
+        def on_timings(timings):
+            written[0] += timings.counts.get('bytes_written', 0)
+
+        cli.instrumentation.enabled = True
+        cli.instrumentation.onTimings += on_timings
+
+        # Initial render. (Like `read_input` does.)
+        cli._reset(initial_document=initial_document)
+        cli._redraw()
+        written[0] = 0
+
+        inputstream = InputStream(cli.input_processor)
+        latencies = []
+
+        for data in keys:
+            start = _timer()
+            inputstream.feed_and_flush(data)
+            cli._redraw()
+            latencies.append(_timer() - start)
+
+        latencies.sort()
+
+        return {
+            'keystrokes': len(latencies),
+            'p50': _percentile(latencies, 50),
+            'p90': _percentile(latencies, 90),
+            'p99': _percentile(latencies, 99),
+            'max': latencies[-1],
+            'bytes_written': written[0],
+        }
+    finally:
+        terminal.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the input-to-render pipeline.')
+    parser.add_argument('traces', nargs='*', help='Traces to run. (Default: all.)')
+    parser.add_argument('--update-baselines', action='store_true',
+                        help='Store the results as the new baselines.')
+    parser.add_argument('--tolerance', type=float, default=1.5,
+                        help='Fail when p90 is more than this factor slower than the baseline.')
+    args = parser.parse_args()
+
+    names = args.traces or sorted(TRACES)
+
+    if os.path.exists(BASELINES_FILENAME):
+        with open(BASELINES_FILENAME) as f:
+            baselines = json.load(f)
+    else:
+        baselines = {}
+
+    failed = []
+    new_baselines = []
+
+    print('%-16s %6s %10s %10s %10s %10s %12s' % (
+        'trace', 'keys', 'p50 (ms)', 'p90 (ms)', 'p99 (ms)', 'max (ms)', 'written'))
+
+    for name in names:
+        result = run_trace(name)
+
+        print('%-16s %6i %10.3f %10.3f %10.3f %10.3f %12i' % (
+            name, result['keystrokes'], result['p50'] * 1000, result['p90'] * 1000,
+            result['p99'] * 1000, result['max'] * 1000, result['bytes_written']))
+
+        if args.update_baselines or name not in baselines:
+            baselines[name] = result
+            new_baselines.append(name)
+        elif result['p90'] > baselines[name]['p90'] * args.tolerance:
+            failed.append(name)
+
+    if new_baselines:
+        if not args.update_baselines:
+            print('Stored as the new baseline: %s' % ', '.join(new_baselines))
+
+        with open(BASELINES_FILENAME, 'w') as f:
+            json.dump(baselines, f, indent=4, sort_keys=True)
+            f.write('\n')
+
+    if failed:
+        print('Slower than the baseline: %s' % ', '.join(failed))
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,6 +1,6 @@
 #!/usr/bin/env python
 """
-(Python >3.3)
+(Python >=3.5)
 
 This is an example of how to embed a CommandLineInterface inside an application
 that uses the asyncio eventloop. The ``prompt_toolkit`` library will make sure
@@ -38,8 +38,7 @@ class TestStyle(Style):
     }
 
 
-@asyncio.coroutine
-def print_counter():
+async def print_counter():
     """
     Coroutine that prints counters.
     """
@@ -47,11 +46,10 @@ def print_counter():
     while True:
         print('Counter: %i' % i)
         i += 1
-        yield from asyncio.sleep(3)
+        await asyncio.sleep(3)
 
 
-@asyncio.coroutine
-def interactive_shell():
+async def interactive_shell():
     """
     Coroutine that shows the interactive command line.
     """
@@ -67,7 +65,7 @@ def interactive_shell():
     # Run echo loop. Read text from stdin, and reply it back.
     while True:
         try:
-            result = yield from cli.read_input_async(
+            result = await cli.read_input_async(
                 on_exit=AbortAction.RAISE_EXCEPTION,
                 on_abort=AbortAction.RAISE_EXCEPTION)
             print('You said: "%s"' % result.text)
@@ -78,8 +76,8 @@ def interactive_shell():
 
 
 def main():
-    asyncio.async(print_counter())
-    asyncio.async(interactive_shell())
+    asyncio.ensure_future(print_counter())
+    asyncio.ensure_future(interactive_shell())
 
     loop.run_forever()
     loop.close()
@@ -1,6 +1,6 @@
 #!/usr/bin/env python
 """
-(Python >3.3)
+(Python >=3.5)
 
 This is an example of how we can embed a Python REPL into an asyncio
 application. In this example, we have one coroutine that runs in the
@@ -20,33 +20,31 @@ loop = asyncio.get_event_loop()
 counter = [0]
 
 
-@asyncio.coroutine
-def print_counter():
+async def print_counter():
     """
     Coroutine that prints counters and saves it in a global variable.
     """
     while True:
         print('Counter: %i' % counter[0])
         counter[0] += 1
-        yield from asyncio.sleep(3)
+        await asyncio.sleep(3)
 
 
-@asyncio.coroutine
-def interactive_shell():
+async def interactive_shell():
     """
     Coroutine that starts a Python REPL from which we can access the global
     counter variable.
     """
     print('You should be able to read and update the "counter[0]" variable from this shell.')
-    yield from embed(globals=globals(), return_asyncio_coroutine=True, patch_stdout=True)
+    await embed(globals=globals(), return_asyncio_coroutine=True, patch_stdout=True)
 
     # Stop the loop when quitting the repl. (Ctrl-D press.)
     loop.stop()
 
 
 def main():
-    asyncio.async(print_counter())
-    asyncio.async(interactive_shell())
+    asyncio.ensure_future(print_counter())
+    asyncio.ensure_future(interactive_shell())
 
     loop.run_forever()
     loop.close()
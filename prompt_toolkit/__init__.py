@@ -9,6 +9,9 @@ import os
 import signal
 import six
 import sys
+import threading
+import time
+import traceback
 import weakref
 
 from .buffer import Buffer
@@ -16,6 +19,7 @@ from .clipboard import Clipboard
 from .completion import CompleteEvent
 from .focus_stack import FocusStack
 from .history import History
+from .instrumentation import Instrumentation
 from .key_binding.bindings.emacs import load_emacs_bindings
 from .key_binding.input_processor import InputProcessor
 from .key_binding.registry import Registry
@@ -24,8 +28,8 @@ from .layout.prompt import DefaultPrompt
 from .renderer import Renderer
 from .utils import EventHook, DummyContext
 
-from pygments.styles.default import DefaultStyle
-from types import GeneratorType
+from collections import deque
+from contextlib import contextmanager
 
 if sys.platform == 'win32':
     from .terminal.win32_input import raw_mode, cooked_mode
@@ -76,25 +80,39 @@ class CommandLineInterface(object):
     :param stdin: Input stream, by default sys.stdin
     :param stdout: Output stream, by default sys.stdout
     :param layout: :class:`Layout` instance.
-    :param style: :class:`Layout` instance.
+    :param style: Pygments style class. (By default, the Pygments
+        `DefaultStyle`.)
     :param create_async_autocompleters: Boolean. If True, autocompletions will
         be generated asynchronously while you type.
+    :param create_async_validators: Boolean. If True, the input is validated
+        in the background after an idle period, and the validation errors are
+        shown while you type. Accepting input that was validated already
+        doesn't run the validator again.
+    :param executor_max_workers: Maximum number of threads for
+        `run_in_executor`.
     """
     def __init__(self, stdin=None, stdout=None,
                  layout=None,
                  buffer=None,
                  buffers=None,
-                 style=DefaultStyle,
+                 style=None,
                  key_bindings_registry=None,
                  clipboard=None,
                  create_async_autocompleters=True,
-                 renderer_factory=Renderer):
+                 create_async_validators=False,
+                 renderer_factory=Renderer,
+                 executor_max_workers=4):
 
         assert buffer is None or isinstance(buffer, Buffer)
         assert buffers is None or isinstance(buffers, dict)
 
         self.stdin = stdin or sys.__stdin__
         self.stdout = stdout or sys.__stdout__
+        if style is None:
+            # (Imported here, because loading `pygments.styles` is slow.)
+            from pygments.styles.default import DefaultStyle
+            style = DefaultStyle
+
         self.style = style
 
         # Events
@@ -107,6 +125,10 @@ class CommandLineInterface(object):
         self.onReadInputEnd = EventHook()
         self.onReset = EventHook()
 
+        #: Opt-in timing instrumentation. (See
+        #: :mod:`prompt_toolkit.instrumentation`.)
+        self.instrumentation = Instrumentation()
+
         # Focus stack.
         self.focus_stack = FocusStack(initial='default')
 
@@ -143,11 +165,29 @@ class CommandLineInterface(object):
                 if b.completer:
                     b.onTextInsert += self._create_async_completer(b)
 
+        if create_async_validators:
+            for b in self.buffers.values():
+                if b.validator:
+                    self.onInputTimeout += self._create_async_validator(b)
+
         self._reset()
 
         # Event loop.
         self.eventloop = None
 
+        # Thread pool for `run_in_executor`. (Created on first use, and
+        # reused for all the following `read_input` calls.)
+        self.executor_max_workers = executor_max_workers
+        self._executor = None
+
+        #: Time to wait for more resize events, before redrawing.
+        self.resize_delay = .05
+        self._resize_timer = None
+
+        #: File descriptors that are watched while reading input. Maps the
+        #: file descriptor to its callback.
+        self._readers = {}
+
     @property
     def is_reading_input(self):
         return bool(self.eventloop)
@@ -197,9 +237,31 @@ class CommandLineInterface(object):
         loop.)
         Similar to Twisted's ``deferToThread``.
 
+        The callable runs in a thread pool that is shared by everything that
+        runs in the executor of this `CommandLineInterface`.
+
         :param callback: The callable that should run in the executor.
+        :returns: `concurrent.futures.Future` instance.
         """
-        self.eventloop.run_in_executor(callback)
+        if self._executor is None:
+            # (Imported here, `concurrent.futures` is not needed by
+            # applications that don't use the executor.)
+            from concurrent.futures import ThreadPoolExecutor
+            self._executor = ThreadPoolExecutor(max_workers=self.executor_max_workers)
+
+        future = self._executor.submit(callback)
+        future.add_done_callback(_report_executor_exception)
+        return future
+
+    def close(self):
+        """
+        Release the resources of this `CommandLineInterface`: shut down the
+        thread pool of the executor. Call this when no more input is going to
+        be read.
+        """
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
 
     def call_from_executor(self, callback):
         """
@@ -214,20 +276,57 @@ class CommandLineInterface(object):
         else:
             return False
 
+    def add_reader(self, fd, callback):
+        """
+        Watch this file descriptor while we are reading input, and call
+        `callback` in the event loop when it's readable. The reader stays
+        registered for the following `read_input` calls as well.
+
+        :param fd: File descriptor, or an object with a `fileno()` method.
+        :param callback: Callable without arguments.
+        """
+        self._readers[fd] = callback
+
+        if self.eventloop:
+            self.eventloop.add_reader(fd, callback)
+
+    def remove_reader(self, fd):
+        """
+        Stop watching this file descriptor.
+        """
+        del self._readers[fd]
+
+        if self.eventloop:
+            self.eventloop.remove_reader(fd)
+
     def _on_resize(self):
         """
-        When the window size changes, we erase the current output and request
-        again the cursor position. We the CPR answer arrives, the output is
-        drawn again.
+        When the window size changes, we request again the cursor position and
+        redraw. (The renderer erases the output first, unless only rows were
+        added.)
         (We do it asynchronously, because writing to the output from inside the
         signal handler causes easily reentrant calls, giving runtime errors.)
         """
         assert self.eventloop
+        self.call_from_executor(self._schedule_resize)
 
-        def do_in_event_loop():
-            self.renderer.erase()
-            self.renderer.request_absolute_cursor_position()
-        self.call_from_executor(do_in_event_loop)
+    def _schedule_resize(self):
+        """
+        Handle the resize after `resize_delay`. While dragging the window,
+        only the last of a series of resize events is handled.
+        """
+        if self._resize_timer:
+            self._resize_timer.cancel()
+
+        try:
+            self._resize_timer = self.eventloop.call_later(self.resize_delay, self._handle_resize)
+        except NotImplementedError:
+            self._handle_resize()
+
+    def _handle_resize(self):
+        self._resize_timer = None
+        self.renderer.resize()
+        self._redraw()
 
     def read_input(self, initial_document=None,
                    on_abort=AbortAction.RETRY, on_exit=AbortAction.IGNORE):
@@ -239,46 +338,44 @@ class CommandLineInterface(object):
         :param on_exit:  :class:`AbortAction` value. What to do when Ctrl-D has been pressed.
         """
         eventloop = EventLoop(self.input_processor, self.stdin)
-        g = self._read_input(initial_document=initial_document,
-                             on_abort=on_abort,
-                             on_exit=on_exit,
-                             eventloop=eventloop,
-                             return_corountine=False)
 
-        # Return result from `_read_input`.
-        try:
+        with self._reading_input(eventloop, initial_document):
             while True:
-                next(g)
-        except StopIteration as e:
-            return e.args[0]
+                eventloop.loop()
+
+                done, result = self._process_input(initial_document, on_abort, on_exit)
+                if done:
+                    return result
 
     def read_input_async(self, initial_document=None,
                          on_abort=AbortAction.RETRY, on_exit=AbortAction.IGNORE):
         """
-        Same as `read_input`, but this returns an asyncio coroutine.
+        Same as `read_input`, but this returns an asyncio coroutine. ::
+
+            document = await cli.read_input_async()
 
-        Warning: this will only work on Python >3.3
+        The input reader stays registered in the asyncio event loop until the
+        coroutine returns.
+
+        Warning: this will only work on Python >=3.5
         """
         # Inline import, to make sure the rest doesn't break on Python 2
+        from prompt_toolkit.eventloop.asyncio_base import read_input_async
+
         if sys.platform == 'win32':
             from prompt_toolkit.eventloop.asyncio_win32 import Win32AsyncioEventLoop as AsyncioEventLoop
         else:
             from prompt_toolkit.eventloop.asyncio_posix import PosixAsyncioEventLoop as AsyncioEventLoop
 
         eventloop = AsyncioEventLoop(self.input_processor, self.stdin)
-        return self._read_input(initial_document=initial_document,
-                                on_abort=on_abort,
-                                on_exit=on_exit,
-                                eventloop=eventloop,
-                                return_corountine=True)
+        return read_input_async(self, eventloop, initial_document, on_abort, on_exit)
 
-    def _read_input(self, initial_document, on_abort, on_exit,
-                    eventloop, return_corountine):
+    @contextmanager
+    def _reading_input(self, eventloop, initial_document):
         """
-        The implementation of ``read_input`` which can be called both
-        synchronously and asynchronously. When called as coroutine it will
-        delegate all the futures from ``eventloop.loop_coroutine``. In both
-        cases it returns the result through ``StopIteration``.
+        Context manager that sets up the terminal and the event loop for
+        reading input. It's shared by ``read_input`` and
+        ``read_input_async``.
         """
         # Set `is_reading_input` flag.
         if self.is_reading_input:
@@ -287,11 +384,13 @@ class CommandLineInterface(object):
         # Create new event loop.
         self.eventloop = eventloop
         self.eventloop.onInputTimeout += lambda: self.onInputTimeout.fire()
+        self.eventloop.instrumentation = self.instrumentation
 
         try:
-            def reset():
-                self._reset(initial_document=initial_document)
-            reset()
+            for fd, callback in self._readers.items():
+                self.eventloop.add_reader(fd, callback)
+
+            self._reset(initial_document=initial_document)
 
             # Trigger onReadInputStart event.
             self.onReadInputStart.fire()
@@ -302,58 +401,65 @@ class CommandLineInterface(object):
 
                 with (DummyContext() if sys.platform == 'win32' else
                       call_on_sigwinch(self._on_resize)):
-                    while True:
-                        if return_corountine:
-                            loop_result = self.eventloop.loop_coroutine()
-                            assert isinstance(loop_result, GeneratorType)
-
-                            for future in loop_result:
-                                yield future
-                        else:
-                            loop_result = self.eventloop.loop()
-                            assert not isinstance(loop_result, GeneratorType)
-
-                        # If the exit flag has been set.
-                        if self._exit_flag:
-                            if on_exit != AbortAction.IGNORE:
-                                self.renderer.render(self)
-
-                            if on_exit == AbortAction.RAISE_EXCEPTION:
-                                raise Exit()
-                            elif on_exit == AbortAction.RETURN_NONE:
-                                return
-                            elif on_exit == AbortAction.RETRY:
-                                reset()
-                                self.renderer.request_absolute_cursor_position()
-
-                        # If the abort flag has been set.
-                        if self._abort_flag:
-                            if on_abort != AbortAction.IGNORE:
-                                self.renderer.render(self)
-
-                            if on_abort == AbortAction.RAISE_EXCEPTION:
-                                raise Abort()
-                            elif on_abort == AbortAction.RETURN_NONE:
-                                return
-                            elif on_abort == AbortAction.RETRY:
-                                reset()
-                                self.renderer.request_absolute_cursor_position()
-
-                        # If a return value has been set.
-                        if self._return_value is not None:
-                            self.renderer.render(self)
-                            raise StopIteration(self._return_value)
-
-                        # Now render the current layout to the output.
-                        self._redraw()
+                    yield
         finally:
+            if self._resize_timer:
+                self._resize_timer.cancel()
+                self._resize_timer = None
+
             # Close event loop
             self.eventloop.close()
             self.eventloop = None
 
+            # Other output can appear before we read input again.
+            self.renderer.forget_cursor_row()
+
             # Trigger onReadInputEnd event.
             self.onReadInputEnd.fire()
 
+    def _process_input(self, initial_document, on_abort, on_exit):
+        """
+        Handle the exit/abort/return flags after the event loop processed
+        input, and render the output again.
+
+        :returns: (done, result) tuple. When `done` is True, `result` should
+            be returned by ``read_input``.
+        """
+        # If the exit flag has been set.
+        if self._exit_flag:
+            if on_exit != AbortAction.IGNORE:
+                self.renderer.render(self)
+
+            if on_exit == AbortAction.RAISE_EXCEPTION:
+                raise Exit()
+            elif on_exit == AbortAction.RETURN_NONE:
+                return True, None
+            elif on_exit == AbortAction.RETRY:
+                self._reset(initial_document=initial_document)
+                self.renderer.request_absolute_cursor_position()
+
+        # If the abort flag has been set.
+        if self._abort_flag:
+            if on_abort != AbortAction.IGNORE:
+                self.renderer.render(self)
+
+            if on_abort == AbortAction.RAISE_EXCEPTION:
+                raise Abort()
+            elif on_abort == AbortAction.RETURN_NONE:
+                return True, None
+            elif on_abort == AbortAction.RETRY:
+                self._reset(initial_document=initial_document)
+                self.renderer.request_absolute_cursor_position()
+
+        # If a return value has been set.
+        if self._return_value is not None:
+            self.renderer.render(self)
+            return True, self._return_value
+
+        # Now render the current layout to the output.
+        self._redraw()
+        return False, None
+
     def set_exit(self):
         self._exit_flag = True
 
@@ -493,14 +599,62 @@ class CommandLineInterface(object):
             self.run_in_executor(run)
         return async_completer
 
-    def stdout_proxy(self):
+    def _create_async_validator(self, buffer):
+        """
+        Create function for asynchronous validation after an idle period.
+        (Validate in other thread.)
+        """
+        validate_thread_running = [False]  # By ref.
+
+        def async_validator():
+            document = buffer.document
+
+            # Only validate the buffer that has the focus, and never run two
+            # threads at the same time.
+            if buffer is not self.current_buffer or validate_thread_running[0]:
+                return
+
+            # Don't validate the same text twice. (But show the result again,
+            # it's cleared when the text changes.)
+            cache = buffer._validation_cache
+            if cache and cache[0] == document.text:
+                if buffer.validation_error is not cache[1]:
+                    buffer.set_validation_result(document, cache[1])
+                    self._redraw()
+                return
+
+            validate_thread_running[0] = True
+
+            def run():
+                validation_error = buffer.get_validation_error(document)
+                validate_thread_running[0] = False
+
+                def callback():
+                    buffer.set_validation_result(document, validation_error)
+
+                    # Show the result if the text was not yet changed.
+                    # (Otherwise, the next idle period validates again.)
+                    if buffer.text == document.text:
+                        self._redraw()
+                self.call_from_executor(callback)
+
+            self.run_in_executor(run)
+        return async_validator
+
+    def stdout_proxy(self, flush_interval=.05, max_buffer_size=1024 * 1024):
         """
         Create an :class:`_StdoutProxy` class which can be used as a patch for
         sys.stdout. Writing to this proxy will make sure that the text appears
         above the prompt, and that it doesn't destroy the output from the
         renderer.
+
+        :param flush_interval: Minimum time between two writes above the
+            prompt, in seconds. Output is collected in the meantime.
+        :param max_buffer_size: Maximum number of characters that are
+            collected. When there is more, the oldest lines are dropped.
         """
-        return _StdoutProxy(self)
+        return _StdoutProxy(self, flush_interval=flush_interval,
+                            max_buffer_size=max_buffer_size)
 
     def patch_stdout_context(self):
         """
@@ -508,35 +662,74 @@ class CommandLineInterface(object):
         that makes sure that all printed text will appear above the prompt, and
         that it doesn't destroy the output from the renderer.
         """
-        return _PatchStdoutContext(self.stdout_proxy())
+        return _PatchStdoutContext(self, self.stdout_proxy())
 
 
 class _PatchStdoutContext(object):
-    def __init__(self, new_stdout):
+    def __init__(self, cli, new_stdout):
+        self.cli = cli
         self.new_stdout = new_stdout
 
     def __enter__(self):
+        # Write what's left when the CLI stops reading input. (The scheduled
+        # flush could have been dropped together with the event loop.)
+        self.cli.onReadInputEnd += self.new_stdout._reading_input_ended
+
         self.original_stdout = sys.stdout
         sys.stdout = self.new_stdout
 
     def __exit__(self, *a, **kw):
-        sys.stdout = self.original_stdout
+        try:
+            sys.stdout = self.original_stdout
+        finally:
+            self.cli.onReadInputEnd -= self.new_stdout._reading_input_ended
+
+
+def _report_executor_exception(future):
+    """
+    Print the traceback of a callback that failed in the executor. (Nobody
+    reads the result of most of these futures, so the exception would be
+    lost otherwise.)
+    """
+    if not future.cancelled():
+        e = future.exception()
+
+        if e is not None:
+            traceback.print_exception(type(e), e, getattr(e, '__traceback__', None))
 
 
 class _StdoutProxy(object):
     """
     Proxy for stdout, as returned by
     :class:`CommandLineInterface.stdout_proxy`.
+
+    While the CLI is reading input, complete lines are collected in a buffer
+    and written above the prompt in batches. There is at most one batch every
+    `flush_interval` seconds, and each batch costs one erase/redraw cycle of
+    the prompt.
+
+    :param flush_interval: Minimum time between two batches, in seconds.
+    :param max_buffer_size: Maximum number of characters that are kept until
+        the next batch. When more output arrives, the oldest lines are
+        dropped and replaced by a notice with the number of dropped lines.
     """
-    def __init__(self, cli):
+    def __init__(self, cli, flush_interval=.05, max_buffer_size=1024 * 1024):
         self._cli = cli
+        self.flush_interval = flush_interval
+        self.max_buffer_size = max_buffer_size
+
+        self._lock = threading.RLock()
+
+        #: Text after the last newline.
         self._buffer = []
 
-    def _do(self, func):
-        if self._cli.is_reading_input:
-            self._cli.run_in_terminal(func)
-        else:
-            func()
+        #: Output that is complete, but not yet written.
+        self._pending = deque()
+        self._pending_size = 0
+        self._dropped_lines = 0
+
+        self._flush_scheduled = False
+        self._last_flush_time = 0
 
     def write(self, data):
         """
@@ -552,27 +745,133 @@ class _StdoutProxy(object):
             # When there is a newline in the data, write everything before the
             # newline, including the newline itself.
             before, after = data.rsplit('\n', 1)
-            to_write = self._buffer + [before, '\n']
-            self._buffer = [after]
 
-            def run():
-                for s in to_write:
-                    self._cli.stdout.write(s)
-            self._do(run)
+            with self._lock:
+                self._append(''.join(self._buffer) + before + '\n')
+                self._buffer = [after]
+
+            self._schedule_flush()
         else:
             # Otherwise, cache in buffer.
-            self._buffer.append(data)
+            with self._lock:
+                self._buffer.append(data)
+
+    def _append(self, text):
+        """
+        Add text to the pending output. Drop the oldest output when the
+        buffer is full. (Called with the lock held.)
+        """
+        self._pending.append(text)
+        self._pending_size += len(text)
+
+        while self._pending_size > self.max_buffer_size and len(self._pending) > 1:
+            dropped = self._pending.popleft()
+            self._pending_size -= len(dropped)
+            self._dropped_lines += max(1, dropped.count('\n'))
+
+    def _take_pending(self):
+        """
+        Return all the pending output as one string and clear the buffer.
+        """
+        with self._lock:
+            result = ''.join(self._pending)
+
+            if self._dropped_lines:
+                result = '... (%i lines of output dropped)\n%s' % (self._dropped_lines, result)
+
+            self._pending.clear()
+            self._pending_size = 0
+            self._dropped_lines = 0
+            return result
+
+    def _schedule_flush(self):
+        """
+        Make sure that the pending output will be written.
+        """
+        if self._cli.is_reading_input:
+            with self._lock:
+                if self._flush_scheduled:
+                    return
+                self._flush_scheduled = True
+
+            if self._cli.call_from_executor(self._schedule_flush_in_eventloop):
+                return
+
+            # The CLI stopped reading input in the meantime.
+            with self._lock:
+                self._flush_scheduled = False
+
+        self._write_pending()
+
+    def _schedule_flush_in_eventloop(self):
+        """
+        (Called in the event loop.) Flush now, or after the flush interval
+        when we did a flush recently.
+        """
+        remaining = self._last_flush_time + self.flush_interval - time.time()
+
+        if remaining > 0:
+            try:
+                self._cli.eventloop.call_later(remaining, self._flush_in_terminal)
+                return
+            except NotImplementedError:
+                pass
+
+        self._flush_in_terminal()
+
+    def _flush_in_terminal(self):
+        """
+        (Called in the event loop.) Write all the pending output above the
+        prompt.
+        """
+        with self._lock:
+            self._flush_scheduled = False
+
+        if self._cli.is_reading_input:
+            text = self._take_pending()
+
+            if text:
+                self._last_flush_time = time.time()
+
+                def run():
+                    self._cli.stdout.write(text)
+                    self._cli.stdout.flush()
+                self._cli._run_in_terminal(run)
+        else:
+            self._write_pending()
+
+    def _reading_input_ended(self):
+        """
+        (Called through `patch_stdout_context`, when the CLI stops reading
+        input.) The flush that was
+        scheduled in the event loop won't run anymore, so write the pending
+        output now, and allow scheduling a flush in the next session.
+        """
+        with self._lock:
+            self._flush_scheduled = False
+
+        self._write_pending()
+
+    def _write_pending(self):
+        """
+        Write the pending output directly to stdout.
+        """
+        text = self._take_pending()
+
+        if text:
+            self._cli.stdout.write(text)
+        self._cli.stdout.flush()
 
     def flush(self):
         """
         Flush buffered output.
         """
-        def run():
-            for s in self._buffer:
-                self._cli.stdout.write(s)
-            self._buffer = []
-            self._cli.stdout.flush()
-        self._do(run)
+        with self._lock:
+            if self._buffer:
+                self._append(''.join(self._buffer))
+                self._buffer = []
+
+        self._schedule_flush()
 
     def __getattr__(self, name):
         return getattr(self._cli.stdout, name)
@@ -13,10 +13,9 @@ from .utils import EventHook
 from .validation import ValidationError
 from .clipboard import ClipboardData
 
+import bisect
 import os
 import six
-import subprocess
-import tempfile
 
 __all__ = (
     'Buffer',
@@ -75,6 +74,96 @@ class _IncrementalSearchState(object):
         self.isearch_direction = direction
 
 
+class _WorkingLines(object):
+    """
+    The entries of the history, followed by the current input, as a mutable
+    sequence. Modified entries are kept in an overlay dictionary on top of the
+    history, so creating this is O(1), whatever the size of the history.
+    Deleted entries are skipped, without copying the other entries.
+
+    :param history: :class:`~prompt_toolkit.history.History` instance. (Only
+        entries that exist now are used, appending to the history afterwards
+        doesn't change this sequence.)
+    :param text: The text of the current input.
+    """
+    def __init__(self, history, text):
+        self._history = history
+        self._history_len = len(history)
+
+        #: Maps history indexes to modified entries.
+        self._overlay = {}
+
+        #: Sorted list of the history indexes of deleted entries.
+        self._deleted = []
+
+        #: The entries after the history entries.
+        self._lines = [text]
+
+    def _normalize_index(self, index):
+        length = len(self)
+
+        if index < 0:
+            index += length
+
+        if not 0 <= index < length:
+            raise IndexError('Working line index out of range.')
+
+        return index
+
+    def _history_index(self, index):
+        """
+        Turn the index of a working line into the index of the history entry.
+        (Skipping the deleted entries.)
+        """
+        for i in self._deleted:
+            if i <= index:
+                index += 1
+            else:
+                break
+        return index
+
+    def __len__(self):
+        return self._history_len - len(self._deleted) + len(self._lines)
+
+    def __getitem__(self, index):
+        index = self._normalize_index(index)
+        history_len = self._history_len - len(self._deleted)
+
+        if index < history_len:
+            index = self._history_index(index)
+
+            try:
+                return self._overlay[index]
+            except KeyError:
+                return self._history[index]
+        else:
+            return self._lines[index - history_len]
+
+    def __setitem__(self, index, value):
+        index = self._normalize_index(index)
+        history_len = self._history_len - len(self._deleted)
+
+        if index < history_len:
+            self._overlay[self._history_index(index)] = value
+        else:
+            self._lines[index - history_len] = value
+
+    def __delitem__(self, index):
+        index = self._normalize_index(index)
+        history_len = self._history_len - len(self._deleted)
+
+        if index < history_len:
+            index = self._history_index(index)
+            self._overlay.pop(index, None)
+            bisect.insort(self._deleted, index)
+        else:
+            del self._lines[index - history_len]
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+
 class Buffer(object):
     """
     The core data structure that holds the text and cursor position of the
@@ -118,6 +207,7 @@ class Buffer(object):
         self._history = History() if history is None else history
 
         self.__cursor_position = 0
+        self._document_cache = None
 
         # Events
         self.onTextChanged = EventHook()
@@ -144,6 +234,9 @@ class Buffer(object):
         # `ValidationError` instance. (Will be set when the input is wrong.)
         self.validation_error = None
 
+        # (text, validation_error) tuple of the last background validation.
+        self._validation_cache = None
+
         # State of Incremental-search
         self.isearch_state = None
 
@@ -160,9 +253,9 @@ class Buffer(object):
         #: modified. The user can press arrow_up and edit previous entries.
         #: Ctrl-C should reset this, and copy the whole history back in here.
         #: Enter should process the current command and append to the real
-        #: history.
-        self._working_lines = self._history.strings[:]
-        self._working_lines.append(initial_document.text)
+        #: history. (The history itself is not copied, only the modified
+        #: entries are kept.)
+        self._working_lines = _WorkingLines(self._history, initial_document.text)
         self.__working_index = len(self._working_lines) - 1
 
     # <getters/setters>
@@ -225,7 +318,19 @@ class Buffer(object):
         Return :class:`.Document` instance from the current text and cursor
         position.
         """
-        return Document(self.text, self.cursor_position, selection=self.selection_state)
+        # Reuse the previous document, as long as nothing changed. (This is
+        # accessed many times for each key press, and the document caches
+        # its derived values.)
+        text = self.text
+        document = self._document_cache
+
+        if document is None or document.text is not text or \
+                document.cursor_position != self.cursor_position or \
+                document.selection is not self.selection_state:
+            document = Document(text, self.cursor_position, selection=self.selection_state)
+            self._document_cache = document
+
+        return document
 
     def save_to_undo_stack(self):
         """
@@ -252,6 +357,8 @@ class Buffer(object):
         :param line_index_iterator: Iterator of line numbers (int)
         :param transform_callback: callable that takes the original text of a
                                    line, and return the new text for this line.
+
+        (For a range of consecutive lines, `transform_line_range` is faster.)
         """
         # Split lines
         lines = self.text.split('\n')
@@ -265,6 +372,27 @@ class Buffer(object):
 
         self.text = '\n'.join(lines)
 
+    def transform_line_range(self, from_row, to_row, transform_callback):
+        """
+        Transform the lines `from_row` until (not including) `to_row`. Only
+        this part of the text is split in lines and joined again, and the text
+        is changed only once, whatever the number of lines.
+
+        :param transform_callback: callable that takes the original text of a
+                                   line, and return the new text for this line.
+        """
+        text = self.text
+
+        start = _find_line_start(text, from_row)
+        if start is None or to_row <= from_row:
+            return
+
+        end = _find_line_start(text, to_row)
+        end = len(text) if end is None else end - 1
+
+        lines = text[start:end].split('\n')
+        self.text = text[:start] + '\n'.join(map(transform_callback, lines)) + text[end:]
+
     def transform_region(self, from_, to, transform_callback):
         """
         Transform a part of the input string.
@@ -333,8 +461,9 @@ class Buffer(object):
         deleted = ''
 
         if self.cursor_position > 0:
-            deleted = self.text[self.cursor_position - count:self.cursor_position]
-            self.text = self.text[:self.cursor_position - count] + self.text[self.cursor_position:]
+            start = max(0, self.cursor_position - count)
+            deleted = self.text[start:self.cursor_position]
+            self.text = self.text[:start] + self.text[self.cursor_position:]
             self.cursor_position -= len(deleted)
 
         return deleted
@@ -344,20 +473,33 @@ class Buffer(object):
         Delete one character. Return deleted character.
         """
         if self.cursor_position < len(self.text):
-            deleted = self.document.text_after_cursor[:count]
-            self.text = self.text[:self.cursor_position] + \
-                self.text[self.cursor_position + len(deleted):]
+            pos = self.cursor_position
+            deleted = self.text[pos:pos + count]
+            self.text = self.text[:pos] + self.text[pos + len(deleted):]
             return deleted
         else:
             return ''
 
-    def join_next_line(self):
+    def join_next_line(self, count=1):
         """
         Join the next line to the current one by deleting the line ending after
-        the current line.
+        the current line. (Repeated `count` times, with only one text change.)
         """
-        self.cursor_position += self.document.get_end_of_line_position()
-        self.delete()
+        pos = self.cursor_position + self.document.get_end_of_line_position()
+        text = self.text
+
+        # The first part is the (empty) remainder of the current line.
+        parts = text[pos:].split('\n', count)
+        joined = len(parts) - 1
+
+        self.text = text[:pos] + ''.join(parts)
+
+        if joined < count:
+            # We joined everything until the last line.
+            self.cursor_position = len(self.text)
+        else:
+            # Right before the last deleted line ending.
+            self.cursor_position = pos + sum(len(p) for p in parts[1:joined])
 
     def swap_characters_before_cursor(self):
         """
@@ -664,18 +806,28 @@ class Buffer(object):
 
             self.cursor_position += self.document.get_start_of_line_position(after_whitespace=True)
 
-    def undo(self):
+    def undo(self, count=1):
         # Pop from the undo-stack until we find a text that if different from
         # the current text. (The current logic of `save_to_undo_stack` will
         # make sure that the top of the undo stack is usually the same as the
         # current text, so in that case we have to pop twice.)
-        while self._undo_stack:
-            text, pos = self._undo_stack.pop()
+        # With a count, this is repeated, but the text is only set once.
+        current_text = self.text
+        result = None
+
+        for i in range(count):
+            while self._undo_stack:
+                text, pos = self._undo_stack.pop()
+
+                if text != current_text:
+                    current_text = text
+                    result = (text, pos)
+                    break
+            else:
+                break
 
-            if text != self.text:
-                self.text = text
-                self.cursor_position = pos
-                return
+        if result:
+            self.text, self.cursor_position = result
 
     def validate(self):
         """
@@ -685,9 +837,16 @@ class Buffer(object):
 
         # Validate first. If not valid, set validation exception.
         if self.validator:
-            try:
-                self.validator.validate(self.document)
-            except ValidationError as e:
+            cache = self._validation_cache
+
+            # When this text was validated in the background already, use
+            # that result.
+            if cache and cache[0] == self.text:
+                e = cache[1]
+            else:
+                e = self.get_validation_error(self.document)
+
+            if e:
                 # Set cursor position (don't allow invalid values.)
                 cursor_position = e.index
                 self.cursor_position = min(max(0, cursor_position), len(self.text))
@@ -697,6 +856,28 @@ class Buffer(object):
 
         return True
 
+    def get_validation_error(self, document):
+        """
+        Run the validator for this document. Return the `ValidationError`, or
+        `None` when the input is valid. (This doesn't change the buffer, so it
+        can be called from another thread.)
+        """
+        try:
+            self.validator.validate(document)
+        except ValidationError as e:
+            return e
+
+    def set_validation_result(self, document, validation_error):
+        """
+        Store the result of a background validation of this document. It's
+        reused by `validate` as long as the text doesn't change, and the
+        error is shown immediately, without moving the cursor.
+        """
+        self._validation_cache = (document.text, validation_error)
+
+        if self.text == document.text:
+            self.validation_error = validation_error
+
     def add_to_history(self):  # TODO: Rename to `append_to_history`
         """
         Append the current input to the history.
@@ -794,6 +975,7 @@ class Buffer(object):
         Open code in editor.
         """
         # Write to temporary file
+        import tempfile
         descriptor, filename = tempfile.mkstemp(self.tempfile_suffix)
         os.write(descriptor, self.text.encode('utf-8'))
         os.close(descriptor)
@@ -811,6 +993,8 @@ class Buffer(object):
 
     def _open_file_in_editor(self, filename):
         """ Call editor executable. """
+        import subprocess
+
         # If the 'EDITOR' environment variable has been set, use that one.
         # Otherwise, fall back to the first available editor that we can find.
         editor = os.environ.get('EDITOR')
@@ -837,17 +1021,43 @@ class Buffer(object):
                     pass
 
 
+def _find_line_start(text, row):
+    """
+    Return the index of the first character of line `row` in `text`, or
+    `None` when the text doesn't have that many lines.
+    """
+    index = 0
+
+    for _ in range(row):
+        index = text.find('\n', index)
+
+        if index == -1:
+            return None
+        index += 1
+
+    return index
+
+
+def _move_cursor_to_start_of_line(buffer, row):
+    """
+    Move the cursor to the first non whitespace character of line `row`.
+    """
+    text = buffer.text
+    index = _find_line_start(text, row) or 0
+    line = text[index:].split('\n', 1)[0]
+
+    buffer.cursor_position = index + len(line) - len(line.lstrip())
+
+
 def indent(buffer, from_row, to_row, count=1):
     """
     Indent text of the `Buffer` object.
     """
     current_row = buffer.document.cursor_position_row
-    line_range = range(from_row, to_row)
 
-    buffer.transform_lines(line_range, lambda l: '    ' * count + l)
+    buffer.transform_line_range(from_row, to_row, lambda l: '    ' * count + l)
 
-    buffer.cursor_position = buffer.document.translate_row_col_to_index(current_row, 0)
-    buffer.cursor_position += buffer.document.get_start_of_line_position(after_whitespace=True)
+    _move_cursor_to_start_of_line(buffer, current_row)
 
 
 def unindent(buffer, from_row, to_row, count=1):
@@ -855,7 +1065,6 @@ def unindent(buffer, from_row, to_row, count=1):
     Unindent text of the `Buffer` object.
     """
     current_row = buffer.document.cursor_position_row
-    line_range = range(from_row, to_row)
 
     def transform(text):
         remove = '    ' * count
@@ -864,7 +1073,6 @@ def unindent(buffer, from_row, to_row, count=1):
         else:
             return text.lstrip()
 
-    buffer.transform_lines(line_range, transform)
+    buffer.transform_line_range(from_row, to_row, transform)
 
-    buffer.cursor_position = buffer.document.translate_row_col_to_index(current_row, 0)
-    buffer.cursor_position += buffer.document.get_start_of_line_position(after_whitespace=True)
+    _move_cursor_to_start_of_line(buffer, current_row)
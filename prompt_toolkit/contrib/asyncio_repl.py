@@ -0,0 +1,36 @@
+"""
+Asyncio support for the Python REPL.
+
+This module uses `async def` syntax and requires Python 3.5 or later. It's
+only imported when the REPL is used as an asyncio coroutine.
+"""
+from __future__ import unicode_literals
+
+from prompt_toolkit import AbortAction, Exit
+from prompt_toolkit.utils import DummyContext
+
+__all__ = (
+    'asyncio_start_repl',
+)
+
+
+async def asyncio_start_repl(repl, patch_context=None):
+    """
+    Run a Read-Eval-print Loop for this
+    :class:`~prompt_toolkit.contrib.repl.PythonRepl` until Exit.
+
+    :param patch_context: Context manager that's active while the REPL runs.
+        (E.g. for patching stdout.)
+    """
+    with (patch_context or DummyContext()):
+        try:
+            while True:
+                # Read
+                document = await repl.read_input_async(
+                    on_abort=AbortAction.RETRY,
+                    on_exit=AbortAction.RAISE_EXCEPTION)
+                repl._process_document(document)
+        except Exit:
+            pass
+        finally:
+            repl.close()
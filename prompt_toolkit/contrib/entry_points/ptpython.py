@@ -4,7 +4,7 @@ ptpython: Interactive Python shell.
 Usage:
     ptpython [ --vi ] [ --history=<filename> ] [ --no-colors ]
              [ --autocompletion=<type> ] [ --always-multiline ]
-             [ --interactive=<filename> ] [--] [ <file> <arg>... ]
+             [ --worker-process ] [ --interactive=<filename> ] [--] [ <file> <arg>... ]
     ptpython -h | --help
 
 Options:
@@ -13,6 +13,8 @@ Options:
     --autocompletion=<type>  : Type of autocompletion. This can be 'popup-menu'
                                or 'horizontal-menu'.
     --always-multiline       : Always enable multiline mode.
+    --worker-process         : Run the code analysis for completions in a
+                               separate process.
     --interactive=<filename> : Start interactive shell after executing this file.
 
 Other environment variables:
@@ -54,6 +56,9 @@ def run():
     # Always multiline
     always_multiline = bool(a['--always-multiline'])
 
+    # Worker process
+    use_worker_process = bool(a['--worker-process'])
+
     # Startup path
     startup_paths = []
     if 'PYTHONSTARTUP' in os.environ:
@@ -74,7 +79,8 @@ def run():
         # Run interactive shell.
         embed(globals_, locals_, vi_mode=vi_mode, history_filename=history_filename,
               no_colors=no_colors, autocompletion_style=autocompletion_style,
-              startup_paths=startup_paths, always_multiline=always_multiline)
+              startup_paths=startup_paths, always_multiline=always_multiline,
+              use_worker_process=use_worker_process)
 
 if __name__ == '__main__':
     run()
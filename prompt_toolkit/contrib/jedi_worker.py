@@ -0,0 +1,455 @@
+"""
+Run the jedi analysis for the Python REPL in a separate worker process.
+
+Jedi can be slow on large libraries. When it runs in a thread of the REPL
+process, it competes for the GIL with the event loop and the key handling.
+`JediWorker` offers the same interface as
+:class:`~prompt_toolkit.contrib.python_input.JediScriptCache`, but sends the
+requests over a pipe to a child process.
+
+The child process can't see the objects in the REPL namespace. Instead, it
+receives a description of the namespace (which names are modules, classes,
+functions or instances of a certain class) and turns that into import
+statements that are prepended to the source code for static analysis. (Objects
+that were defined in the REPL itself are described by stub definitions.)
+
+Only the most recent request of each kind is processed by the worker. Older
+requests that are still waiting in the pipe are answered with `None`
+(cancelled) without doing any work.
+"""
+from __future__ import unicode_literals
+
+from prompt_toolkit.completion import Completion
+
+import inspect
+import itertools
+import multiprocessing
+import re
+import threading
+
+__all__ = (
+    'JediWorker',
+    'Signature',
+    'describe_namespace',
+)
+
+
+_identifier_re = re.compile(r'^[a-zA-Z_][a-zA-Z0-9_]*$')
+
+
+class Signature(object):
+    """
+    Picklable version of a jedi call signature. (It has the attributes that
+    the `SignatureToolbar` uses.)
+    """
+    def __init__(self, full_name, params, index):
+        self.full_name = full_name
+        self.params = [_Parameter(p) for p in params]
+        self.index = index
+
+
+class _Parameter(object):
+    def __init__(self, name):
+        self.name = name
+
+
+def describe_namespace(namespace):
+    """
+    Return a picklable description of this namespace, as a list of
+    (name, kind, module, qualified_name) tuples, where kind is one of
+    'module', 'object' (class or function), 'instance' and 'source'.
+
+    Objects that are defined in `__main__` (like the functions and classes
+    that were typed in the REPL) can't be imported by the worker. For them,
+    the kind is 'source', and the last item is the Python source code of a
+    stub definition.
+    """
+    result = []
+
+    for name, value in list(namespace.items()):
+        if not _identifier_re.match(name):
+            continue
+
+        try:
+            if inspect.ismodule(value):
+                result.append((name, 'module', value.__name__, None))
+
+            elif inspect.isclass(value) or inspect.isfunction(value):
+                if value.__module__ == '__main__':
+                    result.append((name, 'source', None, _create_stub(name, value)))
+                else:
+                    result.append((name, 'object', value.__module__, value.__name__))
+
+            else:
+                cls = type(value)
+
+                if cls.__module__ == '__main__':
+                    result.append((name, 'source', None, '%s\n%s = _%s_type()' % (
+                        _create_stub('_%s_type' % name, cls), name, name)))
+                else:
+                    result.append((name, 'instance', cls.__module__, cls.__name__))
+        except AttributeError:
+            # Objects with an unusual `__getattr__`. Leave them out.
+            pass
+
+    return result
+
+
+def _get_parameters(func):
+    """
+    Return the parameter list of this function as Python source code. (The
+    default values are replaced by `None`.)
+    """
+    getargspec = getattr(inspect, 'getfullargspec', None) or inspect.getargspec  # (Python 2.)
+
+    try:
+        spec = getargspec(func)
+    except TypeError:
+        return '*args, **kwargs'
+
+    defaults = spec.defaults or ()
+    result = list(spec.args[:len(spec.args) - len(defaults)])
+    result.extend('%s=None' % a for a in spec.args[len(spec.args) - len(defaults):])
+
+    if spec.varargs:
+        result.append('*%s' % spec.varargs)
+
+    kwonlyargs = getattr(spec, 'kwonlyargs', None)
+    if kwonlyargs:
+        if not spec.varargs:
+            result.append('*')
+        result.extend('%s=None' % a for a in kwonlyargs)
+
+    varkw = getattr(spec, 'varkw', None) or getattr(spec, 'keywords', None)
+    if varkw:
+        result.append('**%s' % varkw)
+
+    return ', '.join(result)
+
+
+def _create_stub(name, value):
+    """
+    Return Python source code that defines a function or class with the same
+    signature or attributes as `value`.
+    """
+    if inspect.isfunction(value):
+        return 'def %s(%s):\n    pass' % (name, _get_parameters(value))
+
+    lines = ['class %s(object):' % name]
+
+    for attr, attr_value in sorted(vars(value).items()):
+        if not _identifier_re.match(attr):
+            continue
+
+        if inspect.isfunction(attr_value):
+            lines.append('    def %s(%s):\n        pass' % (attr, _get_parameters(attr_value)))
+        elif not attr.startswith('__'):
+            lines.append('    %s = None' % attr)
+
+    lines.append('    pass')
+    return '\n'.join(lines)
+
+
+def _create_preamble(description):
+    """
+    Turn the namespace description into Python source code that defines the
+    same names, for static analysis.
+    """
+    blocks = []
+
+    for name, kind, module, qualname in description:
+        if kind == 'source':
+            blocks.append(qualname)
+        elif module in (None, '__main__'):
+            continue
+        elif kind == 'module':
+            blocks.append('import %s as %s' % (module, name))
+        elif kind == 'object':
+            blocks.append('from %s import %s as %s' % (module, qualname, name))
+        else:
+            blocks.append('from %s import %s as _%s_type\n%s = _%s_type()' % (
+                module, qualname, name, name, name))
+
+    # Put the definitions in try blocks, so that one failing import doesn't
+    # stop the analysis of the others.
+    return ''.join('try:\n%s\nexcept Exception:\n    pass\n' %
+                   '\n'.join('    ' + l for l in block.split('\n')) for block in blocks)
+
+
+def _create_jedi_handler():
+    """
+    Return the function that handles the requests in the worker process.
+    """
+    import jedi
+    from prompt_toolkit.contrib.python_input import get_jedi_completions, get_jedi_signatures
+
+    def handle(kind, preamble, text, line, column):
+        script = jedi.Script(preamble + text, line + preamble.count('\n'), column, 'input-text')
+
+        if kind == 'completions':
+            return [(c.text, c.start_position) for c in get_jedi_completions(script)]
+        else:
+            return [Signature(s.full_name, [str(p.name) for p in s.params], s.index)
+                    for s in get_jedi_signatures(script)]
+    return handle
+
+
+def _worker_main(connection, handle=None):
+    """
+    Main loop of the worker process.
+
+    :param handle: (optional) Callable that takes (kind, preamble, text, line,
+        column) and returns the result of a request. By default, this runs
+        jedi.
+    """
+    try:
+        if handle is None:
+            handle = _create_jedi_handler()
+
+        preamble = ''
+
+        while True:
+            try:
+                messages = [connection.recv()]
+
+                # Take all the other pending messages as well.
+                while connection.poll():
+                    messages.append(connection.recv())
+            except (EOFError, IOError):
+                return
+
+            # Keep only the most recent request of each kind, cancel the others.
+            latest = {}
+
+            for message in messages:
+                if message[0] == 'close':
+                    return
+
+                elif message[0] == 'namespace':
+                    preamble = _create_preamble(message[1])
+                else:
+                    kind, request_id = message[:2]
+
+                    if kind in latest:
+                        connection.send((latest[kind][1], None))
+                    latest[kind] = message
+
+            for kind, request_id, text, line, column in latest.values():
+                # A request that fails (because of a bug in jedi) shouldn't
+                # stop the worker.
+                try:
+                    result = handle(kind, preamble, text, line, column)
+                except Exception:
+                    result = []
+
+                connection.send((request_id, result))
+    finally:
+        connection.close()
+
+
+class JediWorker(object):
+    """
+    Client for the jedi worker process. The process is started on the first
+    request, and started again when it died. When it keeps dying, jedi runs
+    in the REPL process instead, through a `JediScriptCache`.
+    """
+    #: How many times the worker is started again, before falling back to a
+    #: `JediScriptCache`.
+    max_restarts = 3
+
+    #: Seconds to wait for the result of a request. A worker that takes
+    #: longer is considered hanging, and is killed.
+    request_timeout = 10
+
+    def __init__(self, get_globals, get_locals):
+        self.get_globals = get_globals
+        self.get_locals = get_locals
+
+        self._connection = None
+        self._process = None
+        self._send_lock = threading.Lock()
+        self._counter = itertools.count()
+        self._namespaces_sent = False
+        self._starts = 0
+        self._fallback = None
+
+        #: Maps request ids to [threading.Event, result, connection] lists.
+        #: (Only modified with `_pending_lock` held.)
+        self._pending = {}
+        self._pending_lock = threading.Lock()
+
+        #: The connection of which the worker died most recently.
+        self._dead_connection = None
+
+    def _start(self):
+        if self._process is not None:
+            # The previous worker died.
+            self._connection.close()
+            self._process.join(1)
+
+        connection, child_connection = multiprocessing.Pipe()
+
+        self._process = self._start_process(child_connection)
+        self._connection = connection
+        self._namespaces_sent = False
+        self._starts += 1
+
+        # Thread that dispatches the responses to the waiting requests.
+        t = threading.Thread(target=self._read_responses, args=(connection, ))
+        t.daemon = True
+        t.start()
+
+    def _start_process(self, child_connection):
+        """
+        Start the worker for this end of the pipe and return the process.
+        """
+        process = multiprocessing.Process(target=_worker_main, args=(child_connection, ))
+        process.daemon = True
+        process.start()
+        child_connection.close()
+        return process
+
+    def _is_running(self):
+        return (self._process is not None and
+                self._dead_connection is not self._connection and
+                self._process.is_alive())
+
+    def _read_responses(self, connection):
+        while True:
+            try:
+                request_id, result = connection.recv()
+            except (EOFError, IOError, OSError, TypeError):
+                # (TypeError: the connection of a hanging worker was closed
+                # by `_start`, while we were still reading from it.)
+                break
+
+            with self._pending_lock:
+                pending = self._pending.pop(request_id, None)
+
+            if pending:
+                pending[1] = result
+                pending[0].set()
+
+        # The worker died. Release the requests that were waiting for it.
+        self._release_requests(connection)
+
+    def _release_requests(self, connection):
+        """
+        Mark this connection as dead, and release the requests that are
+        waiting for a result from it.
+        """
+        with self._pending_lock:
+            self._dead_connection = connection
+
+            for request_id, pending in list(self._pending.items()):
+                if pending[2] is connection:
+                    del self._pending[request_id]
+                    pending[0].set()
+
+    def _request(self, kind, document):
+        """
+        Send request and wait for the result. Returns `None` when the request
+        was cancelled because a newer one arrived, or when the worker died or
+        didn't answer in time.
+        """
+        request_id = next(self._counter)
+        pending = [threading.Event(), None, None]
+
+        with self._send_lock:
+            if not self._is_running():
+                if self._starts > self.max_restarts:
+                    # (Imported here, because python_input imports this module.)
+                    from prompt_toolkit.contrib.python_input import JediScriptCache
+                    self._fallback = JediScriptCache(self.get_globals, self.get_locals)
+                    return None
+
+                self._start()
+
+            connection = self._connection
+            pending[2] = connection
+
+            with self._pending_lock:
+                if self._dead_connection is connection:
+                    return None
+                self._pending[request_id] = pending
+
+            try:
+                if not self._namespaces_sent:
+                    namespace = dict(self.get_globals())
+                    namespace.update(self.get_locals())
+                    connection.send(('namespace', describe_namespace(namespace)))
+                    self._namespaces_sent = True
+
+                connection.send((kind, request_id, document.text,
+                                 document.cursor_position_row + 1,
+                                 document.cursor_position_col))
+            except (IOError, OSError, ValueError):
+                with self._pending_lock:
+                    self._pending.pop(request_id, None)
+                return None
+
+        if not pending[0].wait(self.request_timeout):
+            # The worker hangs. Kill it, the next request starts a new one.
+            self._kill(connection)
+            return None
+
+        return pending[1]
+
+    def _kill(self, connection):
+        """
+        Kill the worker of this connection, and release the requests that are
+        waiting for it.
+        """
+        self._release_requests(connection)
+
+        with self._send_lock:
+            if self._connection is connection and self._process is not None:
+                # (In the tests, the worker is a thread, which can't be killed.)
+                terminate = getattr(self._process, 'terminate', None)
+                if terminate:
+                    terminate()
+
+    def get_completions(self, document):
+        """
+        Return a list of `Completion` instances for this document.
+        """
+        if self._fallback is not None:
+            return self._fallback.get_completions(document)
+
+        return [Completion(text, start_position, display=text)
+                for text, start_position in self._request('completions', document) or []]
+
+    def get_signatures(self, document):
+        """
+        Return a list of :class:`Signature` instances for this document.
+        """
+        if self._fallback is not None:
+            return self._fallback.get_signatures(document)
+
+        return self._request('signatures', document) or []
+
+    def reset_namespaces(self):
+        """
+        Send the namespaces again before the next request.
+        """
+        self._namespaces_sent = False
+
+        if self._fallback is not None:
+            self._fallback.reset_namespaces()
+
+    def close(self):
+        """
+        Stop the worker process.
+        """
+        with self._send_lock:
+            if self._process is not None:
+                # (Don't rely on the pipe being closed. After a fork, the child
+                # process can hold a copy of our end.)
+                try:
+                    self._connection.send(('close', ))
+                except (IOError, OSError, ValueError):
+                    pass  # The worker died already.
+
+                self._connection.close()
+                self._process.join(1)
+                self._process = None
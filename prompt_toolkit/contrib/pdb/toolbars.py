@@ -66,6 +66,10 @@ class PdbStatusToolbar(Toolbar):
         token = token or Token.Toolbar.Status
         super(PdbStatusToolbar, self).__init__(token=token)
 
+    def get_state_key(self, cli):
+        pdb = self._pdb_ref()
+        return (pdb.curframe, pdb.curframe.f_lineno)
+
     def get_tokens(self, cli, width):
         result = []
         append = result.append
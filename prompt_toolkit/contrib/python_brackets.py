@@ -0,0 +1,196 @@
+"""
+Incremental tracking of the bracket and string state of Python code.
+
+The multiline detection, the Enter key binding and the brackets mismatch
+highlighting all need to know which brackets are still open and whether we are
+inside a string. Instead of rescanning the whole input for each of them on
+every key press, the :class:`BracketTracker` caches the state at the start of
+every line and only rescans the lines starting from the first one that
+changed.
+"""
+from __future__ import unicode_literals
+import re
+
+__all__ = (
+    'BracketTracker',
+)
+
+
+# Everything that can change the state while we're not inside a string.
+_CODE_RE = re.compile(r'''(\#)|(\'\'\'|"""|'|")|([()\[\]{}])''')
+
+_CLOSING_TO_OPENING = {')': '(', ']': '[', '}': '{'}
+
+
+class _LineState(object):
+    """
+    State at the start of a line.
+
+    :param stack: Linked list of open brackets. `None` or a
+        (bracket, index, parent_stack) tuple.
+    :param quote: The string delimiter, if the line starts inside a string.
+    """
+    __slots__ = ('stack', 'quote')
+
+    def __init__(self, stack=None, quote=None):
+        self.stack = stack
+        self.quote = quote
+
+
+def _find_closing_quote(line, pos, quote):
+    """
+    Return the index after the closing quote, or `None` when the string is not
+    closed on this line.
+    """
+    while True:
+        i = line.find(quote, pos)
+
+        if i == -1:
+            return None
+
+        # Count the backslashes in front of the quote.
+        backslashes = 0
+        while i - backslashes > 0 and line[i - backslashes - 1] == '\\':
+            backslashes += 1
+
+        if backslashes % 2 == 0:
+            return i + len(quote)
+        else:
+            pos = i + 1
+
+
+def _scan_line(line, offset, state):
+    """
+    Scan one line of code.
+
+    :param line: The text of the line, without newline.
+    :param offset: Index of the start of this line in the text.
+    :param state: :class:`_LineState` at the start of this line.
+    :returns: (new_state, errors) tuple. `errors` is a list of indexes of
+        closing brackets that don't match.
+    """
+    stack = state.stack
+    quote = state.quote
+    errors = []
+    pos = 0
+
+    while True:
+        if quote:
+            end = _find_closing_quote(line, pos, quote)
+
+            if end is None:
+                # Triple quoted strings, and strings with a line continuation
+                # at the end, continue on the next line.
+                if len(quote) == 3 or line.endswith('\\'):
+                    return _LineState(stack, quote), errors
+                else:
+                    return _LineState(stack), errors
+
+            pos = end
+            quote = None
+
+        m = _CODE_RE.search(line, pos)
+
+        if not m or m.group(1):
+            # End of line or start of a comment.
+            return _LineState(stack), errors
+
+        elif m.group(2):
+            quote = m.group(2)
+
+        else:
+            c = m.group(3)
+
+            if c in '([{':
+                stack = (c, offset + m.start(), stack)
+            elif stack and stack[0] == _CLOSING_TO_OPENING[c]:
+                stack = stack[2]
+            else:
+                errors.append(offset + m.start())
+
+        pos = m.end()
+
+
+class BracketTracker(object):
+    """
+    Incremental bracket and string state tracker for Python code.
+
+    All the queries take the full text as input. When the text is different
+    from the previous query, only the lines from the first changed line
+    onwards are scanned again.
+    """
+    def __init__(self):
+        self._lines = ['']
+
+        #: The state at the start of each line, plus the state at the end.
+        self._line_states = [_LineState(), _LineState()]
+
+        #: For each line, the indexes of the closing brackets that don't
+        #: match.
+        self._line_errors = [[]]
+
+        self._text = ''
+
+    def _update(self, text):
+        if text == self._text:
+            return
+
+        lines = text.split('\n')
+        old_lines = self._lines
+
+        # Find the first line that changed.
+        count = min(len(lines), len(old_lines))
+        first_changed = 0
+        while first_changed < count and lines[first_changed] == old_lines[first_changed]:
+            first_changed += 1
+
+        # Offset of the first changed line.
+        offset = sum(map(len, lines[:first_changed])) + first_changed
+
+        line_states = self._line_states[:first_changed + 1]
+        line_errors = self._line_errors[:first_changed]
+        state = line_states[-1]
+
+        for line in lines[first_changed:]:
+            state, errors = _scan_line(line, offset, state)
+            line_states.append(state)
+            line_errors.append(errors)
+            offset += len(line) + 1
+
+        self._text = text
+        self._lines = lines
+        self._line_states = line_states
+        self._line_errors = line_errors
+
+    def has_unclosed_brackets(self, text):
+        """
+        True when `text` contains opening brackets that were not closed.
+        """
+        self._update(text)
+        return self._line_states[-1].stack is not None
+
+    def ends_in_multiline_string(self, text):
+        """
+        True when `text` ends inside a triple quoted string.
+        """
+        self._update(text)
+        quote = self._line_states[-1].quote
+        return bool(quote) and len(quote) == 3
+
+    def get_error_positions(self, text):
+        """
+        Return the set of indexes of all the closing brackets that don't
+        match, and all the opening brackets that were never closed.
+        """
+        self._update(text)
+
+        result = set()
+        for errors in self._line_errors:
+            result.update(errors)
+
+        stack = self._line_states[-1].stack
+        while stack:
+            result.add(stack[1])
+            stack = stack[2]
+
+        return result
@@ -33,13 +33,15 @@ from prompt_toolkit.validation import Validator, ValidationError
 from .regular_languages.compiler import compile as compile_grammar
 from .regular_languages.completion import GrammarCompleter
 from .completers import PathCompleter
+from .python_brackets import BracketTracker
+from .jedi_worker import JediWorker
 
 import prompt_toolkit.filters as filters
 
-import jedi
 import platform
 import re
 import sys
+import threading
 
 
 __all__ = (
@@ -141,31 +143,15 @@ class PythonStyle(Style):
     }
 
 
-def _has_unclosed_brackets(text):
+def _has_unclosed_brackets(text, bracket_tracker=None):
     """
-    Starting at the end of the string. If we find an opening bracket
-    for which we didn't had a closing one yet, return True.
-    """
-    stack = []
-
-    # Ignore braces inside strings
-    text = re.sub(r'''('[^']*'|"[^"]*")''', '', text)  # XXX: handle escaped quotes.!
-
-    for c in reversed(text):
-        if c in '])}':
-            stack.append(c)
-
-        elif c in '[({':
-            if stack:
-                if ((c == '[' and stack[-1] == ']') or
-                        (c == '{' and stack[-1] == '}') or
-                        (c == '(' and stack[-1] == ')')):
-                    stack.pop()
-            else:
-                # Opening bracket for which we didn't had a closing one.
-                return True
+    True when the text contains an opening bracket for which we didn't had
+    a closing one yet.
 
-    return False
+    :param bracket_tracker: (optional) :class:`BracketTracker` which is
+        reused between calls.
+    """
+    return (bracket_tracker or BracketTracker()).has_unclosed_brackets(text)
 
 
 def load_python_bindings(key_bindings_manager, settings, always_multiline=False):
@@ -203,9 +189,10 @@ def load_python_bindings(key_bindings_manager, settings, always_multiline=False)
         """
         buffer = event.cli.buffers['default']
 
-        buffer.text = buffer._working_lines[buffer.working_index - 1] + '\n' + buffer.text
-        buffer._working_lines = buffer._working_lines[:buffer.working_index - 1] + buffer._working_lines[buffer.working_index:]
-        buffer.working_index -= 1
+        if buffer.working_index > 0:
+            buffer.text = buffer._working_lines[buffer.working_index - 1] + '\n' + buffer.text
+            del buffer._working_lines[buffer.working_index - 1]
+            buffer.working_index -= 1
 
     @handle(Keys.Tab, filter= ~has_selection)
     def _(event):
@@ -268,6 +255,13 @@ class PythonBuffer(Buffer):
     """
     Custom `Buffer` class with some helper functions.
     """
+    def __init__(self, *a, **kw):
+        #: Bracket/string state of the text. (Shared by the multiline
+        #: detection and the brackets mismatch highlighting.)
+        self.bracket_tracker = BracketTracker()
+
+        super(PythonBuffer, self).__init__(*a, **kw)
+
     def reset(self, *a, **kw):
         super(PythonBuffer, self).reset(*a, **kw)
 
@@ -275,33 +269,22 @@ class PythonBuffer(Buffer):
         self.signatures = []
 
 
-_multiline_string_delims = re.compile('''[']{3}|["]{3}''')
-
-
-def document_is_multiline_python(document):
+def document_is_multiline_python(document, bracket_tracker=None):
     """
     Determine whether this is a multiline Python document.
+
+    :param bracket_tracker: (optional) :class:`BracketTracker` which is
+        reused between calls.
     """
-    def ends_in_multiline_string():
-        """
-        ``True`` if we're inside a multiline string at the end of the text.
-        """
-        delims = _multiline_string_delims.findall(document.text)
-        opening = None
-        for delim in delims:
-            if opening is None:
-                opening = delim
-            elif delim == opening:
-                opening = None
-        return bool(opening)
-
-    if '\n' in document.text or ends_in_multiline_string():
+    bracket_tracker = bracket_tracker or BracketTracker()
+
+    if '\n' in document.text or bracket_tracker.ends_in_multiline_string(document.text):
         return True
 
     # If we just typed a colon, or still have open brackets, always insert a real newline.
     if document.text_before_cursor.rstrip()[-1:] == ':' or \
             (document.is_cursor_at_the_end and
-             _has_unclosed_brackets(document.text_before_cursor)) or \
+             bracket_tracker.has_unclosed_brackets(document.text_before_cursor)) or \
             document.text.startswith('@'):
         return True
 
@@ -313,10 +296,44 @@ def document_is_multiline_python(document):
     return False
 
 
+class PythonBracketsMismatchProcessor(BracketsMismatchProcessor):
+    """
+    Like :class:`BracketsMismatchProcessor`, but takes the positions of the
+    mismatches from the :class:`BracketTracker` of the Python buffer.
+    (Which only rescans the lines that changed.)
+    """
+    def __init__(self, bracket_tracker):
+        self.bracket_tracker = bracket_tracker
+
+    def process_tokens(self, tokens):
+        text = ''.join(t for _, t in tokens)
+        error_positions = self.bracket_tracker.get_error_positions(text)
+
+        if not error_positions:
+            return tokens
+
+        result = []
+        index = 0
+
+        for token, text in tokens:
+            # Brackets are always single character tokens.
+            if index in error_positions and len(text) == 1:
+                result.append((self.error_token, text))
+            else:
+                result.append((token, text))
+            index += len(text)
+
+        return result
+
+
 class SignatureToolbar(Toolbar):
     def is_visible(self, cli):
         return super(SignatureToolbar, self).is_visible(cli) and bool(cli.buffers['default'].signatures)
 
+    def get_state_key(self, cli):
+        # (A new list is assigned when the signatures change.)
+        return cli.buffers['default'].signatures
+
     def get_tokens(self, cli, width):
         result = []
         append = result.append
@@ -395,6 +412,36 @@ class PythonToolbar(Toolbar):
         token = token or Token.Toolbar.Status
         super(PythonToolbar, self).__init__(token=token)
 
+    def _multiline_state(self, cli):
+        """
+        Return the (multiline, buffer_is_multiline) flags, as displayed in
+        the toolbar. (Both depend on the text and the cursor position.)
+        """
+        buffer = cli.buffers['default']
+
+        if self.settings.always_multiline:
+            multiline = None
+        else:
+            bracket_tracker = buffer.bracket_tracker if isinstance(buffer, PythonBuffer) else None
+            multiline = self.settings.currently_multiline or \
+                document_is_multiline_python(buffer.document, bracket_tracker)
+
+        return multiline, buffer.is_multiline
+
+    def get_state_key(self, cli):
+        buffer = cli.buffers['default']
+        settings = self.settings
+
+        # (The multiline state is only computed when the key changes. It
+        # depends on the settings, the text and the cursor position.)
+        return (self.key_bindings_manager.enable_vi_mode,
+                self.key_bindings_manager.vi_state.input_mode,
+                buffer.selection_state and buffer.selection_state.type,
+                buffer.working_index, len(buffer._working_lines),
+                cli.focus_stack.current, settings.paste_mode,
+                settings.always_multiline, settings.currently_multiline,
+                buffer.text, buffer.cursor_position)
+
     def get_tokens(self, cli, width):
         TB = self.token
         result = []
@@ -419,14 +466,15 @@ class PythonToolbar(Toolbar):
             else:
                 append((TB.Off, '[F6] Paste mode (off) '))
 
-            if not self.settings.always_multiline:
-                if self.settings.currently_multiline or \
-                        document_is_multiline_python(cli.buffers['default'].document):
+            multiline, buffer_is_multiline = self._multiline_state(cli)
+
+            if multiline is not None:
+                if multiline:
                     append((TB.On, '[F7] Multiline (on)'))
                 else:
                     append((TB.Off, '[F7] Multiline (off)'))
 
-            if cli.buffers['default'].is_multiline:
+            if buffer_is_multiline:
                 append((TB, ' [Meta+Enter] Execute'))
 
             # Python version
@@ -482,6 +530,9 @@ class PythonValidator(Validator):
 
 
 def get_jedi_script_from_document(document, locals, globals):
+    # Importing jedi is slow, do it on the first use.
+    import jedi
+
     try:
         return jedi.Interpreter(
             document.text,
@@ -506,13 +557,145 @@ def get_jedi_script_from_document(document, locals, globals):
         return None
 
 
+def get_jedi_completions(script):
+    """
+    Return a list of `Completion` instances for this jedi script.
+    """
+    try:
+        completions = script.completions()
+    except TypeError:
+        # Issue #9: bad syntax causes completions() to fail in jedi.
+        # https://github.com/jonathanslenders/python-prompt-toolkit/issues/9
+        return []
+    except UnicodeDecodeError:
+        # Issue #43: UnicodeDecodeError on OpenBSD
+        # https://github.com/jonathanslenders/python-prompt-toolkit/issues/43
+        return []
+    except AttributeError:
+        # Jedi issue #513: https://github.com/davidhalter/jedi/issues/513
+        return []
+
+    return [Completion(c.name_with_symbols, len(c.complete) - len(c.name_with_symbols),
+                       display=c.name_with_symbols) for c in completions]
+
+
+def get_jedi_signatures(script):
+    """
+    Return the call signatures for this jedi script.
+    """
+    try:
+        return script.call_signatures()
+    except ValueError:
+        # e.g. in case of an invalid \\x escape.
+        return []
+    except Exception:
+        # Sometimes we still get an exception (TypeError), because
+        # of probably bugs in jedi. We can silence them.
+        # See: https://github.com/davidhalter/jedi/issues/492
+        return []
+
+
+class JediScriptCache(object):
+    """
+    Cache for the `jedi.Interpreter` of the current document.
+
+    Completion and the call signatures are requested for the same document
+    from different threads. This makes sure that they share one script. The
+    namespaces are only retrieved once, until `reset_namespaces` is called.
+    (That is when the REPL can have executed new code.)
+
+    :param create_script: (optional) Callable that takes (document, locals,
+        globals) and returns the jedi script.
+    """
+    def __init__(self, get_globals, get_locals, create_script=None):
+        self.get_globals = get_globals
+        self.get_locals = get_locals
+        self.create_script = create_script or get_jedi_script_from_document
+
+        #: Lock to be held while calling into the shared jedi script. (Jedi is
+        #: not thread safe.)
+        self.lock = threading.RLock()
+
+        self._namespaces = None  # (locals, globals) tuple.
+        self._last = None  # (text, cursor_position, script) tuple.
+
+    def get_script(self, document):
+        """
+        Return the jedi script for this document, or `None`.
+        """
+        with self.lock:
+            last = self._last
+
+            if last and last[0] == document.text and last[1] == document.cursor_position:
+                return last[2]
+
+            if self._namespaces is None:
+                self._namespaces = (self.get_locals(), self.get_globals())
+
+            script = self.create_script(document, *self._namespaces)
+            self._last = (document.text, document.cursor_position, script)
+            return script
+
+    def get_completions(self, document):
+        """
+        Return a list of `Completion` instances for this document.
+        """
+        with self.lock:
+            script = self.get_script(document)
+            return get_jedi_completions(script) if script else []
+
+    def get_signatures(self, document):
+        """
+        Return the call signatures for this document.
+        """
+        with self.lock:
+            script = self.get_script(document)
+            return get_jedi_signatures(script) if script else []
+
+    def reset_namespaces(self):
+        """
+        Forget the namespaces and the last script.
+        """
+        with self.lock:
+            self._namespaces = None
+            self._last = None
+
+    def close(self):
+        """
+        (Nothing to release. This is for compatibility with the
+        :class:`~prompt_toolkit.contrib.jedi_worker.JediWorker`.)
+        """
+
+
+def create_jedi_backend(get_globals, get_locals, use_worker_process=False):
+    """
+    Create the backend that runs jedi for completion and signatures.
+
+    :param use_worker_process: When True, run the jedi analysis in a separate
+        process, instead of in a thread of the REPL process.
+    """
+    if use_worker_process:
+        return JediWorker(get_globals, get_locals)
+    else:
+        return JediScriptCache(get_globals, get_locals)
+
+
 class PythonCompleter(Completer):
-    def __init__(self, get_globals, get_locals):
+    """
+    Completer for Python code.
+
+    :param use_worker_process: When True, run the jedi analysis in a separate
+        process, instead of in a thread of the REPL process.
+    """
+    def __init__(self, get_globals, get_locals, use_worker_process=False):
         super(PythonCompleter, self).__init__()
 
         self.get_globals = get_globals
         self.get_locals = get_locals
 
+        #: Backend that runs jedi. (Can be shared with the signature toolbar.)
+        self.jedi_backend = create_jedi_backend(get_globals, get_locals, use_worker_process)
+
         self._path_completer_grammar, self._path_completer = self._create_path_completer()
 
     def _create_path_completer(self):
@@ -581,26 +764,8 @@ class PythonCompleter(Completer):
 
         # Do Jedi Python completions.
         if complete_event.completion_requested or self._complete_python_while_typing(document):
-            script = get_jedi_script_from_document(document, self.get_locals(), self.get_globals())
-
-            if script:
-                try:
-                    completions = script.completions()
-                except TypeError:
-                    # Issue #9: bad syntax causes completions() to fail in jedi.
-                    # https://github.com/jonathanslenders/python-prompt-toolkit/issues/9
-                    pass
-                except UnicodeDecodeError:
-                    # Issue #43: UnicodeDecodeError on OpenBSD
-                    # https://github.com/jonathanslenders/python-prompt-toolkit/issues/43
-                    pass
-                except AttributeError:
-                    # Jedi issue #513: https://github.com/davidhalter/jedi/issues/513
-                    pass
-                else:
-                    for c in completions:
-                        yield Completion(c.name_with_symbols, len(c.complete) - len(c.name_with_symbols),
-                                         display=c.name_with_symbols)
+            for c in self.jedi_backend.get_completions(document):
+                yield c
 
 
 class PythonCLISettings(object):
@@ -626,6 +791,8 @@ class PythonCommandLineInterface(CommandLineInterface):
                  style=PythonStyle,
                  autocompletion_style=AutoCompletionStyle.POPUP_MENU,
                  always_multiline=False,
+                 use_worker_process=False,
+                 validate_while_typing=False,
 
                  # For internal use.
                  _left_margin=None,
@@ -638,7 +805,13 @@ class PythonCommandLineInterface(CommandLineInterface):
         self.get_locals = get_locals or self.get_globals
 
         left_margin = _left_margin or PythonLeftMargin()
-        self.completer = _completer or PythonCompleter(self.get_globals, self.get_locals)
+        self.completer = _completer or PythonCompleter(self.get_globals, self.get_locals,
+                                                       use_worker_process=use_worker_process)
+
+        #: The jedi backend, shared between completion and signatures. (A
+        #: custom completer doesn't need to have one.)
+        self.jedi_backend = getattr(self.completer, 'jedi_backend', None) or \
+            create_jedi_backend(self.get_globals, self.get_locals, use_worker_process)
         validator = _validator or PythonValidator()
 
         if history_filename:
@@ -650,8 +823,21 @@ class PythonCommandLineInterface(CommandLineInterface):
         self.key_bindings_manager = KeyBindingManager(enable_vi_mode=vi_mode, enable_system_prompt=True)
         load_python_bindings(self.key_bindings_manager, self.settings, always_multiline=always_multiline)
 
+        def is_buffer_multiline(document):
+            return (self.settings.paste_mode or
+                    self.settings.always_multiline or
+                    self.settings.currently_multiline or
+                    document_is_multiline_python(document, buffer.bracket_tracker))
+
+        buffer=PythonBuffer(
+                        is_multiline=is_buffer_multiline,
+                        tempfile_suffix='.py',
+                        history=history,
+                        completer=self.completer,
+                        validator=validator)
+
         layout = Layout(
-            input_processors=[BracketsMismatchProcessor()],
+            input_processors=[PythonBracketsMismatchProcessor(buffer.bracket_tracker)],
             min_height=7,
             lexer=PythonLexer,
             left_margin=left_margin,
@@ -669,19 +855,6 @@ class PythonCommandLineInterface(CommandLineInterface):
             ],
             show_tildes=True)
 
-        def is_buffer_multiline(document):
-            return (self.settings.paste_mode or
-                    self.settings.always_multiline or
-                    self.settings.currently_multiline or
-                    document_is_multiline_python(document))
-
-        buffer=PythonBuffer(
-                        is_multiline=is_buffer_multiline,
-                        tempfile_suffix='.py',
-                        history=history,
-                        completer=self.completer,
-                        validator=validator)
-
         #: Incremeting integer counting the current statement.
         self.current_statement_index = 1
 
@@ -692,7 +865,8 @@ class PythonCommandLineInterface(CommandLineInterface):
             style=style,
             key_bindings_registry=self.key_bindings_manager.registry,
             buffer=buffer,
-            create_async_autocompleters=True)
+            create_async_autocompleters=True,
+            create_async_validators=validate_while_typing)
 
         def on_input_timeout():
             """
@@ -710,22 +884,8 @@ class PythonCommandLineInterface(CommandLineInterface):
             document = self.buffers['default'].document
 
             def run():
-                script = get_jedi_script_from_document(document, self.get_locals(), self.get_globals())
-
                 # Show signatures in help text.
-                if script:
-                    try:
-                        signatures = script.call_signatures()
-                    except ValueError:
-                        # e.g. in case of an invalid \\x escape.
-                        signatures = []
-                    except Exception:
-                        # Sometimes we still get an exception (TypeError), because
-                        # of probably bugs in jedi. We can silence them.
-                        # See: https://github.com/davidhalter/jedi/issues/492
-                        signatures = []
-                else:
-                    signatures = []
+                signatures = self.jedi_backend.get_signatures(document)
 
                 self.get_signatures_thread_running = False
 
@@ -741,3 +901,14 @@ class PythonCommandLineInterface(CommandLineInterface):
 
         self.onInputTimeout += on_input_timeout
         self.onReset += self.key_bindings_manager.reset
+
+        # New code can have been executed before each new input. Retrieve the
+        # namespaces again.
+        self.onReadInputStart += self.jedi_backend.reset_namespaces
+
+    def close(self):
+        """
+        Shut down the executor and the jedi backend.
+        """
+        super(PythonCommandLineInterface, self).close()
+        self.jedi_backend.close()
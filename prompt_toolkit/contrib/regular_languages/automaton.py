@@ -0,0 +1,441 @@
+"""
+Deterministic automaton for a regular grammar.
+
+Instead of translating the parse tree into Python regular expressions (like
+the compiler does), this builds a nondeterministic finite automaton directly
+from the `regex_parser` nodes, and determinizes it lazily while the input is
+consumed. The states are immutable, so the caller can keep the state for the
+current input and extend it by one character without rescanning the whole
+string.
+
+The automaton can be used from several threads. (The completer runs in the
+executor, while the lexer runs in the event loop.) Growing the DFA tables
+happens under a lock; a transition only becomes visible once its target state
+is complete.
+
+Example usage::
+
+    automaton = Automaton(parse_regex(tokenize_regex('(hello|world) \s+ x')))
+
+    state = automaton.start_state.feed('hel')
+    state.is_dead  # False: 'hel' is a prefix of the grammar.
+
+    state = state.feed('lo x')
+    state.is_match  # True
+
+The :class:`CaptureState` follows the same automaton, but also records where
+each variable of the grammar starts and stops on the way. This is how the
+compiler finds the variables for `match_prefix`::
+
+    state = automaton.start_capture_state.feed('hello ab')
+    state.variables()  # [('var', (6, 8))]
+"""
+from __future__ import unicode_literals
+import re
+import threading
+
+from .regex_parser import Any, Sequence, Regex, Variable, Repeat, Lookahead
+
+__all__ = (
+    'Automaton',
+    'AutomatonState',
+    'CaptureState',
+    'UnsupportedGrammarError',
+)
+
+
+class UnsupportedGrammarError(Exception):
+    """
+    Raised when the grammar contains a construct that can't be expressed in
+    the automaton. (Like a lookahead, or a zero-width assertion.)
+    """
+
+
+#: Regex tokens that don't consume a character.
+_ZERO_WIDTH_TOKENS = ('^', '$', '\\b', '\\B', '\\A', '\\Z')
+
+
+class _NFAState(object):
+    __slots__ = ('epsilon', 'transitions', 'tag')
+
+    def __init__(self, tag=None):
+        #: List of state numbers, reachable without consuming input.
+        self.epsilon = []
+
+        #: List of (match_func, state number) tuples.
+        self.transitions = []
+
+        #: (variable index, opening) tuple, when entering this state starts
+        #: or stops a variable. (Only used by the `CaptureState`.)
+        self.tag = tag
+
+
+class Automaton(object):
+    """
+    Lazily determinized automaton for the grammar defined by a `Node` tree.
+
+    :param root_node: :class:`~.regex_parser.Node` instance.
+    """
+    def __init__(self, root_node):
+        self._nfa_states = []
+
+        #: The names of the variables, by variable index.
+        self.varnames = []
+
+        start = self._new_state()
+        self._final = self._new_state()
+        self._build(root_node, start, self._final)
+
+        # DFA states are created on demand. Each DFA state is a frozenset of
+        # NFA states. Index 0 is always the dead state.
+        self._dfa_states = []
+        self._dfa_indexes = {}
+        self._dfa_transitions = []  # List of dicts, mapping char to DFA index.
+        self._dfa_accepting = []
+
+        #: Lock for growing the DFA tables.
+        self._lock = threading.Lock()
+
+        self._get_dfa_index(frozenset())
+        self.start_state = AutomatonState(
+            self, self._get_dfa_index(self._epsilon_closure([start])))
+
+        self.start_capture_state = CaptureState(
+            self, self.start_state, 0,
+            self._capture_closure([(start, (None, ) * len(self.varnames))], 0))
+
+        #: The last (string, state) that was requested from `get_state`.
+        self._last = ('', self.start_state)
+
+    def _new_state(self, tag=None):
+        self._nfa_states.append(_NFAState(tag))
+        return len(self._nfa_states) - 1
+
+    def _build(self, node, start, end):
+        """
+        Add the transitions for `node` between the `start` and `end` states.
+        (Thompson's construction.)
+        """
+        if isinstance(node, Any):
+            for c in node.children:
+                self._build(c, start, end)
+
+        elif isinstance(node, Sequence):
+            current = start
+            for c in node.children:
+                next_ = self._new_state()
+                self._build(c, current, next_)
+                current = next_
+            self._nfa_states[current].epsilon.append(end)
+
+        elif isinstance(node, Regex):
+            self._nfa_states[start].transitions.append(
+                (_create_match_func(node.regex), end))
+
+        elif isinstance(node, Variable):
+            # Surround the child with states that mark the start and the end
+            # of the variable.
+            index = len(self.varnames)
+            self.varnames.append(node.varname)
+
+            open_ = self._new_state(tag=(index, True))
+            close = self._new_state(tag=(index, False))
+            self._nfa_states[start].epsilon.append(open_)
+            self._build(node.childnode, open_, close)
+            self._nfa_states[close].epsilon.append(end)
+
+        elif isinstance(node, Repeat):
+            current = start
+
+            # The mandatory repetitions.
+            for i in range(node.min_repeat):
+                next_ = self._new_state()
+                self._build(node.childnode, current, next_)
+                current = next_
+
+            if node.max_repeat is None:
+                # Unbounded: loop around one state.
+                loop = self._new_state()
+                self._nfa_states[current].epsilon.append(loop)
+                self._build(node.childnode, loop, loop)
+                self._nfa_states[loop].epsilon.append(end)
+            else:
+                # The optional repetitions. We can leave after each of them.
+                for i in range(node.max_repeat - node.min_repeat):
+                    self._nfa_states[current].epsilon.append(end)
+                    next_ = self._new_state()
+                    self._build(node.childnode, current, next_)
+                    current = next_
+                self._nfa_states[current].epsilon.append(end)
+
+        elif isinstance(node, Lookahead):
+            raise UnsupportedGrammarError('Lookahead is not supported.')
+
+        else:
+            raise TypeError('Got %r' % (node, ))
+
+    def _epsilon_closure(self, states):
+        result = set(states)
+        todo = list(states)
+
+        while todo:
+            for s in self._nfa_states[todo.pop()].epsilon:
+                if s not in result:
+                    result.add(s)
+                    todo.append(s)
+
+        return frozenset(result)
+
+    def _capture_closure(self, threads, position):
+        """
+        Follow the epsilon transitions of the given (NFA state, captures)
+        threads, and return the list of all the threads that we reach.
+
+        `captures` is a tuple with one (start, stop) item for each variable.
+        (`None` for variables that were not seen, `stop` is `None` while the
+        variable is still open.) When several paths lead to the same NFA
+        state, only the first one is kept, like a backtracking regex engine
+        would do.
+        """
+        result = []
+        seen = set()
+        todo = list(reversed(threads))
+
+        while todo:
+            state, captures = todo.pop()
+
+            if state in seen:
+                continue
+            seen.add(state)
+
+            nfa_state = self._nfa_states[state]
+
+            if nfa_state.tag is not None:
+                index, opening = nfa_state.tag
+                capture = (position, None) if opening else (captures[index][0], position)
+                captures = captures[:index] + (capture, ) + captures[index + 1:]
+
+            result.append((state, captures))
+
+            for s in reversed(nfa_state.epsilon):
+                if s not in seen:
+                    todo.append((s, captures))
+
+        return result
+
+    def _capture_step(self, threads, char, position):
+        """
+        Return the threads that we have after reading `char`, which is the
+        character at `position` in the input.
+        """
+        targets = []
+
+        for state, captures in threads:
+            for match_func, target in self._nfa_states[state].transitions:
+                if match_func(char):
+                    targets.append((target, captures))
+
+        return self._capture_closure(targets, position + 1)
+
+    def _get_dfa_index(self, nfa_states):
+        # (Called with the lock held, or from the constructor.)
+        try:
+            return self._dfa_indexes[nfa_states]
+        except KeyError:
+            index = len(self._dfa_states)
+            self._dfa_states.append(nfa_states)
+            self._dfa_transitions.append({})
+            self._dfa_accepting.append(self._final in nfa_states)
+            self._dfa_indexes[nfa_states] = index
+            return index
+
+    def _step(self, index, char):
+        """
+        Return the DFA index that we reach from `index` after reading `char`.
+        """
+        transitions = self._dfa_transitions[index]
+
+        try:
+            return transitions[char]
+        except KeyError:
+            with self._lock:
+                # Another thread could have added it in the meantime.
+                if char in transitions:
+                    return transitions[char]
+
+                targets = []
+                for s in self._dfa_states[index]:
+                    for match_func, target in self._nfa_states[s].transitions:
+                        if match_func(char):
+                            targets.append(target)
+
+                result = self._get_dfa_index(self._epsilon_closure(targets))
+                transitions[char] = result
+                return result
+
+    def get_state(self, string):
+        """
+        Return the :class:`AutomatonState` after reading `string`.
+
+        When `string` extends the string of the previous call, only the new
+        characters are fed to the automaton.
+        """
+        # (`_last` is replaced as a whole, so other threads always see a
+        # consistent pair.)
+        last_string, last_state = self._last
+
+        if string.startswith(last_string):
+            state = last_state.feed(string[len(last_string):])
+        else:
+            state = self.start_state.feed(string)
+
+        self._last = (string, state)
+        return state
+
+    def match(self, string):
+        """
+        True when `string` matches the grammar.
+        """
+        return self.get_state(string).is_match
+
+    def match_prefix(self, string):
+        """
+        True when `string` is a prefix of some input that matches the grammar.
+        """
+        return not self.get_state(string).is_dead
+
+
+class AutomatonState(object):
+    """
+    Immutable position in the :class:`Automaton`.
+    """
+    __slots__ = ('automaton', 'index')
+
+    def __init__(self, automaton, index):
+        self.automaton = automaton
+        self.index = index
+
+    def feed(self, text):
+        """
+        Return the new state, after reading `text`.
+        """
+        automaton = self.automaton
+        index = self.index
+
+        for c in text:
+            # Once dead, we stay dead.
+            if index == 0:
+                break
+            index = automaton._step(index, c)
+
+        return AutomatonState(automaton, index)
+
+    @property
+    def is_match(self):
+        """ True when the input so far matches the grammar. """
+        return self.automaton._dfa_accepting[self.index]
+
+    @property
+    def is_dead(self):
+        """ True when no continuation of the input can match the grammar. """
+        return self.index == 0
+
+    def __repr__(self):
+        return 'AutomatonState(%r)' % self.index
+
+
+class CaptureState(object):
+    """
+    Immutable position in the :class:`Automaton`, that also knows where the
+    variables of the grammar start and stop.
+
+    The :class:`AutomatonState` is moved along, so that dead input is
+    rejected without following the variables.
+    """
+    __slots__ = ('automaton', 'state', 'position', 'threads')
+
+    def __init__(self, automaton, state, position, threads):
+        self.automaton = automaton
+        self.state = state
+        self.position = position
+
+        #: List of (NFA state, captures) tuples. (See `_capture_closure`.)
+        self.threads = threads
+
+    def feed(self, text):
+        """
+        Return the new state, after reading `text`.
+        """
+        automaton = self.automaton
+        state = self.state
+        position = self.position
+        threads = self.threads
+
+        for c in text:
+            state = state.feed(c)
+            if state.is_dead:
+                return CaptureState(automaton, state, position + 1, [])
+
+            threads = automaton._capture_step(threads, c, position)
+            position += 1
+
+        return CaptureState(automaton, state, position, threads)
+
+    @property
+    def is_match(self):
+        """ True when the input so far matches the grammar. """
+        return self.state.is_match
+
+    @property
+    def is_dead(self):
+        """ True when no continuation of the input can match the grammar. """
+        return self.state.is_dead
+
+    def variables(self):
+        """
+        Return a list of (varname, (start, stop)) tuples for all the
+        variables on all the paths through the automaton that the input can
+        take. A variable that is still open stops at the end of the input.
+        """
+        varnames = self.automaton.varnames
+        result = []
+        seen = set()
+
+        for state, captures in self.threads:
+            for index, capture in enumerate(captures):
+                if capture is not None:
+                    start, stop = capture
+                    item = (varnames[index], (start, self.position if stop is None else stop))
+
+                    if item not in seen:
+                        seen.add(item)
+                        result.append(item)
+
+        return result
+
+    def __repr__(self):
+        return 'CaptureState(%r, %r)' % (self.state, self.position)
+
+
+def _create_match_func(regex):
+    """
+    Turn the regex of a :class:`Regex` leaf into a callable that tests one
+    character. (The regex tokenizer makes sure that each leaf is a single
+    character, escape sequence or character group.)
+    """
+    if regex in _ZERO_WIDTH_TOKENS:
+        raise UnsupportedGrammarError('%r is not supported.' % regex)
+
+    compiled = re.compile(regex, re.MULTILINE | re.DOTALL)
+
+    # The same characters are tested over and over again.
+    cache = {}
+
+    def match_func(char):
+        try:
+            return cache[char]
+        except KeyError:
+            m = compiled.match(char)
+            result = cache[char] = bool(m) and m.end() == 1
+            return result
+    return match_func
@@ -41,6 +41,7 @@ Partial matches are possible::
 from __future__ import unicode_literals
 import re
 
+from .automaton import Automaton, UnsupportedGrammarError
 from .regex_parser import Any, Sequence, Regex, Variable, Repeat, Lookahead
 from .regex_parser import parse_regex, tokenize_regex
 
@@ -82,6 +83,16 @@ class _CompiledGrammar(object):
         self._re = re.compile(self._re_pattern, flags)
         self._re_prefix = [re.compile(t, flags) for t in self._re_prefix_patterns]
 
+        #: Incremental automaton, used for `match_prefix` instead of the
+        #: prefix regexes. (`None` when the grammar contains constructs that
+        #: the automaton doesn't support.)
+        try:
+            self.automaton = Automaton(root_node)
+        except UnsupportedGrammarError:
+            self.automaton = None
+
+        self._prefix_matcher = self.create_prefix_matcher()
+
     def escape(self, varname, value):
         """
         Escape `value` to fit in the place of this variable into the grammar.
@@ -219,7 +230,7 @@ class _CompiledGrammar(object):
         m = self._re.match(string)
 
         if m:
-            return Match(string, [(self._re, m)], self._group_names_to_nodes, self.unescape_funcs)
+            return Match(string, self._regs_from_re_matches([(self._re, m)]), self.unescape_funcs)
 
     def match_prefix(self, string):
         """
@@ -227,39 +238,105 @@ class _CompiledGrammar(object):
         :class:`Match` instance can contain multiple representations of the
         match.
 
+        Callers that match input which grows one character at a time should
+        use their own matcher from `create_prefix_matcher` instead.
+
         :param string: The input string.
         """
+        return self._prefix_matcher.match_prefix(string)
+
+    def create_prefix_matcher(self):
+        """
+        Return a new :class:`PrefixMatcher` for this grammar.
+        """
+        return PrefixMatcher(self)
+
+    def _match_prefix_with_regexes(self, string):
         matches = [(r, r.match(string)) for r in self._re_prefix]
         matches = [(r, m) for r, m in matches if m]
 
         if matches != []:
-            return Match(string, matches, self._group_names_to_nodes, self.unescape_funcs)
+            return Match(string, self._regs_from_re_matches(matches), self.unescape_funcs)
+
+    def _regs_from_re_matches(self, re_matches):
+        """
+        Return a list of (varname, reg) tuples for a list of
+        (compiled_re_pattern, re_match) tuples.
+        """
+        result = []
+
+        for r, re_match in re_matches:
+            for group_name, group_index in r.groupindex.items():
+                reg = re_match.regs[group_index]
+                result.append((self._group_names_to_nodes[group_name], reg))
+
+        return result
+
+
+class PrefixMatcher(object):
+    """
+    Partial matching of input against the grammar, which remembers the
+    automaton state of the previous input. When the next input extends it
+    (because a character was typed), only the new characters are processed.
+
+    Every caller should have its own matcher, because they see different
+    input. (The lexer sees the whole text, the completer only the text before
+    the cursor.)
+
+    :param compiled_grammar: :class:`_CompiledGrammar` instance.
+    """
+    def __init__(self, compiled_grammar):
+        self.compiled_grammar = compiled_grammar
+
+        #: (string, `CaptureState`) for the previous input.
+        self._last = None
+
+    def match_prefix(self, string):
+        """
+        Like :meth:`_CompiledGrammar.match_prefix`.
+        """
+        grammar = self.compiled_grammar
+        automaton = grammar.automaton
+
+        # The regexes are used when there is no automaton for this grammar,
+        # or when the input has newlines. (The '$' of the multiline regexes
+        # can also match in front of a newline, the automaton doesn't do
+        # that.)
+        if automaton is None or '\n' in string:
+            return grammar._match_prefix_with_regexes(string)
+
+        # (`_last` is replaced as a whole, so other threads always see a
+        # consistent pair.)
+        last = self._last
+
+        if last is not None and string.startswith(last[0]):
+            state = last[1].feed(string[len(last[0]):])
+        else:
+            state = automaton.start_capture_state.feed(string)
+
+        self._last = (string, state)
+
+        if not state.is_dead:
+            return Match(string, state.variables(), grammar.unescape_funcs)
 
 
 class Match(object):
     """
     :param string: The input string.
-    :param re_matches: List of (compiled_re_pattern, re_match) tuples.
-    :param group_names_to_nodes: Dictionary mapping all the re group names to the matching Node instances.
+    :param regs: List of (varname, (start, stop)) tuples. (A (-1, -1) slice
+                 means that the variable was not matched.)
+    :param unescape_funcs: `dict` mapping variable names to unescape callables.
     """
-    def __init__(self, string, re_matches, group_names_to_nodes, unescape_funcs):
+    def __init__(self, string, regs, unescape_funcs):
         self.string = string
-        self._re_matches = re_matches
-        self._group_names_to_nodes = group_names_to_nodes
+        self._regs = regs
         self._unescape_funcs = unescape_funcs
 
     def _nodes_to_regs(self):
         """
         Return a list of (varname, reg) tuples.
         """
-        def get_tuples():
-            for r, re_match in self._re_matches:
-                for group_name, group_index in r.groupindex.items():
-                    reg = re_match.regs[group_index]
-                    node = self._group_names_to_nodes[group_name]
-                    yield (node, reg)
-
-        return list(get_tuples())
+        return self._regs
 
     def _nodes_to_values(self):
         """
@@ -28,9 +28,10 @@ class GrammarCompleter(Completer):
 
         self.compiled_grammar = compiled_grammar
         self.completers = completers
+        self._prefix_matcher = compiled_grammar.create_prefix_matcher()
 
     def get_completions(self, document, complete_event):
-        m = self.compiled_grammar.match_prefix(document.text_before_cursor)
+        m = self._prefix_matcher.match_prefix(document.text_before_cursor)
 
         if m:
             completions = self._remove_duplicates(
@@ -45,6 +46,12 @@ class GrammarCompleter(Completer):
         (The completer assumes that the cursor position was at the end of the
         input string.)
         """
+        # Often, the same variable value shows up through several paths of
+        # the grammar. Cache the results of each completer for the duration
+        # of this call, so that we don't call it several times for the same
+        # input. Maps (completer, text) to a list of `Completion` instances.
+        cache = {}
+
         for match_variable in match.end_nodes():
             varname = match_variable.varname
             start = match_variable.start
@@ -57,11 +64,16 @@ class GrammarCompleter(Completer):
                 # Unwrap text.
                 unwrapped_text = self.compiled_grammar.unescape(varname, text)
 
-                # Create a document, for the completions API (text/cursor_position)
-                document = Document(unwrapped_text, len(unwrapped_text))
+                # Call completer. (Or take the completions from the cache.)
+                key = (completer, unwrapped_text)
+
+                if key in cache:
+                    completions = cache[key]
+                else:
+                    completions = self._get_cached_completions(
+                        completer, unwrapped_text, complete_event, cache, key)
 
-                # Call completer
-                for completion in completer.get_completions(document, complete_event):
+                for completion in completions:
                     new_text = unwrapped_text[:len(text) + completion.start_position] + completion.text
 
                     # Wrap again.
@@ -71,14 +83,31 @@ class GrammarCompleter(Completer):
                         display=completion.display,
                         display_meta=completion.display_meta)
 
+    def _get_cached_completions(self, completer, text, complete_event, cache, key):
+        """
+        Yield the completions of `completer` for this text, while storing them
+        in the cache. (We don't collect them first, so that the first
+        completion can be yielded as soon as it's available.)
+        """
+        # Create a document, for the completions API (text/cursor_position)
+        document = Document(text, len(text))
+
+        result = []
+        for completion in completer.get_completions(document, complete_event):
+            result.append(completion)
+            yield completion
+
+        cache[key] = result
+
     def _remove_duplicates(self, items):
         """
         Remove duplicates, while keeping the order.
         (Sometimes we have duplicates, because the there several matches of the
         same grammar, each yielding similar completions.)
         """
-        result = []
+        seen = set()
+
         for i in items:
-            if i not in result:
-                result.append(i)
-        return result
+            if i not in seen:
+                seen.add(i)
+                yield i
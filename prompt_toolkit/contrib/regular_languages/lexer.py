@@ -34,6 +34,7 @@ class GrammarLexer(object):
 
         self.compiled_grammar = compiled_grammar
         self.tokens = tokens
+        self._prefix_matcher = compiled_grammar.create_prefix_matcher()
         self.lexers = dict((name, lexer(stripnl=False, stripall=False, ensurenl=False))
                            for name, lexer in (lexers or {}).items())
 
@@ -45,7 +46,7 @@ class GrammarLexer(object):
         return self
 
     def get_tokens(self, text):
-        m = self.compiled_grammar.match_prefix(text)
+        m = self._prefix_matcher.match_prefix(text)
 
         if m:
             characters = [[Token, c] for c in text]
@@ -49,31 +49,20 @@ class PythonRepl(PythonCommandLineInterface):
                 self._process_document(document)
         except Exit:
             pass
+        finally:
+            self.close()
 
     def asyncio_start_repl(self):
         """
         (coroutine) Start a Read-Eval-print Loop for usage in asyncio. E.g.::
 
             repl = PythonRepl(get_globals=lambda:globals())
-            yield from repl.asyncio_start_repl()
-        """
-        try:
-            while True:
-                # Read
-                g = self.read_input_async(
-                    on_abort=AbortAction.RETRY,
-                    on_exit=AbortAction.RAISE_EXCEPTION)
+            await repl.asyncio_start_repl()
 
-                # We use Python 2 syntax for delegating the coroutine and
-                # catching the returned document.
-                try:
-                    while True:
-                        yield next(g)
-                except StopIteration as e:
-                    document = e.args[0]
-                    self._process_document(document)
-        except Exit:
-            pass
+        (Python >=3.5 only.)
+        """
+        from .asyncio_repl import asyncio_start_repl
+        return asyncio_start_repl(self)
 
     def _process_document(self, document):
         line = document.text
@@ -153,7 +142,8 @@ class PythonRepl(PythonCommandLineInterface):
 
 def embed(globals=None, locals=None, vi_mode=False, history_filename=None, no_colors=False,
           autocompletion_style=AutoCompletionStyle.POPUP_MENU, startup_paths=None, always_multiline=False,
-          patch_stdout=False, return_asyncio_coroutine=False):
+          patch_stdout=False, return_asyncio_coroutine=False, use_worker_process=False,
+          validate_while_typing=False):
     """
     Call this to embed  Python shell at the current point in your program.
     It's similar to `IPython.embed` and `bpython.embed`. ::
@@ -162,6 +152,10 @@ def embed(globals=None, locals=None, vi_mode=False, history_filename=None, no_co
         embed(globals(), locals(), vi_mode=False)
 
     :param vi_mode: Boolean. Use Vi instead of Emacs key bindings.
+    :param use_worker_process: Boolean. Run the jedi analysis in a separate
+                               process.
+    :param validate_while_typing: Boolean. Validate the input in the
+                                  background while typing.
     """
     globals = globals or {}
     locals = locals or globals
@@ -174,16 +168,15 @@ def embed(globals=None, locals=None, vi_mode=False, history_filename=None, no_co
 
     cli = PythonRepl(get_globals, get_locals, vi_mode=vi_mode, history_filename=history_filename,
                      style=(None if no_colors else PythonStyle),
-                     autocompletion_style=autocompletion_style, always_multiline=always_multiline)
+                     autocompletion_style=autocompletion_style, always_multiline=always_multiline,
+                     use_worker_process=use_worker_process,
+                     validate_while_typing=validate_while_typing)
 
     patch_context = cli.patch_stdout_context() if patch_stdout else DummyContext()
 
     if return_asyncio_coroutine:
-        def coroutine():
-            with patch_context:
-                for future in cli.asyncio_start_repl():
-                    yield future
-        return coroutine()
+        from .asyncio_repl import asyncio_start_repl
+        return asyncio_start_repl(cli, patch_context)
     else:
         with patch_context:
             cli.start_repl(startup_paths=startup_paths)
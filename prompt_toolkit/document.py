@@ -36,7 +36,9 @@ class Document(object):
     :param cursor_position: int
     :param selection: :class:`SelectionState`
     """
-    __slots__ = ('text', 'cursor_position', 'selection')
+    __slots__ = ('text', 'cursor_position', 'selection',
+                 '_lines', '_cursor_position_row',
+                 '_current_line_before_cursor', '_current_line_after_cursor')
 
     def __init__(self, text='', cursor_position=None, selection=None):
         # By default, if no cursor position was given, make sure to put the
@@ -49,6 +51,12 @@ class Document(object):
         self.cursor_position = cursor_position
         self.selection = selection
 
+        # Derived values, computed on first use. (The document is immutable.)
+        self._lines = None
+        self._cursor_position_row = None
+        self._current_line_before_cursor = None
+        self._current_line_after_cursor = None
+
     @property
     def current_char(self):
         """ Return character under cursor, or None """
@@ -70,19 +78,30 @@ class Document(object):
     @property
     def current_line_before_cursor(self):
         """ Text from the start of the line until the cursor. """
-        return self.text_before_cursor.split('\n')[-1]
+        if self._current_line_before_cursor is None:
+            start = self.text.rfind('\n', 0, self.cursor_position) + 1
+            self._current_line_before_cursor = self.text[start:self.cursor_position]
+        return self._current_line_before_cursor
 
     @property
     def current_line_after_cursor(self):
         """ Text from the cursor until the end of the line. """
-        return self.text_after_cursor.split('\n')[0]
+        if self._current_line_after_cursor is None:
+            end = self.text.find('\n', self.cursor_position)
+            if end == -1:
+                end = len(self.text)
+            self._current_line_after_cursor = self.text[self.cursor_position:end]
+        return self._current_line_after_cursor
 
     @property
     def lines(self):
         """
-        Array of all the lines.
+        Array of all the lines. (Don't modify it, it's shared between all
+        the callers.)
         """
-        return self.text.split('\n')
+        if self._lines is None:
+            self._lines = self.text.split('\n')
+        return self._lines
 
     @property
     def lines_from_current(self):
@@ -124,7 +143,9 @@ class Document(object):
         """
         Current row. (0-based.)
         """
-        return len(self.text_before_cursor.split('\n')) - 1
+        if self._cursor_position_row is None:
+            self._cursor_position_row = self.text.count('\n', 0, self.cursor_position)
+        return self._cursor_position_row
 
     @property
     def cursor_position_col(self):
@@ -137,10 +158,10 @@ class Document(object):
         """
         Given an index for the text, return the corresponding (row, col) tuple.
         """
-        text_before_position = self.text[:index]
+        index = max(0, min(index, len(self.text)))
 
-        row = len(text_before_position.split('\n'))
-        col = len(text_before_position.split('\n')[-1])
+        row = self.text.count('\n', 0, index) + 1
+        col = index - (self.text.rfind('\n', 0, index) + 1)
 
         return row, col
 
@@ -370,7 +391,7 @@ class Document(object):
         """
         return min(count, len(self.current_line_after_cursor))
 
-    def get_cursor_up_position(self, count=1):  # TODO: implement `count`
+    def get_cursor_up_position(self, count=1):
         """
         Return the relative cursor position (character index) where we would be if the
         user pressed the arrow-up button.
@@ -4,59 +4,114 @@ Eventloop for integration with Python3 asyncio.
 Windows notes:
 - Somehow it doesn't seem to work with the 'ProactorEventLoop'.
 
-Note that we can't use "yield from", because the package should be installable
-under Python 2.6 as well, and it should contain syntactically valid Python 2.6
-code.
+This module uses `async def` syntax and requires Python 3.5 or later. It's
+only imported when `read_input_async` is called.
 """
 from __future__ import unicode_literals
 
-from codecs import getincrementaldecoder
-
 from .base import BaseEventLoop
 
 import asyncio
 
 __all__ = (
     'BaseAsyncioEventLoop',
+    'read_input_async',
 )
 
 
 class BaseAsyncioEventLoop(BaseEventLoop):
-    stdin_decoder_cls = getincrementaldecoder('utf-8')
-
+    """
+    Input handling on top of an asyncio event loop.
+
+    The input reader is registered once, on the first call of
+    `wait_for_input`, and stays active until the event loop is closed. The
+    input timeout is one timer that is only rescheduled when it expires
+    before the idle time is over, not for every key press.
+    """
     def __init__(self, input_processor, stdin, loop=None):
         super(BaseAsyncioEventLoop, self).__init__(input_processor, stdin)
 
         self.loop = loop or asyncio.get_event_loop()
 
-    def wait_for_input(self, f_ready):
-        raise NotImplementedError('')
+        # The readers that we added to the asyncio loop. (The asyncio loop
+        # outlives this object, so they are removed again in `close`.)
+        self._readers = set()
+
+        self._reading = False
+
+        #: True when input has been processed that `wait_for_input` didn't
+        #: report yet.
+        self._input_pending = False
+        self._input_future = None
+
+        self._last_input_time = self.loop.time()
+        self._timeout_handle = None
+
+    def _start_reading(self):
+        """
+        Start the persistent input reader. It should call `_input_received`
+        each time after feeding input to the input processor.
+        """
+        raise NotImplementedError
+
+    def _stop_reading(self):
+        raise NotImplementedError
+
+    def _input_received(self):
+        self._last_input_time = self.loop.time()
+        self._schedule_timeout()
+
+        self._input_pending = True
+
+        if self._input_future is not None and not self._input_future.done():
+            self._input_future.set_result(None)
 
-    @asyncio.coroutine
-    def loop_coroutine(self):
+    def _schedule_timeout(self):
+        if self._timeout_handle is None and self.input_timeout is not None:
+            self._timeout_handle = self.loop.call_later(
+                self.input_timeout, self._check_timeout)
+
+    def _check_timeout(self):
+        self._timeout_handle = None
+        remaining = self._last_input_time + self.input_timeout - self.loop.time()
+
+        if remaining > 0:
+            # There was input in the meantime, wait for the rest of the time.
+            self._timeout_handle = self.loop.call_later(remaining, self._check_timeout)
+        else:
+            self.onInputTimeout.fire()
+
+    async def wait_for_input(self):
         """
-        The input 'event loop'.
+        (coroutine) Return after input has been fed to the input processor.
         """
         if self.closed:
             raise Exception('Event loop already closed.')
 
-        f_ready = asyncio.Future()
-        self.wait_for_input(f_ready)
+        if not self._reading:
+            self._reading = True
+            self._start_reading()
+            self._schedule_timeout()
+
+        if not self._input_pending:
+            self._input_future = self.loop.create_future()
+            await self._input_future
+
+        self._input_pending = False
+
+    def close(self):
+        super(BaseAsyncioEventLoop, self).close()
 
-        # Start a timeout coroutine.
-        @asyncio.coroutine
-        def timeout():
-            for f in asyncio.sleep(self.input_timeout, loop=self.loop):
-                yield f
+        if self._reading:
+            self._reading = False
+            self._stop_reading()
 
-            # Only fire timeout event when no input data was returned yet.
-            if not f_ready.done():
-                self.onInputTimeout.fire()
-        asyncio.async(timeout(), loop=self.loop)
+        if self._timeout_handle is not None:
+            self._timeout_handle.cancel()
+            self._timeout_handle = None
 
-        # Return when there is input ready.
-        for f in f_ready:
-            yield f
+        for fd in list(self._readers):
+            self.remove_reader(fd)
 
     def run_in_executor(self, callback):
         self.loop.run_in_executor(None, callback)
@@ -66,4 +121,29 @@ class BaseAsyncioEventLoop(BaseEventLoop):
         Call this function in the main event loop.
         Similar to Twisted's ``callFromThread``.
         """
-        self.loop.call_soon(callback)
+        self.loop.call_soon_threadsafe(callback)
+
+    def add_reader(self, fd, callback):
+        self.loop.add_reader(fd, callback)
+        self._readers.add(fd)
+
+    def remove_reader(self, fd):
+        self.loop.remove_reader(fd)
+        self._readers.discard(fd)
+
+    def call_later(self, delay, callback):
+        return self.loop.call_later(delay, callback)
+
+
+async def read_input_async(cli, eventloop, initial_document, on_abort, on_exit):
+    """
+    The implementation of
+    :meth:`~prompt_toolkit.CommandLineInterface.read_input_async`.
+    """
+    with cli._reading_input(eventloop, initial_document):
+        while True:
+            await eventloop.wait_for_input()
+
+            done, result = cli._process_input(initial_document, on_abort, on_exit)
+            if done:
+                return result
@@ -7,36 +7,124 @@ Windows notes:
 from __future__ import unicode_literals
 
 from .asyncio_base import BaseAsyncioEventLoop
+from ..keys import Keys
 from ..terminal.win32_input import ConsoleInputReader
 
-import asyncio
+from collections import deque
 
 __all__ = (
     'Win32AsyncioEventLoop',
 )
 
 
+class _ConsoleInput(object):
+    """
+    Reader for the console input, shared by all the prompts of this process.
+
+    Reading the console is a blocking call that runs in the executor, and it
+    can't be interrupted. When a prompt stops while a read is running, the
+    keys of that read are queued for the next prompt, instead of being lost.
+    """
+    def __init__(self):
+        self._reader = ConsoleInputReader()
+
+        #: `KeyPress` instances that were read, but not yet processed.
+        self.pending = deque()
+
+        self._read_future = None
+        self._loop = None
+        self._consumer = None
+
+    def start(self, loop, consumer):
+        """
+        Start reading for this prompt. `consumer` is called each time that
+        there are pending keys.
+        """
+        self._loop = loop
+        self._consumer = consumer
+
+        if self.pending:
+            loop.call_soon(consumer)
+
+        self._read()
+
+    def stop(self):
+        """
+        Stop delivering keys. (A read that's still running keeps going, its
+        keys are queued.)
+        """
+        self._consumer = None
+
+    def _read(self):
+        if self._read_future is None:
+            self._read_future = self._loop.run_in_executor(None, self._reader.read)
+            self._read_future.add_done_callback(self._read_done)
+
+    def _read_done(self, future):
+        self._read_future = None
+        self.pending.extend(future.result())
+
+        # Only read again while a prompt is active.
+        if self._consumer is not None:
+            self._consumer()
+            self._read()
+
+
+_console_input = None
+
+
+def _get_console_input():
+    global _console_input
+
+    if _console_input is None:
+        _console_input = _ConsoleInput()
+    return _console_input
+
+
 class Win32AsyncioEventLoop(BaseAsyncioEventLoop):
     def __init__(self, input_processor, stdin, loop=None):
-        super(Win32AsyncioEventLoop, self).__init__(input_processor, stdin)
+        super(Win32AsyncioEventLoop, self).__init__(input_processor, stdin, loop=loop)
+
+        self._console_input = _get_console_input()
+
+    def _start_reading(self):
+        self._console_input.start(self.loop, self._feed_pending_keys)
+
+    def _stop_reading(self):
+        self._console_input.stop()
+
+    def _is_input_finished(self):
+        cli = self.input_processor._cli_ref()
+        return cli is not None and (cli.is_returning or cli.is_exiting or cli.is_aborting)
+
+    def _feed_pending_keys(self, continued=False):
+        """
+        Feed the pending keys to the input processor. Stop after the key that
+        finishes the input: the keys that were typed after Enter are for the
+        next prompt.
+        """
+        pending = self._console_input.pending
+        fed = continued
 
-        self._console_input_reader = ConsoleInputReader()
+        while pending and not self._is_input_finished():
+            key_press = pending.popleft()
+            self.input_processor.feed_key(key_press)
+            fed = True
 
-    def wait_for_input(self, f_ready):
-        def wait():
-            # Note: We cannot use "yield from", because this package also
-            #       installs on Python 2.
+            # The Enter key (ControlM) is translated into ControlJ through
+            # `call_from_executor`. Let that run first, before deciding
+            # whether the following keys are still for this input.
+            if key_press.key == Keys.ControlM:
+                self.loop.call_soon(lambda: self._feed_pending_keys(continued=True))
+                return
 
-            # Get keys
-            try:
-                for f in self.loop.run_in_executor(None, self._console_input_reader.read):
-                    yield f
-            except StopIteration as e:
-                keys = e.args[0]
+        if fed:
+            self._input_received()
 
-            # Feed keys to input processor.
-            for k in keys:
-                self.input_processor.feed_key(k)
+    async def wait_for_input(self):
+        # Keys that were left after the previous input was finished. (E.g.
+        # after Control-C, when the prompt is retried.)
+        if self._reading:
+            self._feed_pending_keys()
 
-            f_ready.set_result(None)
-        asyncio.async(wait(), loop=self.loop)
+        await super(Win32AsyncioEventLoop, self).wait_for_input()
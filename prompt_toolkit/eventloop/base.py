@@ -1,5 +1,6 @@
 from __future__ import unicode_literals
 
+from ..instrumentation import Instrumentation
 from ..utils import EventHook
 import threading
 
@@ -22,14 +23,15 @@ class BaseEventLoop(object):
         #:   of the function below the cursor position in the case of a REPL.
         self.onInputTimeout = EventHook()
 
+        #: :class:`~prompt_toolkit.instrumentation.Instrumentation` instance.
+        #: (The `CommandLineInterface` replaces it by its own.)
+        self.instrumentation = Instrumentation()
+
         self.closed = False
 
     def loop(self):
         raise NotImplementedError
 
-    def loop_coroutine(self):
-        raise NotImplementedError
-
     def close(self):
         self.closed = True
 
@@ -44,3 +46,23 @@ class BaseEventLoop(object):
 
     def call_from_executor(self, callback):
         raise NotImplementedError
+
+    def add_reader(self, fd, callback):
+        """
+        Start watching the file descriptor for read availability and call
+        `callback` when it's readable.
+        """
+        raise NotImplementedError
+
+    def remove_reader(self, fd):
+        """
+        Stop watching the file descriptor for read availability.
+        """
+        raise NotImplementedError
+
+    def call_later(self, delay, callback):
+        """
+        Call `callback` after `delay` seconds. Returns an object with a
+        `cancel` method.
+        """
+        raise NotImplementedError
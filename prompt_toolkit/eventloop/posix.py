@@ -1,14 +1,24 @@
 from __future__ import unicode_literals
 import os
 import fcntl
+import heapq
+import itertools
 import select
 import signal
 import errno
+import time
 
-from codecs import getincrementaldecoder
+try:
+    import selectors
+except ImportError:
+    # Python 2: use the backport.
+    import selectors34 as selectors
+
+from collections import deque
 from ..terminal.vt100_input import InputStream
 
 from .base import BaseEventLoop
+from .posix_utils import PosixStdinReader
 
 __all__ = (
     'PosixEventLoop',
@@ -17,81 +27,153 @@ __all__ = (
 
 
 class PosixEventLoop(BaseEventLoop):
-    stdin_decoder_cls = getincrementaldecoder('utf-8')
+    """
+    Event loop for posix systems, built on top of the `selectors` module.
+    (This uses epoll on Linux and kqueue on BSD/OS X.)
 
+    Apart from stdin, it can watch other file descriptors (see
+    :meth:`.add_reader`) and run timers (see :meth:`.call_later`).
+    """
     def __init__(self, input_processor, stdin):
         super(PosixEventLoop, self).__init__(input_processor, stdin)
 
         self.inputstream = InputStream(self.input_processor)
-        self._calls_from_executor = []
+
+        # Callbacks from other threads. (`deque.append` and `popleft` are
+        # thread safe.)
+        self._calls_from_executor = deque()
+
+        #: True when a byte has been written to the schedule pipe, which has
+        #: not yet been handled by the event loop.
+        self._wakeup_pending = False
 
         # Create a pipe for inter thread communication.
         self._schedule_pipe = os.pipe()
         fcntl.fcntl(self._schedule_pipe[0], fcntl.F_SETFL, os.O_NONBLOCK)
 
-        # Create incremental decoder for decoding stdin.
-        # We can not just do `os.read(stdin.fileno(), 1024).decode('utf-8')`, because
-        # it could be that we are in the middle of a utf-8 byte sequence.
-        self._stdin_decoder = self.stdin_decoder_cls()
+        self._stdin_reader = PosixStdinReader(stdin.fileno())
+
+        #: Heap of (time, counter, `_Timer`) tuples.
+        self._timers = []
+        self._timer_counter = itertools.count()
+
+        # The data of each registered file is the callback that handles it.
+        self._selector = selectors.DefaultSelector()
+        self._selector.register(self.stdin, selectors.EVENT_READ, self._stdin_ready)
+        self._selector.register(self._schedule_pipe[0], selectors.EVENT_READ,
+                                self._process_calls_from_executor)
+
+        self._got_input = False
 
     def loop(self):
         """
-        The input 'event loop'.
+        The input 'event loop'. Returns after input has been read from stdin.
         """
         if self.closed:
             raise Exception('Event loop already closed.')
 
-        timeout = self.input_timeout
+        if self.input_timeout is None:
+            input_timeout_time = None
+        else:
+            input_timeout_time = time.time() + self.input_timeout
+
+        self._got_input = False
 
         while True:
-            r, w, x = _select([self.stdin, self._schedule_pipe[0]], [], [], timeout)
-
-            # If we got a character, feed it to the input stream. If we got
-            # none, it means we got a repaint request.
-            if self.stdin in r:
-                # Feed input text.
-                data = self._read_from_stdin()
-                self.inputstream.feed_and_flush(data)
-                return
+            events = _select(self._selector, self._get_select_timeout(input_timeout_time))
 
-            # If we receive something on our "call_from_executor" pipe, process
-            # these callbacks in a thread safe way.
-            elif self._schedule_pipe[0] in r:
-                # Flush all the pipe content.
-                os.read(self._schedule_pipe[0], 1024)
+            for key, mask in events:
+                key.data()
 
-                # Process calls from executor.
-                calls_from_executor, self._calls_from_executor = self._calls_from_executor, []
-                for c in calls_from_executor:
-                    c()
-            else:
-                # Fire input timeout event.
+            self._run_timers()
+
+            if self._got_input:
+                return
+
+            # Fire input timeout event.
+            if input_timeout_time is not None and time.time() >= input_timeout_time:
+                input_timeout_time = None
                 self.onInputTimeout.fire()
-                timeout = None
 
-    def _read_from_stdin(self):
+    def _get_select_timeout(self, input_timeout_time):
         """
-        Read the input and return it.
+        Return the time until the input timeout or the first timer, whichever
+        comes first. `None` when there is nothing to wait for.
         """
-        # Note: the following works better than wrapping `self.stdin` like
-        #       `codecs.getreader('utf-8')(stdin)` and doing `read(1)`.
-        #       Somehow that causes some latency when the escape
-        #       character is pressed. (Especially on combination with the `select`.
-        try:
-            bytes = os.read(self.stdin.fileno(), 1024)
-        except OSError:
-            # In case of SIGWINCH
-            bytes = b''
+        deadlines = []
 
-        try:
-            return self._stdin_decoder.decode(bytes)
-        except UnicodeDecodeError:
-            # When it's not possible to decode this bytes, reset the decoder.
-            # The only occurence of this that I had was when using iTerm2 on OS
-            # X, with "Option as Meta" checked (You should choose "Option as
-            # +Esc".)
-            self._stdin_decoder = self.stdin_decoder_cls()
-            return ''
+        if input_timeout_time is not None:
+            deadlines.append(input_timeout_time)
+
+        if self._timers:
+            deadlines.append(self._timers[0][0])
+
+        if deadlines:
+            return max(0, min(deadlines) - time.time())
+        else:
+            return None
+
+    def _run_timers(self):
+        """
+        Call the callbacks of the timers that are due.
+        """
+        now = time.time()
+
+        while self._timers and self._timers[0][0] <= now:
+            timer = heapq.heappop(self._timers)[2]
+
+            if not timer.cancelled:
+                timer.callback()
+
+    def _stdin_ready(self):
+        # Feed all the input text that's available at once. (For large
+        # pastes, we don't want to render after every chunk.)
+        with self.instrumentation.timer('decode'):
+            data = self._stdin_reader.read()
+
+        with self.instrumentation.timer('parse'):
+            self.inputstream.feed_and_flush(data)
+
+        self._got_input = True
+
+    def _process_calls_from_executor(self):
+        # Flush all the pipe content. Only after that, clear the flag: a
+        # callback that's added from now on, has to wake us up again.
+        os.read(self._schedule_pipe[0], 1024)
+        self._wakeup_pending = False
+
+        # Process calls from executor. (Only the ones that are there now.
+        # Callbacks that schedule new callbacks are handled in the next
+        # iteration.)
+        calls_from_executor = self._calls_from_executor
+
+        for _ in range(len(calls_from_executor)):
+            calls_from_executor.popleft()()
+
+    def add_reader(self, fd, callback):
+        """
+        Start watching the file descriptor for read availability and call
+        `callback` when it's readable.
+
+        :param fd: File descriptor, or an object with a `fileno()` method.
+        """
+        self._selector.register(fd, selectors.EVENT_READ, callback)
+
+    def remove_reader(self, fd):
+        """
+        Stop watching the file descriptor for read availability.
+        """
+        self._selector.unregister(fd)
+
+    def call_later(self, delay, callback):
+        """
+        Call `callback` after `delay` seconds. Returns a timer object with a
+        `cancel` method. (Not thread safe, call this from the event loop
+        thread.)
+        """
+        timer = _Timer(callback)
+        heapq.heappush(self._timers, (time.time() + delay, next(self._timer_counter), timer))
+        return timer
 
     def call_from_executor(self, callback):
         """
@@ -100,12 +182,21 @@ class PosixEventLoop(BaseEventLoop):
         """
         self._calls_from_executor.append(callback)
 
-        if self._schedule_pipe:
-            os.write(self._schedule_pipe[1], b'x')
+        # Only write to the pipe when the event loop is not going to wake up
+        # already.
+        if not self._wakeup_pending:
+            self._wakeup_pending = True
+
+            schedule_pipe = self._schedule_pipe
+            if schedule_pipe:
+                os.write(schedule_pipe[1], b'x')
 
     def close(self):
         super(PosixEventLoop, self).close()
 
+        self._selector.close()
+        self._timers = []
+
         # Close pipes.
         schedule_pipe = self._schedule_pipe
         self._schedule_pipe = None
@@ -115,17 +206,29 @@ class PosixEventLoop(BaseEventLoop):
             os.close(schedule_pipe[1])
 
 
-def _select(*args, **kwargs):
+class _Timer(object):
+    """
+    Timer, as returned by :meth:`PosixEventLoop.call_later`.
+    """
+    def __init__(self, callback):
+        self.callback = callback
+        self.cancelled = False
+
+    def cancel(self):
+        self.cancelled = True
+
+
+def _select(selector, timeout):
     """
-    Wrapper around select.select.
+    Wrapper around `selector.select`.
 
     When the SIGWINCH signal is handled, other system calls, like select
     are aborted in Python. This wrapper will retry the system call.
     """
     while True:
         try:
-            return select.select(*args, **kwargs)
-        except select.error as e:
+            return selector.select(timeout)
+        except (select.error, OSError) as e:
             # Retry select call when EINTR
             if e.args and e.args[0] == errno.EINTR:
                 continue
@@ -0,0 +1,85 @@
+from __future__ import unicode_literals
+
+from codecs import getincrementaldecoder
+import errno
+import os
+import select
+
+__all__ = (
+    'PosixStdinReader',
+)
+
+
+class PosixStdinReader(object):
+    """
+    Wrapper around stdin which reads (nonblocking) everything that's
+    available, and decodes it.
+
+    :param stdin_fd: File descriptor from which we read.
+    :param max_bytes: Stop reading after this many bytes, so that a producer
+        that never stops writing can't block the event loop forever.
+    """
+    decoder_cls = getincrementaldecoder('utf-8')
+
+    def __init__(self, stdin_fd, max_bytes=64 * 1024):
+        assert isinstance(stdin_fd, int)
+        self.stdin_fd = stdin_fd
+        self.max_bytes = max_bytes
+
+        # Create incremental decoder for decoding stdin.
+        # We can not just do `os.read(stdin.fileno(), 1024).decode('utf-8')`, because
+        # it could be that we are in the middle of a utf-8 byte sequence.
+        # Bytes that can't be decoded are replaced, instead of dropping the
+        # whole chunk. (The only occurence of invalid input that I had was
+        # when using iTerm2 on OS X, with "Option as Meta" checked. You should
+        # choose "Option as +Esc".)
+        self._stdin_decoder = self.decoder_cls(errors='replace')
+
+    def read(self):
+        """
+        Read all the input that's available right now and return it. (Call
+        this only when the file descriptor is readable.)
+        """
+        # Note: the following works better than wrapping `self.stdin` like
+        #       `codecs.getreader('utf-8')(stdin)` and doing `read(1)`.
+        #       Somehow that causes some latency when the escape
+        #       character is pressed. (Especially on combination with the `select`.
+        chunks = []
+        total = 0
+
+        # We don't make the file descriptor nonblocking. On a terminal, that
+        # flag is shared with stdout, where it would make the writes of the
+        # renderer fail. Instead, we only read again when `select` tells us
+        # that more input is available.
+        while total < self.max_bytes:
+            try:
+                data = os.read(self.stdin_fd, self.max_bytes - total)
+            except OSError as e:
+                # EAGAIN: nothing more available right now. (When somebody
+                # else made stdin nonblocking.) Or EINTR, in case of SIGWINCH.
+                if e.errno in (errno.EAGAIN, errno.EWOULDBLOCK, errno.EINTR):
+                    break
+                raise
+
+            # End of file.
+            if not data:
+                break
+
+            chunks.append(data)
+            total += len(data)
+
+            if not _is_readable(self.stdin_fd):
+                break
+
+        return self._stdin_decoder.decode(b''.join(chunks))
+
+
+def _is_readable(fd):
+    """
+    True when reading from this file descriptor won't block.
+    """
+    try:
+        return bool(select.select([fd], [], [], 0)[0])
+    except (OSError, select.error):
+        # EINTR. (Python 2.)
+        return False
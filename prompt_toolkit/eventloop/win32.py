@@ -41,7 +41,9 @@ class Win32EventLoop(BaseEventLoop):
                 return
 
             elif handle == self._console_input_reader.handle:
-                keys = self._console_input_reader.read()
+                with self.instrumentation.timer('decode'):
+                    keys = self._console_input_reader.read()
+
                 for k in keys:
                     self.input_processor.feed_key(k)
                 return
@@ -0,0 +1,126 @@
+"""
+Opt-in timing instrumentation for the input and render pipeline.
+
+When enabled, the time spent in every stage between reading stdin and
+flushing the output is recorded. After each render, a :class:`Timings`
+instance is published through the `onTimings` event::
+
+    def handler(timings):
+        print(timings.durations, timings.counts)
+
+    cli.instrumentation.enabled = True
+    cli.instrumentation.onTimings += handler
+
+The stages are:
+
+- ``decode``: reading and decoding the input.
+- ``parse``: parsing the escape sequences in `InputStream`.
+- ``dispatch``: finding the key bindings in the `InputProcessor`.
+- ``handler``: running the key binding handlers.
+- ``write_to_screen``: rendering the layout to a `Screen`.
+- ``output_screen_diff``: creating the diff with the previous screen.
+- ``flush``: writing the output to the terminal.
+
+All durations are exclusive: the time spent in nested stages is not counted
+in the outer stage. (The key handlers are called during the parsing, for
+instance.)
+
+The counts are ``cells_diffed`` and ``bytes_written``. (The latter counts the
+characters that were written, before encoding.)
+"""
+from __future__ import unicode_literals
+
+from .utils import EventHook, DummyContext
+
+import time
+
+__all__ = (
+    'Instrumentation',
+    'Timings',
+)
+
+_timer = getattr(time, 'perf_counter', time.time)
+
+# Returned by `Instrumentation.timer` when disabled.
+_dummy_context = DummyContext()
+
+
+class Timings(object):
+    """
+    Timings of everything that happened since the previous render.
+
+    :attr durations: Dictionary mapping the stage names to the time, in
+        seconds.
+    :attr counts: Dictionary mapping names to counts.
+    """
+    def __init__(self):
+        self.durations = {}
+        self.counts = {}
+
+    def __repr__(self):
+        return 'Timings(durations=%r, counts=%r)' % (self.durations, self.counts)
+
+
+class Instrumentation(object):
+    """
+    Collects the :class:`Timings`. It's disabled by default, and then costs
+    only one attribute lookup per stage.
+    """
+    def __init__(self):
+        #: Set to True to start recording.
+        self.enabled = False
+
+        #: Fired after every render, with a :class:`Timings` instance.
+        self.onTimings = EventHook()
+
+        self._timings = Timings()
+        self._stack = []
+
+    def timer(self, name):
+        """
+        Context manager that records the time spent in this stage.
+        """
+        if self.enabled:
+            return _StageTimer(self, name)
+        else:
+            return _dummy_context
+
+    def count(self, name, n=1):
+        """
+        Add `n` to this counter.
+        """
+        if self.enabled:
+            counts = self._timings.counts
+            counts[name] = counts.get(name, 0) + n
+
+    def publish(self):
+        """
+        Fire `onTimings` with everything that was recorded since the previous
+        call, and start a new :class:`Timings` instance.
+        """
+        if self.enabled:
+            timings, self._timings = self._timings, Timings()
+            self.onTimings.fire(timings)
+
+
+class _StageTimer(object):
+    def __init__(self, instrumentation, name):
+        self.instrumentation = instrumentation
+        self.name = name
+
+    def __enter__(self):
+        #: Time spent in nested stages.
+        self.nested_time = 0
+        self.instrumentation._stack.append(self)
+        self.start = _timer()
+
+    def __exit__(self, *a):
+        total = _timer() - self.start
+
+        stack = self.instrumentation._stack
+        stack.pop()
+        if stack:
+            stack[-1].nested_time += total
+
+        durations = self.instrumentation._timings.durations
+        durations[self.name] = durations.get(self.name, 0) + total - self.nested_time
@@ -113,7 +113,7 @@ def load_basic_bindings(registry, filter=None):
 
         # When there is text, act as delete, otherwise call exit.
         if buffer.text:
-            buffer.delete()
+            buffer.delete(count=event.arg)
         else:
             event.cli.set_exit()
 
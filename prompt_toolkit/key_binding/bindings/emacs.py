@@ -192,10 +192,7 @@ def load_emacs_bindings(registry, filter=None):
         """
         buffer = event.current_buffer
 
-        for i in range(event.arg):
-            pos = buffer.document.find_next_word_ending()
-            words = buffer.document.text_after_cursor[:pos]
-            buffer.insert_text(words.title(), overwrite=True)
+        _transform_words(buffer, event.arg, lambda words: words.title())
 
     @handle(Keys.Escape, 'd', filter= ~has_selection)
     def _(event):
@@ -245,10 +242,7 @@ def load_emacs_bindings(registry, filter=None):
         """
         buffer = event.current_buffer
 
-        for i in range(event.arg):  # XXX: not DRY: see meta_c and meta_u!!
-            pos = buffer.document.find_next_word_ending()
-            words = buffer.document.text_after_cursor[:pos]
-            buffer.insert_text(words.lower(), overwrite=True)
+        _transform_words(buffer, event.arg, lambda words: words.lower())
 
     @handle(Keys.Escape, 't', filter= ~has_selection)
     def _(event):
@@ -264,10 +258,7 @@ def load_emacs_bindings(registry, filter=None):
         """
         buffer = event.current_buffer
 
-        for i in range(event.arg):
-            pos = buffer.document.find_next_word_ending()
-            words = buffer.document.text_after_cursor[:pos]
-            buffer.insert_text(words.upper(), overwrite=True)
+        _transform_words(buffer, event.arg, lambda words: words.upper())
 
     @handle(Keys.Escape, '.', filter= ~has_selection)
     def _(event):
@@ -529,3 +520,17 @@ def load_emacs_search_bindings(registry, filter=None, search_buffer_name='search
     def _(event):
         buffer = event.cli.buffers[event.cli.focus_stack.previous]
         buffer.incremental_search(IncrementalSearchDirection.FORWARD)
+
+
+def _transform_words(buffer, count, transform_func):
+    """
+    Transform the current (or following) `count` words, and move the cursor
+    after them. (When there are less words, transform until the end.)
+    """
+    start = buffer.cursor_position
+    pos = buffer.document.find_next_word_ending(count=count)
+    end = len(buffer.text) if pos is None else start + pos
+
+    if end > start:
+        buffer.transform_region(start, end, transform_func)
+        buffer.cursor_position = end
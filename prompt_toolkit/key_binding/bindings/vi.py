@@ -321,8 +321,7 @@ def load_vi_bindings(registry, vi_state, filter=None):
 
     @handle('J', filter=navigation_mode)
     def _(event):
-        for i in range(event.arg):
-            event.current_buffer.join_next_line()
+        event.current_buffer.join_next_line(count=event.arg)
 
     @handle('n', filter=navigation_mode)
     def _(event):  # XXX: use `change_delete_move_yank_handler` and implement 'arg'
@@ -387,8 +386,7 @@ def load_vi_bindings(registry, vi_state, filter=None):
 
     @handle('u', filter=navigation_mode)
     def _(event):
-        for i in range(event.arg):
-            event.current_buffer.undo()
+        event.current_buffer.undo(count=event.arg)
 
     @handle('v', filter=navigation_mode)
     def _(event):
@@ -554,14 +552,13 @@ def load_vi_bindings(registry, vi_state, filter=None):
     @handle('~', filter=navigation_mode)
     def _(event):
         """
-        Reverse case of current character and move cursor forward.
+        Reverse case of current character(s) and move cursor forward.
         """
         buffer = event.current_buffer
-        c = buffer.document.current_char
+        text = buffer.document.current_line_after_cursor[:event.arg]
 
-        if c is not None and c != '\n':
-            c = (c.upper() if c.islower() else c.lower())
-            buffer.insert_text(c, overwrite=True)
+        if text:
+            buffer.insert_text(text.swapcase(), overwrite=True)
 
     @handle('#', filter=navigation_mode)
     def _(event):
@@ -993,6 +990,23 @@ def load_vi_bindings(registry, vi_state, filter=None):
     for k, f in vi_transform_functions:
         create_selection_transform_handler(k, f)
 
+    def create_line_transform_handler(keys, transform_func):
+        """
+        Apply transformation on the current line, and the following lines when
+        a count is given. (E.g. 'gUU' or '3guu'.)
+        """
+        @handle(*(keys + keys[-1:]), filter=navigation_mode)
+        def _(event):
+            buffer = event.current_buffer
+            cursor_position = buffer.cursor_position
+            current_row = buffer.document.cursor_position_row
+
+            buffer.transform_line_range(current_row, current_row + event.arg, transform_func)
+            buffer.cursor_position = cursor_position
+
+    for k, f in vi_transform_functions:
+        create_line_transform_handler(k, f)
+
     @handle(Keys.ControlX, Keys.ControlL, filter=insert_mode)
     def _(event):
         """
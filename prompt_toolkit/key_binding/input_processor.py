@@ -8,6 +8,7 @@ correct callbacks when new key presses are feed through `feed_key`.
 """
 from __future__ import unicode_literals
 from ..keys import Keys
+from ..utils import DummyContext
 
 import weakref
 
@@ -145,7 +146,16 @@ class InputProcessor(object):
         """
         Send a new :class:`KeyPress` into this processor.
         """
-        self._process_coroutine.send(key_press)
+        with self._timer('dispatch'):
+            self._process_coroutine.send(key_press)
+
+    def _timer(self, name):
+        cli = self._cli_ref()
+
+        if cli is None:
+            return DummyContext()
+        else:
+            return cli.instrumentation.timer(name)
 
     def _call_handler(self, handler, key_sequence=None):
         arg = self.arg
@@ -153,8 +163,9 @@ class InputProcessor(object):
 
         event = Event(weakref.ref(self), arg=arg, key_sequence=key_sequence,
                       previous_key_sequence=self._previous_key_sequence)
-        handler.call(event)
-        self._registry.onHandlerCalled.fire(event)
+        with self._timer('handler'):
+            handler.call(event)
+            self._registry.onHandlerCalled.fire(event)
 
         self._previous_key_sequence = key_sequence
 
@@ -2,6 +2,8 @@ from __future__ import unicode_literals
 
 from pygments.token import Token
 
+from prompt_toolkit.utils import get_cwidth, get_string_width
+
 __all__ = (
     'CompletionsMenu',
 )
@@ -16,6 +18,9 @@ class CompletionsMenu(object):
         self.buffer_name = buffer_name
         self.token = Token.Menu.Completions
 
+        # (completions, count, summary) for the last list of completions.
+        self._summary = None
+
     def is_visible(self, cli):
         """
         True when this menu is visible.
@@ -81,25 +86,44 @@ class CompletionsMenu(object):
 
             screen.write_highlighted_at_pos(y+i, x, tokens, z_index=10)
 
+    def _get_summary(self, complete_state):
+        """
+        Return (max_display_width, max_meta_width, show_meta) for the current
+        completions. This is computed only once for each list of completions,
+        so that moving the selection doesn't walk through all of them again.
+        """
+        completions = complete_state.current_completions
+        summary = self._summary
+
+        if summary is None or summary[0] is not completions or summary[1] != len(completions):
+            max_display_width = max([get_string_width(c.display) for c in completions] or [0])
+            max_meta_width = max([get_string_width(c.display_meta) for c in completions] or [0])
+            show_meta = any(c.display_meta for c in completions)
+
+            summary = (completions, len(completions), (max_display_width, max_meta_width, show_meta))
+            self._summary = summary
+
+        return summary[2]
+
     def show_meta(self, complete_state):
         """
         Return ``True`` if we need to show a column with meta information.
         """
-        return any(c.display_meta for c in complete_state.current_completions)
+        return self._get_summary(complete_state)[2]
 
     def get_menu_width(self, screen, complete_state, x_pos):
         """
         Return the width of the main column.
         """
         max_display = int(screen.size.columns - x_pos - 6)
-        return min(max_display, max(len(c.display) for c in complete_state.current_completions))
+        return min(max_display, self._get_summary(complete_state)[0])
 
     def get_menu_meta_width(self, screen, complete_state, x_pos):
         """
         Return the width of the meta column.
         """
         max_display_meta = int(screen.size.columns - x_pos - 8)
-        return min(max_display_meta, max(len(c.display_meta) for c in complete_state.current_completions))
+        return min(max_display_meta, self._get_summary(complete_state)[1])
 
     def get_menu_item_tokens(self, completion, is_current_completion, width):
         if is_current_completion:
@@ -107,8 +131,8 @@ class CompletionsMenu(object):
         else:
             token = self.token.Completion
 
-        text = self._trim_text(completion.display, width)
-        return [(token, ' %%-%is ' % width % text)]
+        text, text_width = self._trim_text(completion.display, width)
+        return [(token, ' %s%s ' % (text, ' ' * (width - text_width)))]
 
     def get_menu_item_meta_tokens(self, completion, is_current_completion, width):
         if is_current_completion:
@@ -116,16 +140,33 @@ class CompletionsMenu(object):
         else:
             token = self.token.Meta
 
-        text = self._trim_text(completion.display_meta, width)
-        return [(token, ' %%-%is ' % width % text or 'none')]
+        text, text_width = self._trim_text(completion.display_meta, width)
+        return [(token, ' %s%s ' % (text, ' ' * (width - text_width)))]
 
     def _trim_text(self, text, max_width):
         """
         Trim the text to `max_width`, append dots when the text is too long.
+        Returns (text, width) tuple.
         """
-        # TODO: support for double width characters.
-        if len(text) > max_width:
-            return (text[:max(1, max_width-3)] + '...')[:max_width]
+        width = get_string_width(text)
+
+        if width > max_width:
+            # When there are double width characters, the result can be one
+            # cell less than `max_width`.
+            remaining_width = min(max_width, max(1, max_width - 3))
+            result = []
+            width = 0
+
+            for c in text:
+                w = max(0, get_cwidth(c))
+                if width + w > remaining_width:
+                    break
+                result.append(c)
+                width += w
+
+            dots = '...'[:max(0, max_width - width)]
+            result.append(dots)
+            return ''.join(result), width + len(dots)
         else:
-            return text
+            return text, width
 
@@ -1,6 +1,7 @@
 from __future__ import unicode_literals
 
-from pygments.lexers import BashLexer
+import bisect
+
 from pygments.token import Token
 
 from ..enums import IncrementalSearchDirection
@@ -8,6 +9,7 @@ from ..layout import Layout
 from ..layout.prompt import Prompt
 
 from .utils import fit_tokens_in_size
+from ..utils import get_string_width
 
 __all__ = (
     'ArgToolbar',
@@ -24,17 +26,31 @@ class Toolbar(object):
         self.token = token or Token.Toolbar
         self.height = height
 
+        # (key, token_lines) of the previous `write` call.
+        self._cache = None
+
     def write(self, cli, screen):
         width = screen.size.columns
-        tokens = self.get_tokens(cli, width)
+        y = screen._y
+
+        # Reuse the tokens of the previous render, if nothing changed.
+        state_key = self.get_state_key(cli)
+        key = (width, self.height, state_key)
+
+        if state_key is not None and self._cache and self._cache[0] == key:
+            token_lines = self._cache[1]
+        else:
+            tokens = self.get_tokens(cli, width)
+
+            # Make sure that this list of tokens fit the amount of columns and rows.
+            token_lines = fit_tokens_in_size(
+                tokens, width=screen.size.columns, height=self.height,
+                default_token=self.token)
 
-        # Make sure that this list of tokens fit the amount of columns and rows.
-        token_lines = fit_tokens_in_size(
-            tokens, width=screen.size.columns, height=self.height,
-            default_token=self.token)
+            if state_key is not None:
+                self._cache = (key, token_lines)
 
         # Write to screen.
-        y = screen._y
         for i, tokens in enumerate(token_lines):
             screen._y = y + i
             screen._x = 0
@@ -43,15 +59,33 @@ class Toolbar(object):
     def is_visible(self, cli):
         return not (cli.is_exiting or cli.is_aborting or cli.is_returning)
 
+    def get_state_key(self, cli):
+        """
+        Return a value that changes whenever the output of `get_tokens`
+        changes. When it's equal to the key of the previous render, the
+        previous output is reused. `None` means: call `get_tokens` for every
+        render.
+        """
+        return None
+
     def get_tokens(self, cli, width):
         return []
 
 
+def _get_function(method):
+    # (On Python 2, the methods of a class are unbound method objects.)
+    return getattr(method, '__func__', method)
+
+
 class TextToolbar(Toolbar):
     """
     :param text: The text to be displayed.
     :param token: Default token for the text.
     :param lexer: (optional) Pygments lexer for highlighting of the text.
+
+    The output is cached as long as `text` doesn't change. (Not for
+    subclasses that override `get_tokens`, unless they override
+    `get_state_key` as well.)
     """
     def __init__(self, text='', token=None, height=1, lexer=None):
         super(TextToolbar, self).__init__(token=token, height=height)
@@ -65,6 +99,12 @@ class TextToolbar(Toolbar):
         else:
             self.lexer = None
 
+    def get_state_key(self, cli):
+        if _get_function(type(self).get_tokens) is _get_function(TextToolbar.get_tokens):
+            return self.text
+        else:
+            return None
+
     def get_tokens(self, cli, width):
         if self.lexer is None:
             return [(self.token, self.text)]
@@ -84,6 +124,9 @@ class ArgToolbar(Toolbar):
         return super(ArgToolbar, self).is_visible(cli) and \
             cli.input_processor.arg is not None
 
+    def get_state_key(self, cli):
+        return cli.input_processor.arg
+
     def get_tokens(self, cli, width):
         return [
             (Token.Toolbar.Arg, 'Repeat: '),
@@ -91,6 +134,13 @@ class ArgToolbar(Toolbar):
         ]
 
 
+def _create_bash_lexer(*a, **kw):
+    # Importing the Pygments lexers is slow, only do it when the toolbar is
+    # created.
+    from pygments.lexers import BashLexer
+    return BashLexer(*a, **kw)
+
+
 class SystemToolbar(Toolbar):
     """
     The system toolbar. Shows the '!'-prompt.
@@ -101,7 +151,7 @@ class SystemToolbar(Toolbar):
 
         # We use a nested single-line-no-wrap layout for this.
         self.layout = Layout(before_input=Prompt('Shell command: ', token=token.Prefix),
-                             lexer=BashLexer,
+                             lexer=_create_bash_lexer,
                              buffer_name='system')
         self.buffer_name = buffer_name
 
@@ -171,11 +221,56 @@ class CompletionsToolbar(Toolbar):
         super(CompletionsToolbar, self).__init__(token=token)
         self.buffer_name = buffer_name
 
+        # (completions, (content_width, count), page_starts) for the last
+        # list of completions.
+        self._pages = None
+
     def is_visible(self, cli):
         return super(CompletionsToolbar, self).is_visible(cli) and \
             bool(cli.buffers[self.buffer_name].complete_state) and \
             len(cli.buffers[self.buffer_name].complete_state.current_completions) >= 1
 
+    def get_state_key(self, cli):
+        complete_state = cli.buffers[self.buffer_name].complete_state
+        return (complete_state, complete_state.complete_index,
+                len(complete_state.current_completions))
+
+    def _get_page(self, completions, index, content_width):
+        """
+        Return the (start, end) indexes of the page of completions that
+        contains `index`.
+
+        The completions are split in pages that fit in `content_width`. The
+        page boundaries are computed lazily, only until the page that we need,
+        and are kept for the following renders.
+        """
+        pages = self._pages
+
+        key = (content_width, len(completions))
+
+        if pages is None or pages[0] is not completions or pages[1] != key:
+            pages = (completions, key, [0])
+            self._pages = pages
+
+        page_starts = pages[2]
+
+        while page_starts[-1] <= index and page_starts[-1] < len(completions):
+            # Fill the next page. (Every page has at least one completion.)
+            i = page_starts[-1]
+            used_width = 0
+
+            while i < len(completions):
+                w = get_string_width(completions[i].display) + 1
+                if used_width + w > content_width and i > page_starts[-1]:
+                    break
+                used_width += w
+                i += 1
+
+            page_starts.append(i)
+
+        i = bisect.bisect_right(page_starts, index) - 1
+        return page_starts[i], page_starts[min(i + 1, len(page_starts) - 1)]
+
     def get_tokens(self, cli, width):
         """
         Write the menu to the screen object.
@@ -191,31 +286,23 @@ class CompletionsToolbar(Toolbar):
         # Width of the completions without the left/right arrows in the margins.
         content_width = width - 6
 
+        # Only look at the completions of the visible page.
+        start, end = self._get_page(completions, index or 0, content_width)
+
         # Booleans indicating whether we stripped from the left/right
-        cut_left = False
-        cut_right = False
+        cut_left = start > 0
+        cut_right = end < len(completions)
 
         # Create Menu content.
         tokens = []
 
-        for i, c in enumerate(completions):
-            # When there is no more place for the next completion
-            if len(tokens) + len(c.display) >= content_width:
-                # If the current one was not yet displayed, page to the next sequence.
-                if i <= (index or 0):
-                    tokens = []
-                    cut_left = True
-                # If the current one is visible, stop here.
-                else:
-                    cut_right = True
-                    break
-
-            tokens.append((self.token.Completion.Current if i == index else self.token.Completion, c.display))
+        for i in range(start, end):
+            tokens.append((self.token.Completion.Current if i == index else self.token.Completion,
+                           completions[i].display))
             tokens.append((self.token, ' '))
 
         # Extend/strip until the content width.
-        tokens.append((self.token, ' ' * (content_width - len(tokens))))
-        tokens = tokens[:content_width]
+        tokens = fit_tokens_in_size(tokens, width=content_width, default_token=self.token)[0]
 
         # Return tokens
         return [
@@ -242,6 +329,10 @@ class ValidationToolbar(Toolbar):
         return super(ValidationToolbar, self).is_visible(cli) and \
             bool(cli.current_buffer.validation_error)
 
+    def get_state_key(self, cli):
+        # (The validation error is reset when the text changes.)
+        return cli.buffers[self.buffer_name].validation_error
+
     def get_tokens(self, cli, width):
         buffer = cli.buffers[self.buffer_name]
 
@@ -1,7 +1,7 @@
 from __future__ import unicode_literals
 from pygments.token import Token
 
-from prompt_toolkit.utils import get_cwidth
+from prompt_toolkit.utils import get_cwidth, get_string_width
 
 __all__ = (
     'TokenList',
@@ -77,24 +77,47 @@ def fit_tokens_in_size(tokens, width, height=1, default_token=Token):
     result = [[]]  # List of lines
     line_index = 0
     line_width = 0
-
-    for token, character in explode_tokens(tokens):
-        if character == '\n':
-            # Fill row.
-            if width - line_width > 0:
-                result[line_index] += [(default_token, ' ' * (width - line_width))]
-
-            if len(result) == height:
-                break
-
-            line_index += 1
-            line_width = 0
-            result.append([])
-        else:
-            w = get_cwidth(character)
-            line_width += w
-            if line_width <= width:
-                result[line_index].append((token, character))
+    done = False
+
+    for token, text in tokens:
+        for i, part in enumerate(text.split('\n')):
+            if i > 0:
+                # Newline. Fill row.
+                if width - line_width > 0:
+                    result[line_index] += [(default_token, ' ' * (width - line_width))]
+
+                if len(result) == height:
+                    done = True
+                    break
+
+                line_index += 1
+                line_width = 0
+                result.append([])
+
+            # Measure the whole run at once. Only when it doesn't fit, we look
+            # at the widths of the individual characters.
+            w = get_string_width(part)
+
+            if line_width + w <= width:
+                result[line_index].extend((token, c) for c in part)
+                line_width += w
+            else:
+                for c in part:
+                    w = max(0, get_cwidth(c))
+
+                    if line_width + w <= width:
+                        result[line_index].append((token, c))
+                        line_width += w
+                    else:
+                        # The line is full. (When a double width character
+                        # doesn't fit, fill the last cell with a space.)
+                        if width - line_width > 0:
+                            result[line_index] += [(default_token, ' ' * (width - line_width))]
+                        line_width = width
+                        break
+
+        if done:
+            break
 
     # Fill current row.
     if width - line_width > 0:
@@ -12,7 +12,7 @@ from collections import defaultdict, namedtuple
 from pygments.style import Style
 from pygments.token import Token
 
-from .utils import get_cwidth
+from .utils import get_cwidth, get_string_width
 
 if sys.platform == 'win32':
     from .terminal.win32_output import Win32Output as Output
@@ -88,7 +88,7 @@ class Char(object):
         if len(char) == 1:
             return max(0, get_cwidth(char))
         else:
-            return max(0, sum(get_cwidth(c) for c in char))
+            return get_string_width(char)
 
     def __repr__(self):
         return 'Char(%r, %r, %r)' % (self.char, self.token, self.z_index)
@@ -188,7 +188,14 @@ class Screen(object):
 
         :param data: Enumerable of (Token, text) tuples.
         """
+        columns = self.size.columns
+
         for token, text in data:
+            # Widths are never negative, so once we are outside the margin,
+            # nothing of the remaining text will be visible.
+            if x >= columns:
+                break
+
             for c in text:
                 char_obj = Char(c, token, z_index)
                 self.write_at_pos(y, x, char_obj)
@@ -203,9 +210,12 @@ class Screen(object):
                 self.write_char(c, token=token)
 
 
-def output_screen_diff(output, screen, current_pos, previous_screen=None, last_char=None, accept_or_abort=False, style=None, grayed=False):
+def output_screen_diff(output, screen, current_pos, previous_screen=None, last_char=None, accept_or_abort=False, style=None, grayed=False, instrumentation=None):
     """
     Create diff of this screen with the previous screen.
+
+    :param instrumentation: When given, the number of cells that were
+        compared is reported to this `Instrumentation` instance.
     """
     #: Remember the last printed character.
     last_char = [last_char]  # nonlocal
@@ -295,8 +305,10 @@ def output_screen_diff(output, screen, current_pos, previous_screen=None, last_c
         output.disable_autowrap()
         output.reset_attributes()
 
-    # When the previous screen has a different size, redraw everything anyway.
-    if not previous_screen or previous_screen.size != screen.size:
+    # When the previous screen has a different width, redraw everything
+    # anyway. (A different number of rows doesn't change the position of the
+    # characters.)
+    if not previous_screen or previous_screen.size.columns != screen.size.columns:
         current_pos = move_cursor(Point(0, 0))
         output.reset_attributes()
         output.erase_down()
@@ -310,6 +322,7 @@ def output_screen_diff(output, screen, current_pos, previous_screen=None, last_c
     # Loop over the rows.
     row_count = max(screen.current_height, previous_screen.current_height)
     c = 0  # Column counter.
+    cells_diffed = 0
 
     for y, r in enumerate(range(0, row_count)):
         new_row = screen._buffer[r]
@@ -318,6 +331,8 @@ def output_screen_diff(output, screen, current_pos, previous_screen=None, last_c
         new_max_line_len = max(new_row.keys()) if new_row else 0
         previous_max_line_len = max(previous_row.keys()) if previous_row else 0
 
+        cells_diffed += new_max_line_len + 1
+
         # Loop over the columns.
         c = 0
         while c < new_max_line_len + 1:
@@ -337,6 +352,9 @@ def output_screen_diff(output, screen, current_pos, previous_screen=None, last_c
             output.erase_end_of_line()
             last_char[0] = None  # Forget last char after resetting attributes.
 
+    if instrumentation:
+        instrumentation.count('cells_diffed', cells_diffed)
+
     # Move cursor:
     if accept_or_abort:
         current_pos = move_cursor(Point(y=current_height, x=0))
@@ -373,6 +391,15 @@ class Renderer(object):
         self._style = style or Style
         self._last_screen = None
 
+        #: Number of rows from the cursor until the bottom of the terminal, when
+        #: we can derive it from our own output. (After accepting the input or
+        #: clearing the screen.) When set, the next
+        #: `request_absolute_cursor_position` call doesn't need a CPR request.
+        self._rows_below_cursor = None
+
+        #: Height to assume until the answer of a CPR request arrives.
+        self._height_estimate = 0
+
         self.reset()
 
     def reset(self):
@@ -390,6 +417,10 @@ class Renderer(object):
         #: We don't know this until a `report_absolute_cursor_row` call.
         self._min_available_height = 0
 
+        #: True when `_min_available_height` is exact, not an estimate.
+        self._min_available_height_known = False
+        self._requested_cursor_y = 0
+
         # In case of Windown, also make sure to scroll to the current cursor
         # position.
         if sys.platform == 'win32':
@@ -417,18 +448,44 @@ class Renderer(object):
         For vt100: Do CPR request. (answer will arrive later.)
         For win32: Do API call. (Answer comes immediately.)
         """
-        # Only do this request when the cursor is at the top row. (after a
-        # clear or reset). We will rely on that in `report_absolute_cursor_row`.
-        assert self._cursor_pos.y == 0
+        # Remember the row of the cursor in our output. The report tells us
+        # the absolute row of the cursor, not of the top of the layout.
+        self._requested_cursor_y = self._cursor_pos.y
+
+        # When we know where our own output left the cursor, there's no need
+        # to ask the terminal.
+        if self._rows_below_cursor is not None:
+            self._min_available_height = self._rows_below_cursor
+            self._min_available_height_known = True
+            self._rows_below_cursor = None
+            self._height_estimate = 0
+            return
 
         # For Win32, we have an API call to get the number of rows below the
         # cursor.
         if sys.platform == 'win32':
-            self._min_available_height = Output(self.stdout).get_rows_below_cursor_position()
+            self._min_available_height = (
+                Output(self.stdout).get_rows_below_cursor_position() + self._cursor_pos.y)
+            self._min_available_height_known = True
         else:
-            # Asks for a cursor position report (CPR).
+            # Asks for a cursor position report (CPR). Over a slow connection,
+            # the answer can take a while, so render already using the
+            # estimate. (`report_absolute_cursor_row` will correct it.)
+            self._min_available_height = self._height_estimate
+            self._min_available_height_known = False
             self._write_and_flush('\x1b[6n')
 
+        self._height_estimate = 0
+
+    def forget_cursor_row(self):
+        """
+        Forget what we know about the cursor position. To be called when
+        something else can write to the output. (Like between two
+        ``read_input`` calls.)
+        """
+        self._rows_below_cursor = None
+        self._height_estimate = 0
+
     def report_absolute_cursor_row(self, row):
         """
         To be called when we know the absolute cursor position.
@@ -439,13 +496,14 @@ class Renderer(object):
         total_rows = Output(self.stdout).get_size().rows
         rows_below_cursor = total_rows - row + 1
 
-        # Set the
-        self._min_available_height = rows_below_cursor
+        self._min_available_height = rows_below_cursor + self._requested_cursor_y
+        self._min_available_height_known = True
 
     def render(self, cli):
         """
         Render the current interface to the output.
         """
+        instrumentation = cli.instrumentation
         output = Output(self.stdout)
 
         # Create screen and write layout to it.
@@ -453,20 +511,36 @@ class Renderer(object):
 
         height = self._last_screen.current_height if self._last_screen else 0
         height = max(self._min_available_height, height)
-        self.layout.write_to_screen(cli, screen, height)
+
+        with instrumentation.timer('write_to_screen'):
+            self.layout.write_to_screen(cli, screen, height)
 
         accept_or_abort = cli.is_exiting or cli.is_aborting or cli.is_returning
 
         # Process diff and write to output.
-        output_buffer = []
-        self._cursor_pos, self._last_char = output_screen_diff(
-            output, screen, self._cursor_pos,
-            self._last_screen, self._last_char, accept_or_abort,
-            style=self._style, grayed=cli.is_aborting,
-            )
+        with instrumentation.timer('output_screen_diff'):
+            self._cursor_pos, self._last_char = output_screen_diff(
+                output, screen, self._cursor_pos,
+                self._last_screen, self._last_char, accept_or_abort,
+                style=self._style, grayed=cli.is_aborting,
+                instrumentation=instrumentation if instrumentation.enabled else None,
+                )
         self._last_screen = screen
 
-        output.flush()
+        # After accepting the input, the cursor is right below the output. If
+        # we knew the space below the layout, we also know the space below the
+        # cursor. (When there wasn't enough space, the terminal scrolled and
+        # the cursor is on the last row.)
+        if accept_or_abort and self._min_available_height_known:
+            self._rows_below_cursor = max(1, self._min_available_height - screen.current_height)
+
+        if instrumentation.enabled:
+            instrumentation.count('bytes_written', sum(len(s) for s in output._buffer))
+
+        with instrumentation.timer('flush'):
+            output.flush()
+
+        instrumentation.publish()
 
     def erase(self):
         """
@@ -482,8 +556,32 @@ class Renderer(object):
         output.reset_attributes()
         output.flush()
 
+        # Whatever is written above the prompt only moves the cursor down, so
+        # the prompt will get at most the space that it had before. Use the
+        # previous height as an estimate, until we know better.
+        if self._last_screen:
+            self._height_estimate = self._last_screen.current_height
+
+        self._rows_below_cursor = None
         self.reset()
 
+    def resize(self):
+        """
+        Handle a change of the terminal size, and request the cursor position
+        again. When only rows were added, the output is kept, and the next
+        render only redraws what changed. Otherwise, the output is erased.
+        """
+        size = Output(self.stdout).get_size()
+        last_screen = self._last_screen
+
+        if not (last_screen and last_screen.size.columns == size.columns and
+                last_screen.size.rows <= size.rows):
+            # When the terminal becomes narrower, it can rewrap our output.
+            # When it has less rows, it can drop the bottom rows.
+            self.erase()
+
+        self.request_absolute_cursor_position()
+
     def clear(self):
         """
         Clear screen and go to 0,0
@@ -498,4 +596,7 @@ class Renderer(object):
         output.cursor_goto(0, 0)
         output.flush()
 
+        # The cursor is now at the top of the terminal.
+        self._rows_below_cursor = output.get_size().rows
+
         self.request_absolute_cursor_position()
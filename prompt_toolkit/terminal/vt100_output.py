@@ -1,6 +1,4 @@
 from __future__ import unicode_literals
-from pygments.formatters.terminal256 import Terminal256Formatter, EscapeSequence
-
 import array
 import fcntl
 import six
@@ -8,8 +6,10 @@ import termios
 import errno
 
 
-# Global variable to keep the colour table in memory.
-_tf = Terminal256Formatter()
+# Global variables to keep the colour table in memory. (Created on first use,
+# because importing the Pygments formatters is slow.)
+_tf = None
+_EscapeSequence = None
 
 #: If True: write the output of the renderer also to the following file. This
 #: is very useful for debugging. (e.g.: to see that we don't write more bytes
@@ -85,10 +85,17 @@ class Vt100_Output(object):
         """
         Create new style and output.
         """
+        global _tf, _EscapeSequence
+
+        if _tf is None:
+            from pygments.formatters.terminal256 import Terminal256Formatter, EscapeSequence
+            _tf = Terminal256Formatter()
+            _EscapeSequence = EscapeSequence
+
         fg = _tf._color_index(fgcolor) if fgcolor else None
         bg = _tf._color_index(bgcolor) if bgcolor else None
 
-        e = EscapeSequence(fg=fg, bg=bg, bold=bold, underline=underline)
+        e = _EscapeSequence(fg=fg, bg=bg, bold=bold, underline=underline)
 
         self.reset_attributes()
         self.write(e.color_string())
@@ -1,5 +1,6 @@
 from __future__ import unicode_literals
 
+import re
 import six
 
 try:
@@ -11,6 +12,8 @@ except ImportError:
 __all__ = (
     'EventHook',
     'DummyContext',
+    'get_cwidth',
+    'get_string_width',
 )
 
 
@@ -52,15 +55,59 @@ class DummyContext(object):
         pass
 
 
-#: Cache for wcwidth sizes.
-_CHAR_SIZES_CACHE = [wcwidth(six.unichr(i)) for i in range(0, 64000)]
+class _CharSizesCache(dict):
+    """
+    Cache for wcwidth sizes.
+
+    This is a two-level table. It maps the block number (the code point
+    divided by 256) to a list with the widths of the 256 characters in that
+    block. A block is only calculated the first time that one of its
+    characters is used. (This keeps the import fast, and also covers the code
+    points outside the BMP.)
+    """
+    def __missing__(self, block):
+        start = block << 8
+        result = [wcwidth(six.unichr(i)) for i in range(start, start + 256)]
+        self[block] = result
+        return result
+
+
+_CHAR_SIZES_CACHE = _CharSizesCache()
 
 
 def get_cwidth(c):
     """
     Return width of character. Wrapper around ``wcwidth``.
     """
+    o = ord(c)
+    return _CHAR_SIZES_CACHE[o >> 8][o & 0xff]
+
+
+#: Strings that only contain printable ASCII characters. (All of them have a
+#: width of one.)
+_PRINTABLE_ASCII_RE = re.compile(r'[\x20-\x7e]*\Z')
+
+#: Cache for the widths of strings that contain other characters.
+_STRING_WIDTHS_CACHE = {}
+_STRING_WIDTHS_CACHE_SIZE = 1000
+
+
+def get_string_width(text):
+    """
+    Return the width of a string. This is the sum of the widths of all the
+    characters. (Non printable characters count as zero.)
+    """
+    # ASCII fast path.
+    if _PRINTABLE_ASCII_RE.match(text):
+        return len(text)
+
     try:
-        return _CHAR_SIZES_CACHE[ord(c)]
-    except IndexError:
-        return wcwidth(c)
+        return _STRING_WIDTHS_CACHE[text]
+    except KeyError:
+        result = sum(max(0, get_cwidth(c)) for c in text)
+
+        if len(_STRING_WIDTHS_CACHE) >= _STRING_WIDTHS_CACHE_SIZE:
+            _STRING_WIDTHS_CACHE.clear()
+        _STRING_WIDTHS_CACHE[text] = result
+
+        return result
@@ -18,6 +18,8 @@ setup(
             'pygments',
             'six>=1.8.0',
             'wcwidth',
+            'futures; python_version < "3.2"',
+            'selectors34; python_version < "3.4"',
         ],
         entry_points={
             'console_scripts': [
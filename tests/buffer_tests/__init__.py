@@ -1,6 +1,7 @@
 from __future__ import unicode_literals
 
-from prompt_toolkit.buffer import Buffer
+from prompt_toolkit.buffer import Buffer, indent, unindent
+from prompt_toolkit.history import History
 
 import unittest
 
@@ -100,3 +101,117 @@ class BufferTest(unittest.TestCase):
         self.buffer.swap_characters_before_cursor()
 
         self.assertEqual(self.buffer.text, 'hello wrold')
+
+    def test_transform_line_range(self):
+        self.buffer.insert_text('a\nb\nc\nd')
+
+        changes = []
+        self.buffer.onTextChanged += lambda: changes.append(True)
+
+        self.buffer.transform_line_range(1, 3, lambda l: l.upper())
+        self.assertEqual(self.buffer.text, 'a\nB\nC\nd')
+        self.assertEqual(len(changes), 1)
+
+        # Lines beyond the end are ignored.
+        self.buffer.transform_line_range(3, 10, lambda l: l + '!')
+        self.assertEqual(self.buffer.text, 'a\nB\nC\nd!')
+
+        self.buffer.transform_line_range(10, 12, lambda l: l + '!')
+        self.assertEqual(self.buffer.text, 'a\nB\nC\nd!')
+
+    def test_indent_and_unindent(self):
+        self.buffer.insert_text('a\n  b\nc')
+
+        indent(self.buffer, 0, 2)
+        self.assertEqual(self.buffer.text, '    a\n      b\nc')
+        self.assertEqual(self.buffer.cursor_position, len('    a\n      b\n'))
+
+        unindent(self.buffer, 0, 3)
+        self.assertEqual(self.buffer.text, 'a\n  b\nc')
+
+    def test_join_next_line_with_count(self):
+        self.buffer.insert_text('a\nb\nc\nd')
+        self.buffer.cursor_position = 0
+        self.buffer.join_next_line(count=2)
+
+        self.assertEqual(self.buffer.text, 'abc\nd')
+        self.assertEqual(self.buffer.cursor_position, 2)
+
+        # More than the number of lines.
+        self.buffer.join_next_line(count=10)
+        self.assertEqual(self.buffer.text, 'abcd')
+        self.assertEqual(self.buffer.cursor_position, 4)
+
+    def test_delete_with_count(self):
+        self.buffer.insert_text('hello')
+        self.buffer.cursor_position = 2
+
+        self.assertEqual(self.buffer.delete_before_cursor(count=10), 'he')
+        self.assertEqual(self.buffer.delete(count=2), 'll')
+        self.assertEqual(self.buffer.text, 'o')
+
+    def test_undo_with_count(self):
+        for text in ('a', 'b', 'c'):
+            self.buffer.save_to_undo_stack()
+            self.buffer.insert_text(text)
+
+        changes = []
+        self.buffer.onTextChanged += lambda: changes.append(True)
+
+        self.buffer.undo(count=2)
+        self.assertEqual(self.buffer.text, 'a')
+        self.assertEqual(len(changes), 1)
+
+    def test_working_lines_on_top_of_history(self):
+        history = History()
+        history.append('a')
+        history.append('b')
+
+        buffer = Buffer(history=history)
+        buffer.insert_text('c')
+
+        buffer.history_backward()
+        self.assertEqual(buffer.text, 'b')
+
+        # Editing an entry doesn't change the history.
+        buffer.insert_text('x')
+        self.assertEqual(buffer.text, 'bx')
+        self.assertEqual(list(history), ['a', 'b'])
+        self.assertEqual(list(buffer._working_lines), ['a', 'bx', 'c'])
+
+        # Accepting it appends to the history, and starts with clean working
+        # lines.
+        buffer.reset(append_to_history=True)
+        self.assertEqual(list(history), ['a', 'b', 'bx'])
+        self.assertEqual(list(buffer._working_lines), ['a', 'b', 'bx', ''])
+
+    def test_delete_working_line(self):
+        history = History()
+        history.append('a')
+        history.append('b')
+
+        buffer = Buffer(history=history)
+        del buffer._working_lines[0]
+
+        self.assertEqual(list(buffer._working_lines), ['b', ''])
+        self.assertEqual(list(history), ['a', 'b'])
+
+    def test_delete_working_lines_keeps_edits(self):
+        history = History()
+        for text in ['a', 'b', 'c', 'd']:
+            history.append(text)
+
+        buffer = Buffer(history=history)
+        buffer._working_lines[2] = 'cx'
+        buffer._working_lines[4] = 'e'
+
+        del buffer._working_lines[1]
+        self.assertEqual(list(buffer._working_lines), ['a', 'cx', 'd', 'e'])
+
+        del buffer._working_lines[0]
+        buffer._working_lines[1] = 'dx'
+        del buffer._working_lines[-1]
+        self.assertEqual(list(buffer._working_lines), ['cx', 'dx'])
+
+        # The history itself is not modified.
+        self.assertEqual(list(history), ['a', 'b', 'c', 'd'])
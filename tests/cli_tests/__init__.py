@@ -0,0 +1,300 @@
+from __future__ import unicode_literals
+
+from prompt_toolkit import CommandLineInterface
+from prompt_toolkit.buffer import Buffer
+from prompt_toolkit.validation import Validator, ValidationError
+
+import six
+import sys
+import threading
+import unittest
+
+
+class RunInExecutorTest(unittest.TestCase):
+    def test_returns_future(self):
+        cli = CommandLineInterface()
+        future = cli.run_in_executor(lambda: 42)
+
+        self.assertEqual(future.result(timeout=5), 42)
+
+    def test_bounded_and_reused_thread_pool(self):
+        cli = CommandLineInterface(executor_max_workers=2)
+        threads = set()
+        lock = threading.Lock()
+
+        def run():
+            with lock:
+                threads.add(threading.current_thread())
+
+        for _ in range(20):
+            cli.run_in_executor(run)
+
+        # Wait for the queued callbacks.
+        cli.run_in_executor(lambda: None).result(timeout=5)
+        executor = cli._executor
+        cli.run_in_executor(lambda: None).result(timeout=5)
+
+        self.assertTrue(len(threads) <= 2)
+        self.assertTrue(cli._executor is executor)
+
+    def test_thread_pool_created_on_first_use(self):
+        cli = CommandLineInterface()
+        self.assertTrue(cli._executor is None)
+
+        cli.run_in_executor(lambda: None).result(timeout=5)
+        self.assertTrue(cli._executor is not None)
+
+    def test_exceptions_are_reported(self):
+        cli = CommandLineInterface()
+
+        def fail():
+            raise ValueError('failed in executor')
+
+        stderr = six.StringIO()
+        original_stderr = sys.stderr
+        sys.stderr = stderr
+        try:
+            future = cli.run_in_executor(fail)
+            self.assertRaises(ValueError, future.result, 5)
+
+            # (Wait for the done callback in the worker thread.)
+            cli._executor.shutdown(wait=True)
+        finally:
+            sys.stderr = original_stderr
+
+        self.assertTrue('ValueError: failed in executor' in stderr.getvalue())
+
+    def test_close_shuts_down_thread_pool(self):
+        cli = CommandLineInterface()
+        cli.run_in_executor(lambda: None).result(timeout=5)
+        executor = cli._executor
+
+        cli.close()
+        self.assertTrue(cli._executor is None)
+        self.assertRaises(RuntimeError, executor.submit, lambda: None)
+
+
+class InstrumentationTest(unittest.TestCase):
+    def test_nested_timers_are_exclusive(self):
+        from prompt_toolkit.instrumentation import Instrumentation
+        import time
+
+        instrumentation = Instrumentation()
+        published = []
+        instrumentation.onTimings += published.append
+
+        # Disabled: nothing recorded.
+        with instrumentation.timer('parse'):
+            pass
+        instrumentation.publish()
+        self.assertEqual(published, [])
+
+        instrumentation.enabled = True
+
+        with instrumentation.timer('parse'):
+            with instrumentation.timer('handler'):
+                time.sleep(0.02)
+        instrumentation.count('bytes_written', 10)
+        instrumentation.publish()
+
+        timings = published[0]
+        self.assertTrue(timings.durations['handler'] >= 0.02)
+        self.assertTrue(timings.durations['parse'] < 0.02)
+        self.assertEqual(timings.counts, {'bytes_written': 10})
+
+
+class _EventLoopMock(object):
+    def __init__(self):
+        self.calls = []
+
+    def call_from_executor(self, callback):
+        self.calls.append(callback)
+
+    def call_later(self, delay, callback):
+        raise NotImplementedError
+
+    def run_calls(self):
+        calls, self.calls = self.calls, []
+        for c in calls:
+            c()
+
+
+class StdoutProxyTest(unittest.TestCase):
+    def setUp(self):
+        self.stdout = six.StringIO()
+        self.cli = CommandLineInterface(stdout=self.stdout)
+
+        # Pretend that we are reading input.
+        self.terminal_runs = []
+
+        def run_in_terminal(func):
+            self.terminal_runs.append(func)
+            func()
+
+        self.cli._run_in_terminal = run_in_terminal
+
+    def test_not_reading_input(self):
+        proxy = self.cli.stdout_proxy()
+        proxy.write('hello')
+        self.assertEqual(self.stdout.getvalue(), '')
+
+        proxy.write(' world\n')
+        self.assertEqual(self.stdout.getvalue(), 'hello world\n')
+
+    def test_batched_while_reading_input(self):
+        self.cli.eventloop = _EventLoopMock()
+        proxy = self.cli.stdout_proxy()
+
+        for i in range(100):
+            proxy.write('line %i\n' % i)
+
+        # One scheduled flush, one erase/redraw cycle.
+        self.assertEqual(len(self.cli.eventloop.calls), 1)
+        self.cli.eventloop.run_calls()
+
+        self.assertEqual(len(self.terminal_runs), 1)
+        self.assertEqual(self.stdout.getvalue(), ''.join('line %i\n' % i for i in range(100)))
+
+    def test_overflow_drops_oldest_lines(self):
+        self.cli.eventloop = _EventLoopMock()
+        proxy = self.cli.stdout_proxy(max_buffer_size=20)
+
+        for i in range(10):
+            proxy.write('line %i\n' % i)
+        self.cli.eventloop.run_calls()
+
+        self.assertEqual(self.stdout.getvalue(),
+                         '... (8 lines of output dropped)\nline 8\nline 9\n')
+
+    def test_pending_output_written_when_reading_ends(self):
+        self.cli.eventloop = _EventLoopMock()
+
+        with self.cli.patch_stdout_context():
+            proxy = sys.stdout
+            proxy.write('hello\n')
+
+            # The event loop goes away before the flush ran.
+            self.cli.eventloop = None
+            self.cli.onReadInputEnd.fire()
+
+        self.assertEqual(self.stdout.getvalue(), 'hello\n')
+
+    def test_flush_scheduled_in_next_session(self):
+        self.cli.eventloop = _EventLoopMock()
+
+        with self.cli.patch_stdout_context():
+            proxy = sys.stdout
+            proxy.write('hello\n')
+
+            # The session ends while the flush is still scheduled.
+            self.cli.eventloop = None
+            self.cli.onReadInputEnd.fire()
+
+            # In the next session, the output is flushed again.
+            self.cli.eventloop = _EventLoopMock()
+            proxy.write('world\n')
+            self.assertEqual(len(self.cli.eventloop.calls), 1)
+
+            self.cli.eventloop.run_calls()
+
+        self.assertEqual(self.stdout.getvalue(), 'hello\nworld\n')
+
+    def test_patch_stdout_context_unsubscribes(self):
+        calls = []
+
+        for i in range(3):
+            context = self.cli.patch_stdout_context()
+            context.new_stdout._reading_input_ended = lambda: calls.append(True)
+
+            with context:
+                self.cli.onReadInputEnd.fire()
+
+        self.assertEqual(len(calls), 3)
+
+        self.cli.onReadInputEnd.fire()
+        self.assertEqual(len(calls), 3)
+
+
+class _Timer(object):
+    def __init__(self, callback):
+        self.callback = callback
+        self.cancelled = False
+
+    def cancel(self):
+        self.cancelled = True
+
+
+class ResizeTest(unittest.TestCase):
+    def test_resize_events_are_debounced(self):
+        cli = CommandLineInterface(stdout=six.StringIO())
+        cli.eventloop = _EventLoopMock()
+
+        timers = []
+
+        def call_later(delay, callback):
+            timers.append(_Timer(callback))
+            return timers[-1]
+        cli.eventloop.call_later = call_later
+
+        resizes = []
+        cli.renderer.resize = lambda: resizes.append(True)
+        cli._redraw = lambda: None
+
+        # Five SIGWINCH signals while dragging the window.
+        for i in range(5):
+            cli._on_resize()
+            cli.eventloop.run_calls()
+
+        for t in timers:
+            if not t.cancelled:
+                t.callback()
+
+        self.assertEqual(len(timers), 5)
+        self.assertEqual(len(resizes), 1)
+
+
+class _CountingValidator(Validator):
+    def __init__(self):
+        self.calls = 0
+
+    def validate(self, document):
+        self.calls += 1
+        if 'x' in document.text:
+            raise ValidationError(index=document.text.index('x'), message='No x')
+
+
+class AsyncValidatorTest(unittest.TestCase):
+    def setUp(self):
+        self.validator = _CountingValidator()
+        self.buffer = Buffer(validator=self.validator)
+        self.cli = CommandLineInterface(stdout=six.StringIO(), buffer=self.buffer,
+                                        create_async_validators=True)
+        self.cli.eventloop = _EventLoopMock()
+        self.cli.run_in_executor = lambda callback: callback()
+        self.cli._redraw = lambda: None
+
+    def test_validated_while_idle(self):
+        self.buffer.insert_text('abxd')
+        self.cli.onInputTimeout.fire()
+        self.cli.eventloop.run_calls()
+
+        # The error is shown, without moving the cursor.
+        self.assertEqual(self.buffer.validation_error.index, 2)
+        self.assertEqual(self.buffer.cursor_position, 4)
+
+        # Accepting uses the cached result.
+        self.assertFalse(self.buffer.validate())
+        self.assertEqual(self.buffer.cursor_position, 2)
+        self.assertEqual(self.validator.calls, 1)
+
+    def test_text_changed_during_validation(self):
+        self.buffer.insert_text('abc')
+        self.cli.onInputTimeout.fire()
+        self.buffer.insert_text('x')
+        self.cli.eventloop.run_calls()
+
+        self.assertTrue(self.buffer.validation_error is None)
+
+        # The new text is validated when accepting.
+        self.assertFalse(self.buffer.validate())
+        self.assertEqual(self.validator.calls, 2)
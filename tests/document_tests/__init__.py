@@ -1,5 +1,6 @@
 from __future__ import unicode_literals
 
+from prompt_toolkit.buffer import Buffer
 from prompt_toolkit.document import Document
 
 import unittest
@@ -60,3 +61,31 @@ class DocumentTest(unittest.TestCase):
 
         self.assertEqual(pos[0], 3)
         self.assertEqual(pos[1], 3)
+
+    def test_first_and_last_line(self):
+        d = Document('abc\ndef', 1)
+        self.assertEqual(d.current_line_before_cursor, 'a')
+        self.assertEqual(d.current_line_after_cursor, 'bc')
+        self.assertEqual(d.translate_index_to_position(0), (1, 0))
+
+        d = Document('abc\ndef', 5)
+        self.assertEqual(d.current_line_before_cursor, 'd')
+        self.assertEqual(d.current_line_after_cursor, 'ef')
+        self.assertEqual(d.translate_index_to_position(7), (2, 3))
+
+
+class BufferDocumentTest(unittest.TestCase):
+    def test_document_is_reused_until_changed(self):
+        buffer = Buffer()
+        buffer.insert_text('hello')
+
+        document = buffer.document
+        self.assertTrue(buffer.document is document)
+
+        buffer.cursor_position = 2
+        self.assertTrue(buffer.document is not document)
+        self.assertEqual(buffer.document.text_before_cursor, 'he')
+
+        document = buffer.document
+        buffer.insert_text('x')
+        self.assertEqual(buffer.document.text, 'hexllo')
@@ -0,0 +1,176 @@
+from __future__ import unicode_literals
+
+import os
+import sys
+import unittest
+
+if sys.platform != 'win32':
+    from prompt_toolkit.eventloop.posix import PosixEventLoop
+
+
+class _ProcessorMock(object):
+    def __init__(self):
+        self.keys = []
+
+    def feed_key(self, key_press):
+        self.keys.append(key_press)
+
+
+class PosixEventLoopTest(unittest.TestCase):
+    def setUp(self):
+        self.processor = _ProcessorMock()
+
+        # Use a pipe as stdin.
+        r, self.stdin_w = os.pipe()
+        self.stdin = os.fdopen(r, 'rb', 0)
+
+        self.eventloop = PosixEventLoop(self.processor, self.stdin)
+
+    def tearDown(self):
+        self.eventloop.close()
+        self.stdin.close()
+        os.close(self.stdin_w)
+
+    def test_stdin(self):
+        os.write(self.stdin_w, b'abc')
+        self.eventloop.loop()
+
+        self.assertEqual([k.data for k in self.processor.keys], ['a', 'b', 'c'])
+
+    def test_stdin_is_drained_at_once(self):
+        os.write(self.stdin_w, b'x' * 10000)
+        self.eventloop.loop()
+
+        self.assertEqual(len(self.processor.keys), 10000)
+
+    def test_stdin_utf8(self):
+        # Multibyte character split over two writes.
+        os.write(self.stdin_w, '€'.encode('utf-8')[:1])
+        self.eventloop.loop()
+        os.write(self.stdin_w, '€'.encode('utf-8')[1:])
+        self.eventloop.loop()
+
+        self.assertEqual([k.data for k in self.processor.keys], ['€'])
+
+    def test_stdin_invalid_utf8(self):
+        # Only the invalid byte is replaced, the rest of the input is kept.
+        os.write(self.stdin_w, b'ab\xffcd')
+        self.eventloop.loop()
+
+        self.assertEqual([k.data for k in self.processor.keys], ['a', 'b', '\ufffd', 'c', 'd'])
+
+    def test_add_reader(self):
+        r, w = os.pipe()
+        received = []
+
+        def reader_ready():
+            received.append(os.read(r, 1024))
+            self.eventloop.remove_reader(r)
+
+            # Return from `loop`.
+            os.write(self.stdin_w, b'x')
+
+        self.eventloop.add_reader(r, reader_ready)
+        os.write(w, b'data')
+        self.eventloop.loop()
+
+        self.assertEqual(received, [b'data'])
+        os.close(r)
+        os.close(w)
+
+    def test_call_later(self):
+        called = []
+
+        def second():
+            called.append(2)
+            os.write(self.stdin_w, b'x')
+
+        self.eventloop.call_later(0.02, second)
+        self.eventloop.call_later(0.01, lambda: called.append(1))
+        self.eventloop.call_later(0.01, lambda: called.append('cancelled')).cancel()
+        self.eventloop.loop()
+
+        self.assertEqual(called, [1, 2])
+
+    def test_input_timeout(self):
+        timeouts = []
+        self.eventloop.input_timeout = 0.01
+        self.eventloop.onInputTimeout += lambda: timeouts.append(True)
+        self.eventloop.call_later(0.05, lambda: os.write(self.stdin_w, b'x'))
+        self.eventloop.loop()
+
+        self.assertEqual(timeouts, [True])
+
+    def test_call_from_executor_coalesces_wakeups(self):
+        called = []
+
+        for i in range(10):
+            self.eventloop.call_from_executor(lambda i=i: called.append(i))
+
+        # Only one byte has been written to the schedule pipe. (Put it back,
+        # the loop still has to wake up for it.)
+        schedule_pipe = self.eventloop._schedule_pipe
+        self.assertEqual(os.read(schedule_pipe[0], 1024), b'x')
+        os.write(schedule_pipe[1], b'x')
+
+        # After processing, the next callback wakes the loop up again.
+        self.eventloop.call_from_executor(lambda: os.write(self.stdin_w, b'x'))
+        self.eventloop.loop()
+
+        self.assertEqual(called, list(range(10)))
+
+
+# Posix only. (`unittest.skipIf` is not available on Python 2.6.)
+if sys.platform == 'win32':
+    del PosixEventLoopTest
+
+
+class PosixAsyncioEventLoopTest(unittest.TestCase):
+    def setUp(self):
+        import asyncio
+        from prompt_toolkit.eventloop.asyncio_posix import PosixAsyncioEventLoop
+
+        self.processor = _ProcessorMock()
+
+        r, self.stdin_w = os.pipe()
+        self.stdin = os.fdopen(r, 'rb', 0)
+
+        self.loop = asyncio.new_event_loop()
+        self.eventloop = PosixAsyncioEventLoop(self.processor, self.stdin, loop=self.loop)
+
+    def tearDown(self):
+        self.eventloop.close()
+        self.loop.close()
+        self.stdin.close()
+        os.close(self.stdin_w)
+
+    def test_wait_for_input(self):
+        os.write(self.stdin_w, b'ab')
+        self.loop.run_until_complete(self.eventloop.wait_for_input())
+        self.assertEqual([k.data for k in self.processor.keys], ['a', 'b'])
+
+        self.loop.call_later(0.01, lambda: os.write(self.stdin_w, b'c'))
+        self.loop.run_until_complete(self.eventloop.wait_for_input())
+        self.assertEqual([k.data for k in self.processor.keys], ['a', 'b', 'c'])
+
+    def test_input_timeout(self):
+        timeouts = []
+        self.eventloop.input_timeout = 0.01
+        self.eventloop.onInputTimeout += lambda: timeouts.append(True)
+
+        self.loop.call_later(0.05, lambda: os.write(self.stdin_w, b'x'))
+        self.loop.run_until_complete(self.eventloop.wait_for_input())
+
+        self.assertEqual(timeouts, [True])
+
+    def test_close_removes_stdin_reader(self):
+        os.write(self.stdin_w, b'a')
+        self.loop.run_until_complete(self.eventloop.wait_for_input())
+        self.eventloop.close()
+
+        self.assertFalse(self.loop.remove_reader(self.stdin.fileno()))
+
+
+# Posix, Python >=3.5 only. (`unittest.skipIf` is not available on Python 2.6.)
+if sys.platform == 'win32' or sys.version_info < (3, 5):
+    del PosixAsyncioEventLoopTest
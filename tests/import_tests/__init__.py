@@ -0,0 +1,49 @@
+from __future__ import unicode_literals
+
+import os
+import subprocess
+import sys
+import unittest
+
+# The Pygments modules that `import prompt_toolkit` may load. (The token
+# types and the `Style` base class are used everywhere. They are cheap, unlike
+# the lexers, formatters and styles.)
+ALLOWED_PYGMENTS_MODULES = set(['pygments', 'pygments.token', 'pygments.style'])
+
+
+def _run_python(code):
+    """
+    Run this code in a new interpreter and return its output.
+    """
+    package_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+    env = dict(os.environ)
+    env['PYTHONPATH'] = os.pathsep.join([package_root, env.get('PYTHONPATH', '')])
+
+    output = subprocess.check_output([sys.executable, '-c', code], env=env)
+    return output.decode('utf-8').strip()
+
+
+class ImportTest(unittest.TestCase):
+    def _get_loaded_modules(self, module_name):
+        output = _run_python(
+            'import sys; import %s; print(" ".join(sys.modules))' % module_name)
+        return set(output.split())
+
+    def test_heavy_modules_are_not_loaded(self):
+        modules = self._get_loaded_modules('prompt_toolkit')
+
+        for name in ['jedi', 'pygments.lexers', 'pygments.formatters',
+                     'pygments.styles', 'prompt_toolkit.key_binding.bindings.vi',
+                     'prompt_toolkit.terminal.win32_input', 'subprocess']:
+            self.assertTrue(name not in modules, name)
+
+    def test_jedi_is_not_loaded_by_python_input(self):
+        modules = self._get_loaded_modules('prompt_toolkit.contrib.python_input')
+        self.assertTrue('jedi' not in modules)
+
+    def test_only_light_pygments_modules_are_loaded(self):
+        modules = self._get_loaded_modules('prompt_toolkit')
+        pygments_modules = set(m for m in modules if m.split('.')[0] == 'pygments')
+
+        self.assertEqual(pygments_modules - ALLOWED_PYGMENTS_MODULES, set())
@@ -1,7 +1,12 @@
 from __future__ import unicode_literals
 
+from prompt_toolkit import CommandLineInterface
+from prompt_toolkit.buffer import Buffer
+from prompt_toolkit.document import Document
 from prompt_toolkit.key_binding.input_processor import InputProcessor, KeyPress
+from prompt_toolkit.key_binding.manager import KeyBindingManager
 from prompt_toolkit.key_binding.registry import Registry
+from prompt_toolkit.key_binding.vi_state import InputMode
 from prompt_toolkit.keys import Keys
 
 import unittest
@@ -69,3 +74,65 @@ class KeyBindingTest(unittest.TestCase):
         self.processor.feed_key(KeyPress(Keys.ControlD, ''))
 
         self.assertEqual(self.handlers.called, ['control_x', 'control_d'])
+
+
+class EmacsBindingsTest(unittest.TestCase):
+    def setUp(self):
+        manager = KeyBindingManager()
+
+        self.cli = CommandLineInterface(key_bindings_registry=manager.registry)
+        self.buffer = self.cli.buffers['default']
+
+    def _feed(self, *keys):
+        for key in keys:
+            self.cli.input_processor.feed_key(KeyPress(key, key))
+
+    def test_delete_with_count(self):
+        self.buffer.reset(initial_document=Document('abcdef', 1))
+        self._feed(Keys.Escape, '3', Keys.ControlD)
+
+        self.assertEqual(self.buffer.text, 'aef')
+        self.assertEqual(self.buffer.cursor_position, 1)
+
+        self._feed(Keys.ControlD)
+        self.assertEqual(self.buffer.text, 'af')
+
+
+class ViBindingsTest(unittest.TestCase):
+    def setUp(self):
+        manager = KeyBindingManager(enable_vi_mode=True)
+
+        self.cli = CommandLineInterface(
+            key_bindings_registry=manager.registry,
+            buffer=Buffer(is_multiline=True))
+        self.buffer = self.cli.buffers['default']
+
+        manager.reset()
+        manager.vi_state.input_mode = InputMode.NAVIGATION
+
+    def _feed(self, keys):
+        for c in keys:
+            self.cli.input_processor.feed_key(KeyPress(c, c))
+
+    def test_line_transform_with_count(self):
+        self.buffer.reset(initial_document=Document('abc\ndef\nghi\njkl', 5))
+        self._feed('3gUU')
+
+        self.assertEqual(self.buffer.text, 'abc\nDEF\nGHI\nJKL')
+        self.assertEqual(self.buffer.cursor_position, 5)
+
+    def test_line_transform_without_count(self):
+        self.buffer.reset(initial_document=Document('abc\ndef', 1))
+        self._feed('g~~')
+
+        self.assertEqual(self.buffer.text, 'ABC\ndef')
+        self.assertEqual(self.buffer.cursor_position, 1)
+
+    def test_line_transform_count_beyond_last_line(self):
+        self.buffer.reset(initial_document=Document('abc\ndef', 5))
+        self._feed('5guu')
+        self.assertEqual(self.buffer.text, 'abc\ndef')
+
+        self._feed('3gUU')
+        self.assertEqual(self.buffer.text, 'abc\nDEF')
+        self.assertEqual(self.buffer.cursor_position, 5)
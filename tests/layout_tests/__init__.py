@@ -1,6 +1,8 @@
 from __future__ import unicode_literals
 
+from prompt_toolkit.layout.toolbars import Toolbar, TextToolbar, CompletionsToolbar
 from prompt_toolkit.layout.utils import fit_tokens_in_size
+from prompt_toolkit.renderer import Screen, Size, Char
 from pygments.token import Token
 
 import unittest
@@ -53,3 +55,97 @@ class FitTokensInSizeTest(unittest.TestCase):
             [(Token, u' ' * 15)],
             [(Token, u' ' * 15)],
         ])
+
+    def test_double_width(self):
+        result = fit_tokens_in_size([(Token, 'a一二')], width=4, height=1, default_token=Token)
+
+        self.assertEqual(result, [
+            [(Token, u'a'), (Token, u'一'), (Token, u' ')],
+        ])
+
+
+class _CountingToolbar(Toolbar):
+    def __init__(self):
+        super(_CountingToolbar, self).__init__()
+        self.text = 'hello'
+        self.calls = 0
+
+    def get_state_key(self, cli):
+        return self.text
+
+    def get_tokens(self, cli, width):
+        self.calls += 1
+        return [(Token, self.text)]
+
+
+class ToolbarCacheTest(unittest.TestCase):
+    def _write(self, toolbar, columns=10):
+        screen = Screen(Size(rows=5, columns=columns))
+        screen._y = 2
+        toolbar.write(None, screen)
+        return ''.join(screen._buffer[2][x].char for x in range(columns))
+
+    def test_reused_while_state_key_is_equal(self):
+        toolbar = _CountingToolbar()
+
+        self.assertEqual(self._write(toolbar), 'hello     ')
+        self.assertEqual(self._write(toolbar), 'hello     ')
+        self.assertEqual(toolbar.calls, 1)
+
+        toolbar.text = 'world'
+        self.assertEqual(self._write(toolbar), 'world     ')
+        self.assertEqual(toolbar.calls, 2)
+
+        # A different width invalidates the cache as well.
+        self.assertEqual(self._write(toolbar, columns=6), 'world ')
+        self.assertEqual(toolbar.calls, 3)
+
+
+class _UpperCaseToolbar(TextToolbar):
+    def get_tokens(self, cli, width):
+        return [(Token, self.text.upper())]
+
+
+class TextToolbarTest(unittest.TestCase):
+    def test_subclass_with_get_tokens_is_not_cached(self):
+        self.assertEqual(TextToolbar('hello').get_state_key(None), 'hello')
+        self.assertEqual(_UpperCaseToolbar('hello').get_state_key(None), None)
+
+
+class ToolbarZIndexTest(unittest.TestCase):
+    def test_cached_output_respects_z_index(self):
+        toolbar = _CountingToolbar()
+
+        # A menu with a higher z-index, at a different position in each
+        # render.
+        for menu_x, expected in [(1, 'hMllo     '), (3, 'helMo     ')]:
+            screen = Screen(Size(rows=5, columns=10))
+            screen.write_at_pos(2, menu_x, Char('M', Token.Menu, z_index=1))
+            screen._y = 2
+            toolbar.write(None, screen)
+
+            self.assertEqual(''.join(screen._buffer[2][x].char for x in range(10)), expected)
+
+        self.assertEqual(toolbar.calls, 1)
+
+
+class _Completion(object):
+    def __init__(self, display, display_meta=''):
+        self.display = display
+        self.display_meta = display_meta
+
+
+class CompletionsToolbarTest(unittest.TestCase):
+    def test_pages(self):
+        toolbar = CompletionsToolbar()
+        completions = [_Completion('item%05i' % i) for i in range(50000)]
+
+        # Each item takes 10 cells, including the space.
+        self.assertEqual(toolbar._get_page(completions, 0, 35), (0, 3))
+        self.assertEqual(toolbar._get_page(completions, 4, 35), (3, 6))
+
+        # Only the pages until the selected completion were computed.
+        self.assertEqual(toolbar._pages[2], [0, 3, 6])
+
+        self.assertEqual(toolbar._get_page(completions, 1, 35), (0, 3))
+        self.assertEqual(toolbar._get_page(completions, 49999, 35)[1], 50000)
@@ -0,0 +1,50 @@
+from __future__ import unicode_literals
+
+from prompt_toolkit.contrib.python_brackets import BracketTracker
+
+import unittest
+
+
+class BracketTrackerTest(unittest.TestCase):
+    def setUp(self):
+        self.tracker = BracketTracker()
+
+    def test_unclosed_brackets(self):
+        self.assertTrue(self.tracker.has_unclosed_brackets('print('))
+        self.assertTrue(self.tracker.has_unclosed_brackets('a = [1, {2: 3}'))
+        self.assertFalse(self.tracker.has_unclosed_brackets('a = [1, {2: 3}]'))
+        self.assertFalse(self.tracker.has_unclosed_brackets(''))
+
+    def test_brackets_in_strings_and_comments(self):
+        self.assertFalse(self.tracker.has_unclosed_brackets('print("(")'))
+        self.assertFalse(self.tracker.has_unclosed_brackets("print('\\'(')"))
+        self.assertFalse(self.tracker.has_unclosed_brackets('x = 1  # ('))
+
+    def test_multiline_string(self):
+        self.assertTrue(self.tracker.ends_in_multiline_string('x = """abc'))
+        self.assertTrue(self.tracker.ends_in_multiline_string('x = """abc\n(def'))
+        self.assertFalse(self.tracker.ends_in_multiline_string('x = """abc\ndef"""'))
+        self.assertFalse(self.tracker.ends_in_multiline_string('x = "abc'))
+
+    def test_error_positions(self):
+        self.assertEqual(self.tracker.get_error_positions('(]'), set([0, 1]))
+        self.assertEqual(self.tracker.get_error_positions('a)\n(b)'), set([1]))
+        self.assertEqual(self.tracker.get_error_positions('[()]'), set())
+
+    def test_incremental_update(self):
+        text = 'def f(a,\n      b):\n    return [a,\n'
+
+        self.assertTrue(self.tracker.has_unclosed_brackets(text))
+        self.assertEqual(self.tracker.get_error_positions(text), set([text.index('[')]))
+
+        # Edit the last line, and an earlier line.
+        text2 = text + '            b]'
+        self.assertFalse(self.tracker.has_unclosed_brackets(text2))
+
+        text3 = text2.replace('(a,', '(a,)')
+        self.assertEqual(self.tracker.get_error_positions(text3),
+                         set([text3.index('):')]))
+
+        # The result is the same as for a new tracker.
+        self.assertEqual(self.tracker.get_error_positions(text3),
+                         BracketTracker().get_error_positions(text3))
@@ -0,0 +1,340 @@
+from __future__ import unicode_literals
+
+from prompt_toolkit import CommandLineInterface
+from prompt_toolkit.completion import Completer
+from prompt_toolkit.contrib.python_input import PythonBuffer, PythonToolbar, PythonCLISettings, document_is_multiline_python
+from prompt_toolkit.contrib.python_input import JediScriptCache, PythonCommandLineInterface, load_python_bindings
+from prompt_toolkit.contrib.jedi_worker import JediWorker, describe_namespace, _create_preamble, _worker_main
+from prompt_toolkit.document import Document
+from prompt_toolkit.history import History
+from prompt_toolkit.key_binding.input_processor import KeyPress
+from prompt_toolkit.key_binding.manager import KeyBindingManager
+from prompt_toolkit.keys import Keys
+from prompt_toolkit.renderer import Screen, Size
+
+import collections
+import os
+import threading
+import time
+import unittest
+
+
+class PythonToolbarTest(unittest.TestCase):
+    def setUp(self):
+        buffer = PythonBuffer(is_multiline=lambda document: document_is_multiline_python(document))
+
+        self.cli = CommandLineInterface(buffer=buffer)
+        self.toolbar = PythonToolbar(KeyBindingManager(), PythonCLISettings())
+
+    def _write(self, columns=120):
+        screen = Screen(Size(rows=1, columns=columns))
+        self.toolbar.write(self.cli, screen)
+        return ''.join(screen._buffer[0][x].char for x in range(columns))
+
+    def test_multiline_depends_on_cursor_position(self):
+        buffer = self.cli.buffers['default']
+        buffer.insert_text('if x:')
+
+        text = self._write()
+        self.assertTrue('Multiline (on)' in text)
+        self.assertTrue('Execute' in text)
+
+        # Moving the cursor before the colon changes the toolbar.
+        buffer.cursor_position = 3
+
+        text = self._write()
+        self.assertTrue('Multiline (off)' in text)
+        self.assertTrue('Execute' not in text)
+
+    def test_multiline_state_only_computed_when_state_changes(self):
+        calls = []
+        multiline_state = self.toolbar._multiline_state
+
+        def counting_multiline_state(cli):
+            calls.append(cli)
+            return multiline_state(cli)
+        self.toolbar._multiline_state = counting_multiline_state
+
+        self.cli.buffers['default'].insert_text('x = 1')
+        self._write()
+        self._write()
+        self.assertEqual(len(calls), 1)
+
+        self.cli.buffers['default'].cursor_position = 0
+        self._write()
+        self.assertEqual(len(calls), 2)
+
+
+class PythonBindingsTest(unittest.TestCase):
+    def setUp(self):
+        history = History()
+        history.append('a = 1')
+        history.append('b = 2')
+
+        manager = KeyBindingManager()
+        load_python_bindings(manager, PythonCLISettings())
+
+        self.cli = CommandLineInterface(
+            key_bindings_registry=manager.registry,
+            buffer=PythonBuffer(history=history))
+        self.buffer = self.cli.buffers['default']
+
+    def test_merge_history(self):
+        self.buffer.insert_text('c = 3')
+        self.cli.input_processor.feed_key(KeyPress(Keys.F2, ''))
+        self.cli.input_processor.feed_key(KeyPress(Keys.F2, ''))
+
+        self.assertEqual(self.buffer.text, 'a = 1\nb = 2\nc = 3')
+        self.assertEqual(list(self.buffer._working_lines), ['a = 1\nb = 2\nc = 3'])
+
+    def test_merge_history_at_oldest_entry(self):
+        self.buffer.working_index = 0
+        self.cli.input_processor.feed_key(KeyPress(Keys.F2, ''))
+
+        # There is nothing to merge, nothing changes.
+        self.assertEqual(self.buffer.text, 'a = 1')
+        self.assertEqual(list(self.buffer._working_lines), ['a = 1', 'b = 2', ''])
+
+
+class _Script(object):
+    def __init__(self, document, locals, globals):
+        self.document = document
+        self.namespaces = (locals, globals)
+
+
+class JediScriptCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.namespace_calls = 0
+
+        def get_globals():
+            self.namespace_calls += 1
+            return {'a': 1}
+
+        self.scripts = []
+
+        def create_script(document, locals, globals):
+            script = _Script(document, locals, globals)
+            self.scripts.append(script)
+            return script
+
+        self.cache = JediScriptCache(get_globals, get_globals, create_script=create_script)
+
+    def test_script_reused_for_same_document(self):
+        script = self.cache.get_script(Document('abc', 2))
+
+        self.assertTrue(self.cache.get_script(Document('abc', 2)) is script)
+        self.assertTrue(self.cache.get_script(Document('abc', 3)) is not script)
+        self.assertTrue(self.cache.get_script(Document('abd', 3)) is not script)
+
+        # The namespaces are only retrieved once.
+        self.assertEqual(len(self.scripts), 3)
+        self.assertEqual(self.namespace_calls, 2)
+
+    def test_reset_namespaces(self):
+        script = self.cache.get_script(Document('abc'))
+        self.cache.reset_namespaces()
+
+        self.assertTrue(self.cache.get_script(Document('abc')) is not script)
+        self.assertEqual(self.namespace_calls, 4)
+
+
+class _Completer(Completer):
+    def get_completions(self, document, complete_event):
+        return []
+
+
+class PythonCommandLineInterfaceTest(unittest.TestCase):
+    def test_custom_completer(self):
+        cli = PythonCommandLineInterface(_completer=_Completer())
+        self.assertTrue(isinstance(cli.jedi_backend, JediScriptCache))
+
+    def test_namespaces_reset_when_reading_input_starts(self):
+        cli = PythonCommandLineInterface()
+        cli.jedi_backend.create_script = _Script
+
+        script = cli.jedi_backend.get_script(Document('abc'))
+        self.assertTrue(cli.jedi_backend.get_script(Document('abc')) is script)
+
+        cli.onReadInputStart.fire()
+        self.assertTrue(cli.jedi_backend.get_script(Document('abc')) is not script)
+
+
+def _function(a, b=1, *args, **kwargs):
+    pass
+_function.__module__ = '__main__'
+
+
+class _Class(object):
+    attribute = 1
+
+    def method(self, x):
+        pass
+_Class.__module__ = '__main__'
+
+
+class DescribeNamespaceTest(unittest.TestCase):
+    def test_preamble_defines_the_names(self):
+        namespace = {
+            'os_module': os,
+            'ordered_dict': collections.OrderedDict,
+            'number': 1,
+            'function': _function,
+            'cls': _Class,
+            'instance': _Class(),
+            'not an identifier': 1,
+        }
+        preamble = _create_preamble(describe_namespace(namespace))
+
+        result = {}
+        exec(preamble, result)
+
+        self.assertTrue(result['os_module'] is os)
+        self.assertTrue(result['ordered_dict'] is collections.OrderedDict)
+        self.assertEqual(result['number'], 0)
+        self.assertEqual(result['function'](1, 2, 3, d=4), None)
+        self.assertEqual(result['cls'].attribute, None)
+        self.assertTrue(hasattr(result['instance'], 'method'))
+        self.assertTrue('not an identifier' not in result)
+
+    def test_failing_import_is_skipped(self):
+        preamble = _create_preamble([
+            ('a', 'module', 'module_that_does_not_exist', None),
+            ('b', 'module', 'os', None),
+        ])
+
+        result = {}
+        exec(preamble, result)
+        self.assertTrue('a' not in result)
+        self.assertTrue(result['b'] is os)
+
+
+class _StubWorker(JediWorker):
+    """
+    Runs the worker loop in a thread, with a stub instead of jedi.
+    """
+    def __init__(self, handle):
+        super(_StubWorker, self).__init__(lambda: {}, lambda: {})
+        self.handle = handle
+
+    def _start_process(self, child_connection):
+        t = threading.Thread(target=_worker_main, args=(child_connection, self.handle))
+        t.daemon = True
+        t.start()
+        return t
+
+
+class JediWorkerTest(unittest.TestCase):
+    def setUp(self):
+        # (`addCleanup` is not available on Python 2.6.)
+        self.cleanups = []
+
+    def tearDown(self):
+        for cleanup in reversed(self.cleanups):
+            cleanup()
+
+    def _create_worker(self, handle):
+        worker = _StubWorker(handle)
+        self.cleanups.append(worker.close)
+        return worker
+
+    def test_completions(self):
+        def handle(kind, preamble, text, line, column):
+            return [(text.upper(), -len(text))]
+
+        worker = self._create_worker(handle)
+        completions = worker.get_completions(Document('abc'))
+
+        self.assertEqual([(c.text, c.start_position) for c in completions], [('ABC', -3)])
+
+    def test_older_requests_are_cancelled(self):
+        busy = threading.Event()
+        release = threading.Event()
+
+        def handle(kind, preamble, text, line, column):
+            busy.set()
+            release.wait()
+            return [text]
+
+        worker = self._create_worker(handle)
+        results = {}
+
+        def request(text):
+            results[text] = worker._request('signatures', Document(text))
+
+        threads = [threading.Thread(target=request, args=('first', ))]
+        threads[0].start()
+        busy.wait()
+
+        # Two more requests while the worker is busy.
+        for text in ['second', 'third']:
+            threads.append(threading.Thread(target=request, args=(text, )))
+            threads[-1].start()
+
+            while len(worker._pending) < len(threads):
+                time.sleep(.01)
+
+            # (The request is registered before it's sent, with the send lock
+            # held.)
+            with worker._send_lock:
+                pass
+
+        release.set()
+        for t in threads:
+            t.join()
+
+        self.assertEqual(results, {'first': ['first'], 'second': None, 'third': ['third']})
+
+    def test_exception_in_request(self):
+        def handle(kind, preamble, text, line, column):
+            if text == 'fail':
+                raise ValueError
+            return [text]
+
+        worker = self._create_worker(handle)
+
+        self.assertEqual(worker.get_signatures(Document('fail')), [])
+        self.assertEqual(worker.get_signatures(Document('ok')), ['ok'])
+        self.assertEqual(worker._starts, 1)
+
+    def test_worker_started_again_after_dying(self):
+        def handle(kind, preamble, text, line, column):
+            if text == 'exit':
+                raise SystemExit
+            return [text]
+
+        worker = self._create_worker(handle)
+
+        self.assertEqual(worker.get_signatures(Document('exit')), [])
+        self.assertEqual(worker.get_signatures(Document('ok')), ['ok'])
+        self.assertEqual(worker._starts, 2)
+
+    def test_hanging_worker_is_restarted(self):
+        release = threading.Event()
+        self.cleanups.append(release.set)
+
+        def handle(kind, preamble, text, line, column):
+            if text == 'hang':
+                release.wait()
+            return [text]
+
+        worker = self._create_worker(handle)
+        worker.request_timeout = .05
+
+        self.assertEqual(worker.get_signatures(Document('hang')), [])
+        release.set()
+
+        self.assertEqual(worker.get_signatures(Document('ok')), ['ok'])
+        self.assertEqual(worker._starts, 2)
+
+    def test_fallback_when_worker_keeps_dying(self):
+        def handle(kind, preamble, text, line, column):
+            raise SystemExit
+
+        worker = self._create_worker(handle)
+        worker.max_restarts = 1
+
+        for i in range(3):
+            self.assertEqual(worker.get_signatures(Document('abc')), [])
+
+        self.assertEqual(worker._starts, 2)
+        self.assertTrue(isinstance(worker._fallback, JediScriptCache))
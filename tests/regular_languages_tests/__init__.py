@@ -3,9 +3,11 @@ from __future__ import unicode_literals
 from prompt_toolkit.contrib.regular_languages import compile
 from prompt_toolkit.contrib.regular_languages.compiler import Match, Variables
 from prompt_toolkit.contrib.regular_languages.completion import GrammarCompleter
+from prompt_toolkit.contrib.regular_languages.lexer import GrammarLexer
 from prompt_toolkit.completion import Completer, Completion, CompleteEvent
 from prompt_toolkit.document import Document
 
+import threading
 import unittest
 
 
@@ -98,3 +100,139 @@ class GrammarTest(unittest.TestCase):
         self.assertEqual(completions[0].start_position, -3)
         self.assertEqual(completions[1].text, 'before2-def-after2-B')
         self.assertEqual(completions[1].start_position, -3)
+
+    def test_completer_called_once_per_value(self):
+        calls = []
+
+        class completer(Completer):
+            def get_completions(self, document, complete_event):
+                calls.append(document.text)
+                yield Completion('abc', -len(document.text))
+
+        # Both alternatives end with the same variable value.
+        g = compile(r'(?P<var>[a-z]*) | (?P<var>[a-z]*) \s+ x')
+        completer = GrammarCompleter(g, {'var': completer()})
+
+        completions = list(completer.get_completions(
+            Document('a', 1), CompleteEvent()))
+
+        self.assertEqual(calls, ['a'])
+        self.assertEqual(len(completions), 1)
+        self.assertEqual(completions[0].text, 'abc')
+
+
+class AutomatonTest(unittest.TestCase):
+    def test_match(self):
+        g = compile(r'(hello|world) \s+ (?P<var>[a-z]+)')
+
+        self.assertTrue(g.automaton.match('hello abc'))
+        self.assertTrue(g.automaton.match('world   x'))
+        self.assertFalse(g.automaton.match('hello '))
+        self.assertFalse(g.automaton.match('something'))
+
+    def test_match_prefix(self):
+        g = compile(r'(hello\ world|something\ else)')
+
+        for text in ['', 'he', 'hello wor', 'som', 'something else']:
+            self.assertTrue(g.automaton.match_prefix(text))
+
+        for text in ['no-match', 'ello', 'hello worldx']:
+            self.assertFalse(g.automaton.match_prefix(text))
+
+    def test_incremental_feed(self):
+        g = compile(r'a (b|c)+ d?')
+
+        state = g.automaton.start_state
+        self.assertFalse(state.is_match)
+
+        state = state.feed('a')
+        self.assertFalse(state.is_match)
+        self.assertFalse(state.is_dead)
+
+        state = state.feed('bc')
+        self.assertTrue(state.is_match)
+
+        state = state.feed('d')
+        self.assertTrue(state.is_match)
+
+        state = state.feed('d')
+        self.assertTrue(state.is_dead)
+
+    def test_concurrent_use(self):
+        g = compile(r'(hello|world|help) \s+ ([a-z]+ \s*)+')
+        texts = ['hello abc def', 'help  x', 'world y z', 'hex', 'help me!']
+        expected = [g.automaton.match_prefix(t) for t in texts]
+
+        # Threads that build the DFA tables of fresh automatons at the same
+        # time.
+        for _ in range(5):
+            g = compile(r'(hello|world|help) \s+ ([a-z]+ \s*)+')
+            results = []
+
+            def run():
+                for _ in range(50):
+                    results.append([g.automaton.get_state(t).is_dead for t in texts])
+
+            threads = [threading.Thread(target=run) for _ in range(4)]
+            for t in threads:
+                t.start()
+            for t in threads:
+                t.join()
+
+            for r in results:
+                self.assertEqual([not dead for dead in r], expected)
+
+    def test_variables(self):
+        g = compile(r'''
+            (\s*  (?P<operator1>[a-z]+)  \s+  (?P<var1>[0-9]+)  \s+  (?P<var2>[0-9]+)  \s*) |
+            (\s*  (?P<operator2>[a-z]+)  \s+  (?P<var1>[0-9]+)  \s*)
+        ''')
+
+        state = g.automaton.start_capture_state.feed('add 12')
+        self.assertEqual(sorted(state.variables()), [
+            ('operator1', (0, 3)), ('operator2', (0, 3)), ('var1', (4, 6))])
+
+        # An empty variable at the end of the input.
+        state = state.feed(' ')
+        self.assertTrue(('var2', (7, 7)) in state.variables())
+
+    def test_match_prefix_uses_automaton(self):
+        g = compile(r'(?P<cmd>[a-z]+) \s+ (?P<arg>[a-z]*)')
+
+        def fail(string):
+            raise AssertionError('Regexes should not be used.')
+        g._match_prefix_with_regexes = fail
+
+        m = g.match_prefix('cd abc')
+        self.assertEqual(m.variables().get('cmd'), 'cd')
+        self.assertEqual(m.variables().get('arg'), 'abc')
+        self.assertEqual([(v.varname, v.start) for v in m.end_nodes()], [('arg', 3)])
+
+        self.assertEqual(g.match_prefix('cd 1'), None)
+
+        # Input with newlines is matched with the regexes.
+        self.assertRaises(AssertionError, g.match_prefix, 'cd\nabc')
+
+    def test_prefix_matcher_per_caller(self):
+        g = compile(r'(?P<cmd>[a-z]+) \s+ (?P<arg>[a-z]*)')
+        lexer = GrammarLexer(g, tokens={})
+        completer = GrammarCompleter(g, {})
+
+        lexer.get_tokens('cd abc')
+        list(completer.get_completions(Document('cd abc', 3), CompleteEvent()))
+
+        # Each of them keeps the state for its own input.
+        self.assertEqual(lexer._prefix_matcher._last[0], 'cd abc')
+        self.assertEqual(completer._prefix_matcher._last[0], 'cd ')
+
+        # Extending the input continues from that state.
+        state = completer._prefix_matcher._last[1]
+        list(completer.get_completions(Document('cd abc', 4), CompleteEvent()))
+        self.assertEqual(completer._prefix_matcher._last[1].position, state.position + 1)
+
+    def test_lookahead_not_supported(self):
+        g = compile(r'(?!abc)[a-z]+')
+        self.assertEqual(g.automaton, None)
+
+        # `match_prefix` still works through the regexes.
+        self.assertTrue(isinstance(g.match_prefix('abd'), Match))
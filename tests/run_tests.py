@@ -2,12 +2,18 @@
 from __future__ import unicode_literals
 
 from buffer_tests import *
+from cli_tests import *
 from document_tests import *
+from eventloop_tests import *
+from import_tests import *
 from inputstream_tests import *
 from key_binding_tests import *
 from screen_tests import *
 from regular_languages_tests import *
 from layout_tests import *
+from python_brackets_tests import *
+from python_input_tests import *
+from utils_tests import *
 
 import unittest
 
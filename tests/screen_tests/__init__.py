@@ -1,8 +1,9 @@
 from __future__ import unicode_literals
 
-from prompt_toolkit.renderer import Screen, Char, Size, Point
+from prompt_toolkit.renderer import Screen, Char, Size, Point, Renderer
 from pygments.token import Token
 
+import sys
 import unittest
 
 
@@ -94,3 +95,118 @@ class ScreenTest(unittest.TestCase):
 
         self.assertEqual(self.screen._buffer[0][4].token, Token.DEF)
         self.assertEqual(self.screen._buffer[0][8].token, Token.GHI)
+
+
+class _PtyStdout(object):
+    """
+    Output stream that records what's written, with the size of a pseudo
+    terminal.
+    """
+    def __init__(self, rows, columns):
+        import os
+
+        self._master, self._slave = os.openpty()
+        self.set_size(rows, columns)
+        self.data = []
+
+    def set_size(self, rows, columns):
+        import fcntl
+        import struct
+        import termios
+
+        fcntl.ioctl(self._slave, termios.TIOCSWINSZ,
+                    struct.pack('HHHH', rows, columns, 0, 0))
+
+    def fileno(self):
+        return self._slave
+
+    def write(self, data):
+        self.data.append(data)
+
+    def flush(self):
+        pass
+
+    def close(self):
+        import os
+        os.close(self._master)
+        os.close(self._slave)
+
+
+class CursorPositionRequestTest(unittest.TestCase):
+    def setUp(self):
+        self.stdout = _PtyStdout(rows=24, columns=80)
+        self.renderer = Renderer(stdout=self.stdout)
+
+    def tearDown(self):
+        self.stdout.close()
+
+    def test_request_and_report(self):
+        self.renderer.request_absolute_cursor_position()
+        self.assertEqual(self.stdout.data, ['\x1b[6n'])
+
+        self.renderer.report_absolute_cursor_row(5)
+        self.assertEqual(self.renderer._min_available_height, 20)
+
+    def test_no_request_after_clear(self):
+        self.renderer.clear()
+
+        self.assertTrue('\x1b[6n' not in ''.join(self.stdout.data))
+        self.assertEqual(self.renderer._min_available_height, 24)
+
+    def test_estimate_after_erase(self):
+        # Pretend that a layout of three rows was rendered.
+        screen = Screen(Size(rows=24, columns=80))
+        screen._buffer[2][0] = Char()
+        self.renderer._last_screen = screen
+
+        # Until the CPR response arrives, the previous height is used.
+        self.renderer.erase()
+        self.renderer.request_absolute_cursor_position()
+        self.assertEqual(self.stdout.data[-1], '\x1b[6n')
+        self.assertEqual(self.renderer._min_available_height, 3)
+
+        self.renderer.report_absolute_cursor_row(20)
+        self.assertEqual(self.renderer._min_available_height, 5)
+
+    def test_forget_cursor_row(self):
+        # As if the previous input was accepted on row 10.
+        self.renderer._rows_below_cursor = 15
+        self.renderer.forget_cursor_row()
+
+        self.renderer.request_absolute_cursor_position()
+        self.assertEqual(self.stdout.data[-1], '\x1b[6n')
+        self.assertEqual(self.renderer._min_available_height, 0)
+
+    def _render_three_rows(self):
+        screen = Screen(Size(rows=24, columns=80))
+        screen._buffer[2][0] = Char()
+        self.renderer._last_screen = screen
+
+    def test_resize_keeps_output_when_rows_are_added(self):
+        self._render_three_rows()
+        self.stdout.set_size(rows=30, columns=80)
+
+        self.renderer.resize()
+        self.assertEqual(self.stdout.data, ['\x1b[6n'])
+        self.assertTrue(self.renderer._last_screen is not None)
+
+    def test_resize_erases_output_when_width_changes(self):
+        self._render_three_rows()
+        self.stdout.set_size(rows=24, columns=60)
+
+        self.renderer.resize()
+        self.assertTrue('\x1b[J' in ''.join(self.stdout.data))
+        self.assertTrue(self.renderer._last_screen is None)
+
+    def test_report_with_cursor_below_top_row(self):
+        self.renderer._cursor_pos = Point(y=2, x=0)
+        self.renderer.request_absolute_cursor_position()
+
+        # Cursor is on row 10, so the layout starts at row 8.
+        self.renderer.report_absolute_cursor_row(10)
+        self.assertEqual(self.renderer._min_available_height, 17)
+
+
+# Requires a pseudo terminal. (`unittest.skipIf` is not available on Python 2.6.)
+if sys.platform == 'win32':
+    del CursorPositionRequestTest
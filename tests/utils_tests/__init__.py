@@ -0,0 +1,32 @@
+from __future__ import unicode_literals
+
+from prompt_toolkit.utils import get_cwidth, get_string_width
+
+import six
+import unittest
+
+
+class CharWidthTest(unittest.TestCase):
+    def test_widths(self):
+        self.assertEqual(get_cwidth('a'), 1)
+        self.assertEqual(get_cwidth('一'), 2)  # CJK ideograph.
+        self.assertEqual(get_cwidth('\x00'), 0)
+        self.assertEqual(get_cwidth('\x01'), -1)
+
+    def test_astral_code_point(self):
+        if six.PY3:
+            self.assertEqual(get_cwidth('\U00020000'), 2)  # CJK Extension B.
+
+
+class StringWidthTest(unittest.TestCase):
+    def test_ascii(self):
+        self.assertEqual(get_string_width(''), 0)
+        self.assertEqual(get_string_width('hello world'), 11)
+        self.assertEqual(get_string_width('hello\n'), 5)
+
+    def test_double_width_and_control_characters(self):
+        self.assertEqual(get_string_width('a一二'), 5)
+        self.assertEqual(get_string_width('a\x01b'), 2)
+
+        # Cached result.
+        self.assertEqual(get_string_width('a一二'), 5)